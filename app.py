@@ -1,70 +1,224 @@
 import os
+import re
+import sys
 import time
+import datetime
+import atexit
+import tempfile
+import threading
 from dotenv import load_dotenv
-from calendar_app import create_event_from_text  
-from weather import get_weather
-from news import get_news
+from calendar_app import create_event_from_text, formatar_conflitos, registrar_observador
+from google_service import ContaNaoVinculada
+from dispatcher import ChatDispatcher, instalar_dispatcher
+from response_cache import LLMResponseCache
+from reminders import ReminderScheduler, REMINDER_HORIZONTE_DIAS
+from briefing import BriefingScheduler
+import metrics
+import resilience
+from resilience import ServicoIndisponivel
 
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
-import telebot
+# módulos pesados (langchain/openai, telebot, httpx, requests, googleapiclient)
+# são importados só pelos handlers que usam, para o processo subir rápido
 
 # carrega variáveis secretas do .env
 load_dotenv()
 API_BOT_TOKEN = os.getenv("API_BOT_TOKEN")
 CHAT_ID = os.getenv("CHAT_ID")
 
-# template base do assistente para saber seu papel
-template = """Você é um assistente pessoal que ajuda o usuário a gerir sua agenda de horários, lembretes e afazeres diários.
-Você faz isso a partir do acesso através de tools a sua agenda.
-
-Histórico de conversa:
-{history}
-
-Entrada do usuário:
-{input}"""
-
-# cria o modelo de prompt
-prompt = ChatPromptTemplate.from_messages([
-    ("system", template),
-    MessagesPlaceholder(variable_name="history"),
-    ("human", "{input}")
-])
-
-# inicializa o modelo de linguagem
-llm = ChatOpenAI(temperature=0.7, model="gpt-4o-mini")
-chain = prompt | llm
-
-# histórico de conversas
-store = {}
-def get_session_history(session_id: str) -> BaseChatMessageHistory:
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
-
-chain_with_history = RunnableWithMessageHistory(
-    chain,
-    get_session_history,
-    input_messages_key="input",
-    history_messages_key="history"
+# raiz da Bot API; trocar só para apontar para um servidor fake (benchmarks/fakes.py)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+
+# pool de workers do bot: chats diferentes em paralelo, mesmo chat em ordem
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "8"))
+BOT_MAX_PENDENTES = int(os.getenv("BOT_MAX_PENDENTES", "200"))
+MENSAGEM_OCUPADO = "Estou com muitas mensagens agora, tente novamente em instantes."
+
+# usuários sem token na tabela users (o dono do bot usa o token.json)
+MENSAGEM_SEM_CONTA = (
+    "Sua conta Google ainda não está vinculada. "
+    "Peça ao administrador para rodar: python google_service.py vincular <seu id do Telegram>"
 )
 
+# memória de conversa: sessões ativas na RAM, as demais no SQLite
+MEMORIA_MAX_SESSOES = int(os.getenv("MEMORIA_MAX_SESSOES", "500"))
+MEMORIA_MAX_MENSAGENS = int(os.getenv("MEMORIA_MAX_MENSAGENS", "20"))
+
+# modo de entrega dos updates: "polling" (padrão) ou "webhook" (FastAPI em backend/main.py)
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # URL pública, ex.: https://mia.exemplo.com
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_PATH = "/telegram/webhook"
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8000"))
+# memória de conversa, caches e fila de envio são por processo: com mais de 1
+# worker o mesmo chat pode cair em processos diferentes (histórico divergente,
+# ordem e limites do Telegram perdidos); só suba isso com roteamento fixo por chat
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "1"))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+# respostas do LLM aparecem aos poucos (edições da mensagem) em vez de tudo no fim
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") == "1"
+
+# cache de respostas do LLM (desligado por padrão; ligar por deploy)
+LLM_CACHE = os.getenv("LLM_CACHE", "0") == "1"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_MAX_ITENS = int(os.getenv("LLM_CACHE_MAX_ITENS", "1000"))
+LLM_CACHE_PERSISTIR = os.getenv("LLM_CACHE_PERSISTIR", "0") == "1"
+LLM_CACHE_CONTEXTO = int(os.getenv("LLM_CACHE_CONTEXTO", "2"))
+
+# template base do assistente para saber seu papel; o histórico e a entrada
+# entram como mensagens separadas (ver prompt_budget), uma vez só
+template = """Você é um assistente pessoal que ajuda o usuário a gerir sua agenda de horários, lembretes e afazeres diários.
+Você faz isso a partir do acesso através de tools a sua agenda, à previsão do tempo e às notícias.
+Passe datas e horários às tools do jeito que o usuário falou (hoje, amanhã às 15h, 29/11/2025).
+Quando precisar de mais de uma tool para responder, peça todas de uma vez."""
+
+# atalho sem LLM para os comandos de barra sem handler próprio; o resto
+# (inclusive "quanto tempo falta...") vai para o LLM com as tools
+COMANDOS_DIRETOS = re.compile(r"^/(marcar|tempo|clima|noticias)(?:@\w+)?(?:\s+(.*))?$", re.IGNORECASE | re.DOTALL)
+
+# prompt, modelo, memória e chain são montados na primeira conversa livre
+# (ver preparar_llm); importar o langchain_openai sozinho leva mais de 1s
+memoria = None
+chain_with_history = None
+_llm_lock = threading.Lock()
+
+
+def preparar_llm():
+    """Importa o LangChain e monta o chain com histórico uma única vez."""
+    global memoria, chain_with_history
+    if chain_with_history is not None:
+        return
+    with _llm_lock:
+        if chain_with_history is not None:
+            return
+
+        import httpx
+        from langchain_openai import ChatOpenAI
+        from langchain_core.runnables import RunnableLambda
+        from langchain_core.runnables.history import RunnableWithMessageHistory
+        from chat_memory import ChatMemoryStore
+        from prompt_budget import MontadorDePrompt, RESUMO_MAX_TOKENS
+        from llm_tools import AgenteComFerramentas
+
+        # inicializa o modelo de linguagem (e um determinístico e curto para os resumos)
+        conectar, ler = resilience.timeout("openai")
+        llm = ChatOpenAI(
+            temperature=0.7, model="gpt-4o-mini", stream_usage=True,
+            timeout=httpx.Timeout(ler, connect=conectar),
+        )
+        llm_resumo = ChatOpenAI(
+            temperature=0, model="gpt-4o-mini", max_tokens=RESUMO_MAX_TOKENS,
+            timeout=httpx.Timeout(ler, connect=conectar),
+        )
+
+        # histórico de conversas, um por chat.id
+        memoria = ChatMemoryStore(max_sessoes=MEMORIA_MAX_SESSOES, max_mensagens=MEMORIA_MAX_MENSAGENS)
+        atexit.register(memoria.flush)
+
+        # o prompt é montado dentro do orçamento de tokens, com resumo das mensagens antigas;
+        # o agente chama o modelo com as tools e roda as que ele pedir
+        agente = AgenteComFerramentas(llm)
+        chain = RunnableLambda(MontadorDePrompt(template, memoria, llm_resumo)) | RunnableLambda(agente.responder)
+
+        chain_with_history = RunnableWithMessageHistory(
+            chain,
+            memoria.get,
+            input_messages_key="input",
+            history_messages_key="history"
+        )
+
+llm_cache = LLMResponseCache(
+    ttl=LLM_CACHE_TTL,
+    max_itens=LLM_CACHE_MAX_ITENS,
+    persistir=LLM_CACHE_PERSISTIR,
+    mensagens_contexto=LLM_CACHE_CONTEXTO,
+) if LLM_CACHE else None
+if llm_cache is not None:
+    metrics.registrar_cache("llm", llm_cache.estatisticas)
+
+# lembretes antes dos eventos; todo processo agenda/cancela (grava no SQLite),
+# mas só o processo principal (__main__) dispara
+lembretes = ReminderScheduler()
+registrar_observador(lembretes.ao_alterar_evento)
+
+# resumo diário (agenda + clima + notícias), montado antes do horário; mesmo esquema dos lembretes
+resumos = BriefingScheduler()
+registrar_observador(resumos.ao_alterar_evento)
+metrics.registrar_cache("resumo", resumos.estatisticas)
+
+
+def responder_llm(bot, chat_id, pergunta, telegram_id=None):
+    """Responde pelo chain (stream ou invoke), passando antes pelo cache se ligado."""
+    preparar_llm()
+    ferramentas_usadas = []
+    config = {'configurable': {
+        'session_id': str(chat_id), 'chat_id': chat_id, 'telegram_id': telegram_id,
+        'ferramentas_usadas': ferramentas_usadas,
+    }}
+
+    chave = None
+    if llm_cache is not None:
+        from langchain_core.messages import HumanMessage, AIMessage
+
+        historico = memoria.get(str(chat_id))
+        chave = llm_cache.chave(pergunta, historico.messages)
+        em_cache = llm_cache.get(chave)
+        if em_cache is not None:
+            # o chain não roda, então o histórico é atualizado aqui
+            historico.add_messages([HumanMessage(content=pergunta), AIMessage(content=em_cache.texto)])
+            bot.send_message(chat_id, text=em_cache.texto)
+            print(f"[llm-cache] chat {chat_id}: hit, {llm_cache.estatisticas()}")
+            return
+
+    # o circuit breaker da OpenAI fica no agente, em volta das leituras do stream do modelo
+    inicio = time.perf_counter()
+    if LLM_STREAMING:
+        from streaming import responder_em_stream
+        texto, tokens = responder_em_stream(bot, chat_id, chain_with_history, {'input': pergunta}, config)
+    else:
+        resposta = chain_with_history.invoke({'input': pergunta}, config=config)
+        texto = resposta.content
+        tokens = (resposta.usage_metadata or {}).get("total_tokens", 0)
+        bot.send_message(chat_id, text=texto)
+        print(f"[llm] chat {chat_id}: resposta completa em {(time.perf_counter() - inicio) * 1000:.0f}ms")
+    metrics.LLM_TOKENS.inc(valor=tokens)
+
+    # resposta que veio de tools (agenda, clima) não vale para a próxima vez
+    if chave is not None and not ferramentas_usadas:
+        llm_cache.set(chave, texto, time.perf_counter() - inicio, tokens)
+
+
 # --- BOT PRINCIPAL ---
-if __name__ == "__main__":
-    print("SYSTEM_VERIFY: EXECUTANDO")
-    bot = telebot.TeleBot(API_BOT_TOKEN)
-    print("SYSTEM_VERIFY: CONECTADO NO TELEGRAM")
-    bot.send_message(CHAT_ID, text=(
-        "Olá, sou Mia!\n"
-        "Se precisar de ajuda para gerenciar sua agenda, lembretes ou afazeres, é só me avisar!\n\n"
-        "Digite /help para ver os comandos disponíveis."
-    ))
+def criar_bot():
+    """Cria o bot com o dispatcher e registra todos os handlers.
+
+    Usado tanto pelo polling (python app.py) quanto pelo webhook do
+    backend FastAPI, que entrega os updates a estes mesmos handlers.
+    """
+    import telebot
+    from telebot import apihelper
+
+    apihelper.API_URL = TELEGRAM_API_URL + "/bot{0}/{1}"
+    apihelper.FILE_URL = TELEGRAM_API_URL + "/file/bot{0}/{1}"
+    apihelper.CONNECT_TIMEOUT, apihelper.READ_TIMEOUT = resilience.timeout("telegram")
+
+    # threaded=False: quem paraleliza é o dispatcher, preservando a ordem por chat
+    bot = telebot.TeleBot(API_BOT_TOKEN, threaded=False)
+    dispatcher = ChatDispatcher(max_workers=BOT_WORKERS, max_pendentes=BOT_MAX_PENDENTES)
+    instalar_dispatcher(bot, dispatcher, MENSAGEM_OCUPADO)
+
+    # todo envio passa pela fila (limites do Telegram, 429, mensagens longas)
+    from send_queue import instalar_fila_de_envio
+    fila = instalar_fila_de_envio(bot)
+    atexit.register(fila.esvaziar)
+    metrics.registrar_coletor(lambda: [(
+        "mia_dispatcher_pendentes", "gauge", "Updates na fila do dispatcher.", {}, dispatcher.pendentes,
+    )])
 
     # --- COMANDOS ESPECIAIS ---
     @bot.message_handler(commands=['start'])
+    @metrics.medido(metrics.HANDLERS, "start")
     def handle_start(message):
         bot.send_message(message.chat.id, (
             "Olá, sou Mia!\n"
@@ -73,6 +227,7 @@ if __name__ == "__main__":
         ))
 
     @bot.message_handler(commands=['listar'])
+    @metrics.medido(metrics.HANDLERS, "listar")
     def handle_listar(message):
         try:
             user_query = message.text.replace("/listar", "").strip().lower()
@@ -82,14 +237,43 @@ if __name__ == "__main__":
                 return
             
             from calendar_app import listar_eventos_do_dia
-            resultado = listar_eventos_do_dia(user_query)
+            resultado = listar_eventos_do_dia(user_query, telegram_id=message.from_user.id)
             bot.send_message(message.chat.id, resultado)
     
+        except ContaNaoVinculada:
+            bot.send_message(message.chat.id, MENSAGEM_SEM_CONTA)
+        except ServicoIndisponivel as e:
+            bot.send_message(message.chat.id, str(e))
         except Exception as e:
+            metrics.ERROS_HANDLER.inc("listar")
             print(f"Erro no /listar: {e}")
             bot.send_message(message.chat.id, "Erro ao listar eventos.")
             
+    @bot.message_handler(commands=['livre'])
+    @metrics.medido(metrics.HANDLERS, "livre")
+    def handle_livre(message):
+        try:
+            user_query = message.text.replace("/livre", "").strip()
+
+            if not user_query:
+                bot.send_message(message.chat.id, "Use assim:\n/livre hoje\n/livre amanhã à tarde\n/livre 29/11/2025")
+                return
+
+            from calendar_app import listar_horarios_livres
+            resposta = listar_horarios_livres(user_query, telegram_id=message.from_user.id)
+            bot.send_message(message.chat.id, resposta)
+
+        except ContaNaoVinculada:
+            bot.send_message(message.chat.id, MENSAGEM_SEM_CONTA)
+        except ServicoIndisponivel as e:
+            bot.send_message(message.chat.id, str(e))
+        except Exception as e:
+            metrics.ERROS_HANDLER.inc("livre")
+            print(f"Erro no /livre: {e}")
+            bot.send_message(message.chat.id, "Erro ao consultar seus horários livres.")
+
     @bot.message_handler(commands=['remover'])
+    @metrics.medido(metrics.HANDLERS, "remover")
     def handle_remover_nome(message):
         try:
             user_query = message.text.replace("/remover", "").strip()
@@ -99,15 +283,58 @@ if __name__ == "__main__":
                 return
             
             from calendar_app import remover_evento_por_nome
-            resposta = remover_evento_por_nome(user_query)
+            resposta = remover_evento_por_nome(user_query, telegram_id=message.from_user.id)
 
             bot.send_message(message.chat.id, resposta)
 
+        except ContaNaoVinculada:
+            bot.send_message(message.chat.id, MENSAGEM_SEM_CONTA)
+        except ServicoIndisponivel as e:
+            bot.send_message(message.chat.id, str(e))
         except Exception as e:
+            metrics.ERROS_HANDLER.inc("remover")
             print(f"Erro no /remover: {e}")
             bot.send_message(message.chat.id, "Erro ao tentar remover o evento.")
     
+    @bot.message_handler(commands=['resumo'])
+    @metrics.medido(metrics.HANDLERS, "resumo")
+    def handle_resumo(message):
+        try:
+            from briefing import interpretar_configuracao, USO
+
+            chat_id = message.chat.id
+            user_query = message.text.replace("/resumo", "", 1).strip()
+
+            if user_query.lower() == "desligar":
+                desligado = resumos.desligar(chat_id)
+                bot.send_message(chat_id, "Resumo diário desligado." if desligado else "Você não tinha resumo diário.")
+                return
+
+            if user_query:
+                configuracao = interpretar_configuracao(user_query)
+                if configuracao is None:
+                    bot.send_message(chat_id, USO)
+                    return
+                horario, cidade, temas = configuracao
+                resumos.configurar(chat_id, message.from_user.id, horario, cidade, temas)
+                bot.send_message(chat_id, (
+                    f"Pronto! Todo dia às {horario} envio sua agenda, o clima em {cidade}"
+                    + (f" e notícias sobre {', '.join(temas)}." if temas else ".")
+                ))
+                return
+
+            resposta = resumos.resumo(chat_id)
+            bot.send_message(chat_id, resposta or USO)
+
+        except ServicoIndisponivel as e:
+            bot.send_message(message.chat.id, str(e))
+        except Exception as e:
+            metrics.ERROS_HANDLER.inc("resumo")
+            print(f"Erro no /resumo: {e}")
+            bot.send_message(message.chat.id, "Erro ao montar o resumo do dia.")
+
     @bot.message_handler(commands=['help'])
+    @metrics.medido(metrics.HANDLERS, "help")
     def handle_help(message):
         help_text = (
             "*Comandos disponíveis:*\n\n"
@@ -116,58 +343,154 @@ if __name__ == "__main__":
             "/noticias [assunto] - 5 notícias relevantes sobre o tema\n"
             "/listar [dia ou xx/xx/xxxx] - Mostrar eventos de tal dia\n"
             "/remover [nome do evento] - Remove o evento da sua agenda\n"
+            "/livre [dia] [manhã/tarde/noite] - Mostra seus horários livres\n"
+            "/resumo [xxhxx cidade; assuntos] - Resumo do dia agora, ou todo dia no horário\n"
+            "/exportar [xx/xx/xxxx] [xx/xx/xxxx] - Exporta os eventos do período em .ics\n"
+            "Envie um arquivo .ics para importar os eventos na sua agenda\n"
         )
         bot.send_message(message.chat.id, help_text, parse_mode='Markdown')
 
+    @bot.message_handler(commands=['exportar'])
+    @metrics.medido(metrics.HANDLERS, "exportar")
+    def handle_exportar(message):
+        try:
+            from calendar_app import exportar_agenda_ics
+
+            with tempfile.NamedTemporaryFile("w+", suffix=".ics", encoding="utf-8", newline="") as arquivo:
+                resultado = exportar_agenda_ics(message.text, arquivo, telegram_id=message.from_user.id)
+                if isinstance(resultado, str):
+                    bot.send_message(message.chat.id, resultado)
+                    return
+
+                arquivo.flush()
+                with open(arquivo.name, "rb") as leitura:
+                    bot.send_document(
+                        message.chat.id, leitura,
+                        visible_file_name="agenda.ics",
+                        caption=f"{resultado} evento(s) exportado(s).",
+                    )
+
+        except ContaNaoVinculada:
+            bot.send_message(message.chat.id, MENSAGEM_SEM_CONTA)
+        except ServicoIndisponivel as e:
+            bot.send_message(message.chat.id, str(e))
+        except Exception as e:
+            metrics.ERROS_HANDLER.inc("exportar")
+            print(f"Erro no /exportar: {e}")
+            bot.send_message(message.chat.id, "Erro ao exportar a agenda.")
+
+    @bot.message_handler(content_types=['document'])
+    @metrics.medido(metrics.HANDLERS, "importar_ics")
+    def handle_documento(message):
+        try:
+            if not (message.document.file_name or "").lower().endswith(".ics"):
+                bot.send_message(message.chat.id, "Envie um arquivo .ics para importar eventos.")
+                return
+
+            from calendar_app import importar_agenda_ics
+            from http_client import get_session
+
+            bot.send_message(message.chat.id, "Importando eventos...")
+            file_info = bot.get_file(message.document.file_id)
+            url = f"{TELEGRAM_API_URL}/file/bot{API_BOT_TOKEN}/{file_info.file_path}"
+
+            # lê o arquivo em streaming, linha a linha, sem baixá-lo inteiro para a memória
+            with get_session().get(url, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                response.encoding = "utf-8"
+                resposta = importar_agenda_ics(
+                    # quebra só no \n: um \r\n partido entre chunks não vira linha vazia
+                    response.iter_lines(decode_unicode=True, delimiter="\n"), telegram_id=message.from_user.id,
+                )
+
+            bot.send_message(message.chat.id, resposta)
+
+        except ContaNaoVinculada:
+            bot.send_message(message.chat.id, MENSAGEM_SEM_CONTA)
+        except ServicoIndisponivel as e:
+            bot.send_message(message.chat.id, str(e))
+        except Exception as e:
+            metrics.ERROS_HANDLER.inc("importar_ics")
+            print(f"Erro na importação ICS: {e}")
+            bot.send_message(message.chat.id, "Erro ao importar o arquivo .ics.")
+
     # --- HANDLER DE MENSAGENS NORMAIS ---
     @bot.message_handler(content_types=['text'])
     def handle_message(message):
+        # a rota só é conhecida depois do roteamento, então a medição é manual
+        inicio = time.perf_counter()
+        rota = "chat"
         try:
             pergunta_usuario = message.text.lower()
             chat_id = message.chat.id
             print("Mensagem recebida:", pergunta_usuario)
 
-            # verifica se o usuário quer marcar algo na agenda
-            if "marcar" in pergunta_usuario or "reunião" in pergunta_usuario:
-                link = create_event_from_text(pergunta_usuario)
-                bot.send_message(CHAT_ID, f"Reunião criada com sucesso!\n{link}")
-                return # evita continuar pro chain
-            
-            # verifica se o usuário quer saber o clima
-            elif "tempo" in pergunta_usuario.lower() or "clima" in pergunta_usuario.lower():
-                # Tenta extrair o nome da cidade
-                parts = pergunta_usuario.split()
-                if len(parts) > 1:
-                    city = " ".join(parts[1:])
-                    weather_info = get_weather(city)
-                    bot.send_message(chat_id, weather_info)
-                else:
+            comando = COMANDOS_DIRETOS.match(pergunta_usuario.strip())
+            if comando is None:
+                # conversa livre: o LLM decide se precisa das tools
+                responder_llm(bot, chat_id, pergunta_usuario, telegram_id=message.from_user.id)
+                return
+
+            rota = "tempo" if comando.group(1) == "clima" else comando.group(1)
+            argumento = (comando.group(2) or "").strip()
+
+            if rota == "marcar":
+                if not argumento:
+                    bot.send_message(chat_id, "Use assim: /marcar dentista amanhã às 15h")
+                    return
+                link, conflitos = create_event_from_text(pergunta_usuario, chat_id=chat_id, telegram_id=message.from_user.id)
+                aviso = formatar_conflitos(conflitos)
+                bot.send_message(chat_id, f"Reunião criada com sucesso!\n{link}" + (f"\n\n{aviso}" if aviso else ""))
+
+            elif rota == "tempo":
+                if not argumento:
                     bot.send_message(chat_id, "Por favor, diga o nome da cidade. Exemplo: '/clima São Paulo'")
-                return # evita continuar pro chain
-            
-            # verifica se o usuário quer saber alguma notícia
-            elif pergunta_usuario.startswith("/noticias"):
-                parts = pergunta_usuario.split(" ", 1)
-                if len(parts) == 1:
+                    return
+                from weather import get_weather
+                bot.send_message(chat_id, get_weather(argumento))
+
+            else:
+                if not argumento:
                     bot.send_message(chat_id, "Use assim: /noticias são paulo")
                     return
-                
-                query = parts[1]
-                news_result = get_news(query)
-                bot.send_message(chat_id, news_result)
-                return # evita continuar pro chain
-
-            # chat normal
-            resposta = chain_with_history.invoke(
-                {'input': pergunta_usuario},
-                config={'configurable': {'session_id': 'user123'}}
-            )
-            bot.send_message(CHAT_ID, text=resposta.content)
+                from news import get_news
+                bot.send_message(chat_id, get_news(argumento))
 
+        except ContaNaoVinculada:
+            bot.send_message(message.chat.id, MENSAGEM_SEM_CONTA)
+        except ServicoIndisponivel as e:
+            bot.send_message(message.chat.id, str(e))
         except Exception as e:
+            metrics.ERROS_HANDLER.inc(rota)
             print(f"Erro no handle_message: {e}")
-            bot.send_message(CHAT_ID, text="Erro ao processar a mensagem, tente novamente.")
+            bot.send_message(message.chat.id, text="Erro ao processar a mensagem, tente novamente.")
+        finally:
+            metrics.HANDLERS.observar(time.perf_counter() - inicio, rota)
 
+    return bot
+
+
+def iniciar_lembretes(bot):
+    """Carrega os próximos eventos do store local e começa a disparar lembretes."""
+    from calendar_app import authenticate_google, TZ
+    from backend import event_store
+
+    proximos = []
+    try:
+        event_store.sincronizar(authenticate_google())
+        agora = datetime.datetime.now(TZ)
+        proximos = event_store.eventos_no_intervalo(agora, agora + datetime.timedelta(days=REMINDER_HORIZONTE_DIAS))
+    except Exception as e:
+        print(f"Erro ao carregar eventos para os lembretes: {e}")
+
+    lembretes.iniciar(
+        lambda chat_id, texto: bot.send_message(chat_id, texto),
+        eventos_iniciais=proximos,
+        chat_id_padrao=CHAT_ID,
+    )
+
+
+def iniciar_polling(bot):
     # loop principal
     while True:
         try:
@@ -175,3 +498,72 @@ if __name__ == "__main__":
         except Exception as e:
             print(f"Erro no polling: {e}")
             time.sleep(5)
+
+
+def iniciar_webhook(bot):
+    """Registra o webhook no Telegram e sobe o backend FastAPI com uvicorn.
+
+    Com um worker (o padrão) o uvicorn roda neste processo e usa este
+    bot. Com mais, cada worker cria seu próprio bot, dispatcher, memória
+    e fila de envio, e a ordem por chat só vale dentro de um worker. Se
+    o registro falhar, volta para o polling.
+    """
+    import uvicorn
+
+    if not WEBHOOK_URL or not WEBHOOK_SECRET:
+        print("WEBHOOK_URL/WEBHOOK_SECRET não configurados, usando polling.")
+        iniciar_polling(bot)
+        return
+
+    try:
+        bot.remove_webhook()
+        bot.set_webhook(
+            url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+    except Exception as e:
+        print(f"Erro ao registrar webhook: {e}; usando polling.")
+        iniciar_polling(bot)
+        return
+
+    if WEBHOOK_WORKERS > 1:
+        print(
+            f"Aviso: {WEBHOOK_WORKERS} workers no webhook; histórico, ordem e limites de envio "
+            "só valem por worker. Use roteamento fixo por chat na frente do uvicorn."
+        )
+    print(f"SYSTEM_VERIFY: WEBHOOK EM {WEBHOOK_URL}{WEBHOOK_PATH}")
+
+    # com um worker o uvicorn roda neste processo: o backend usa este bot (e a
+    # mesma fila de envio, agendadores e caches) em vez de importar o app de novo
+    from backend import main as backend_main
+
+    backend_main.usar_bot(bot)
+    destino = backend_main.app if WEBHOOK_WORKERS == 1 else "backend.main:app"
+    uvicorn.run(destino, host=WEBHOOK_HOST, port=WEBHOOK_PORT, workers=WEBHOOK_WORKERS)
+
+
+if __name__ == "__main__":
+    print("SYSTEM_VERIFY: EXECUTANDO")
+    bot = criar_bot()
+    print("SYSTEM_VERIFY: CONECTADO NO TELEGRAM")
+    bot.send_message(CHAT_ID, text=(
+        "Olá, sou Mia!\n"
+        "Se precisar de ajuda para gerenciar sua agenda, lembretes ou afazeres, é só me avisar!\n\n"
+        "Digite /help para ver os comandos disponíveis."
+    ))
+
+    resumos.iniciar(lambda chat_id, texto: bot.send_message(int(chat_id), texto))
+
+    # /metrics sai deste processo nos dois modos (com 1 worker o uvicorn roda aqui mesmo)
+    metrics.iniciar_servidor()
+
+    # sync da agenda e LangChain carregam em segundo plano: o bot já atende comandos enquanto isso
+    threading.Thread(target=iniciar_lembretes, args=(bot,), name="lembretes", daemon=True).start()
+    threading.Thread(target=preparar_llm, name="preparar-llm", daemon=True).start()
+
+    modo = "webhook" if "--webhook" in sys.argv else BOT_MODE
+    if modo == "webhook":
+        iniciar_webhook(bot)
+    else:
+        iniciar_polling(bot)
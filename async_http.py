@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import weakref
+
+import httpx
+
+import resilience
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+LIMITES = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+
+# máximo de chamadas simultâneas por serviço externo
+CONCORRENCIA = {
+    "openweather": 10,
+    "gnews": 5,
+    "calendar": 10,
+}
+CONCORRENCIA_PADRAO = 10
+
+# cliente e semáforos são por event loop (objetos asyncio não podem ser
+# compartilhados entre loops); na prática o bot usa só o loop de fundo
+_por_loop = weakref.WeakKeyDictionary()
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+class _Recursos:
+    def __init__(self):
+        self.client = httpx.AsyncClient(timeout=TIMEOUT, limits=LIMITES)
+        self.semaforos = {}
+
+
+def _recursos():
+    loop = asyncio.get_running_loop()
+    recursos = _por_loop.get(loop)
+    if recursos is None:
+        recursos = _por_loop[loop] = _Recursos()
+    return recursos
+
+
+def get_client():
+    """httpx.AsyncClient compartilhado (com pool de conexões) do loop atual."""
+    return _recursos().client
+
+
+def limite(servico):
+    """Semáforo que limita as chamadas simultâneas a um serviço."""
+    semaforos = _recursos().semaforos
+    semaforo = semaforos.get(servico)
+    if semaforo is None:
+        semaforo = semaforos[servico] = asyncio.Semaphore(CONCORRENCIA.get(servico, CONCORRENCIA_PADRAO))
+    return semaforo
+
+
+def timeout(servico):
+    """httpx.Timeout com o connect/read do serviço (resilience.TIMEOUTS)."""
+    conectar, ler = resilience.timeout(servico)
+    return httpx.Timeout(ler, connect=conectar)
+
+
+async def get_json(servico, url, hedge=False, **kwargs):
+    """GET limitado por serviço que devolve o JSON da resposta.
+
+    hedge=True (só para GETs idempotentes) dispara uma segunda cópia se
+    a primeira demorar; ver resilience.com_hedge.
+    """
+    kwargs.setdefault("timeout", timeout(servico))
+
+    async def fazer():
+        async with limite(servico):
+            response = await get_client().get(url, **kwargs)
+        if response.status_code >= 500 or response.status_code == 429:
+            response.raise_for_status()
+        return response.json()
+
+    if hedge:
+        return await resilience.com_hedge(servico, fazer)
+    return await fazer()
+
+
+# -------------------------------------------------------------------
+# LOOP DE FUNDO PARA OS WRAPPERS SÍNCRONOS
+# -------------------------------------------------------------------
+def _get_loop():
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="async-http", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run_sync(coro):
+    """Executa a corrotina no loop de fundo e espera o resultado.
+
+    É o que permite que get_weather/get_news continuem síncronos para as
+    threads do bot, enquanto todas as chamadas dividem um único loop e
+    um único pool de conexões.
+    """
+    loop = _get_loop()
+    try:
+        atual = asyncio.get_running_loop()
+    except RuntimeError:
+        atual = None
+    if atual is loop:
+        coro.close()
+        raise RuntimeError("run_sync não pode ser chamado de dentro do loop de fundo; use await")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
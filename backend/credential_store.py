@@ -0,0 +1,90 @@
+import os
+import json
+
+from dotenv import load_dotenv
+
+from backend.database import get_connection
+
+load_dotenv()
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+# chave Fernet usada para cifrar os tokens na tabela users; gere com
+#   python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"
+CREDENTIALS_KEY = os.getenv("CREDENTIALS_KEY")
+
+_fernet = None
+
+
+class ChaveAusente(RuntimeError):
+    """CREDENTIALS_KEY não configurada: não dá para gravar/ler tokens de usuários."""
+
+
+def _cifra():
+    global _fernet
+    if _fernet is None:
+        if not CREDENTIALS_KEY:
+            raise ChaveAusente("defina CREDENTIALS_KEY para guardar credenciais de usuários")
+        from cryptography.fernet import Fernet
+        _fernet = Fernet(CREDENTIALS_KEY.encode())
+    return _fernet
+
+
+def _cifrar(valor):
+    return _cifra().encrypt(valor.encode()).decode() if valor else None
+
+
+def _decifrar(valor):
+    return _cifra().decrypt(valor.encode()).decode() if valor else None
+
+
+# -------------------------------------------------------------------
+# API
+# -------------------------------------------------------------------
+def carregar(telegram_id):
+    """Dict no formato do Credentials.to_json() (sem client_id/secret) ou None."""
+    linha = get_connection().execute(
+        "SELECT access_token, refresh_token, token_expiry FROM users WHERE telegram_id = ?",
+        (str(telegram_id),),
+    ).fetchone()
+    if linha is None:
+        return None
+
+    access_token, refresh_token, token_expiry = linha
+    return {
+        "token": _decifrar(access_token),
+        "refresh_token": _decifrar(refresh_token),
+        "expiry": token_expiry,
+    }
+
+
+def salvar(telegram_id, creds_json, email=None):
+    """Grava (cifrado) o token de um usuário a partir do Credentials.to_json()."""
+    info = json.loads(creds_json)
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO users (telegram_id, access_token, refresh_token, token_expiry, email)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (telegram_id) DO UPDATE SET
+                access_token = excluded.access_token,
+                refresh_token = excluded.refresh_token,
+                token_expiry = excluded.token_expiry,
+                email = COALESCE(excluded.email, users.email)
+            """,
+            (
+                str(telegram_id),
+                _cifrar(info.get("token")),
+                _cifrar(info.get("refresh_token")),
+                info.get("expiry"),
+                email,
+            ),
+        )
+
+
+def remover(telegram_id):
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM users WHERE telegram_id = ?", (str(telegram_id),))
@@ -1,11 +1,137 @@
+import os
 import sqlite3
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+DATABASE_PATH = os.getenv("DATABASE_PATH", "database.db")
+
+# statements preparados mantidos por conexão (o padrão do sqlite3 é 128)
+CACHED_STATEMENTS = 256
+
+# quanto esperar (s) por um lock de escrita antes de dar erro
+BUSY_TIMEOUT = 10
+
+# versão do esquema (PRAGMA user_version); ver _migrar
+VERSAO_ESQUEMA = 4
+
+# lembretes pendentes (ver reminders.py); disparo/inicio em timestamp.
+# calendar_id é a chave do store de eventos: event_id só é único dentro do calendário
+_TABELA_REMINDERS = """
+    CREATE TABLE IF NOT EXISTS reminders (
+        calendar_id TEXT,
+        event_id TEXT,
+        chat_id INTEGER,
+        disparo REAL,
+        inicio REAL,
+        titulo TEXT,
+        atualizado REAL,
+        PRIMARY KEY (calendar_id, event_id)
+    )
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_tabelas_prontas = False
+
+
+# -------------------------------------------------------------------
+# CONEXÕES
+# -------------------------------------------------------------------
+def _conectar():
+    conn = sqlite3.connect(DATABASE_PATH, timeout=BUSY_TIMEOUT, cached_statements=CACHED_STATEMENTS)
+    # WAL: leitores não bloqueiam o escritor (workers do bot, lembretes, webhook)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
 
 def get_connection():
-    return sqlite3.connect("database.db")
+    """Conexão da thread atual, aberta uma vez e reaproveitada.
+
+    Cada worker do bot fica com a sua conexão (o sqlite3 não deixa dividir
+    uma conexão entre threads), então o custo de abrir o arquivo e os
+    statements preparados valem para todas as chamadas daquela thread.
+    Não feche a conexão devolvida; use `with conn:` para as escritas.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        garantir_tabelas()
+        conn = _local.conn = _conectar()
+    return conn
+
+
+def garantir_tabelas():
+    """Cria/migra as tabelas na primeira conexão do processo (idempotente)."""
+    global _tabelas_prontas
+    if _tabelas_prontas:
+        return
+    with _init_lock:
+        if not _tabelas_prontas:
+            create_tables()
+            _tabelas_prontas = True
+
+
+# -------------------------------------------------------------------
+# ESQUEMA
+# -------------------------------------------------------------------
+def _migrar(c):
+    versao = c.execute("PRAGMA user_version").fetchone()[0]
+    if versao < 1:
+        # v1: events/event_days passam a ser por calendário (um por usuário);
+        # são só cache do Google, então são recriados e ressincronizados
+        c.execute("DROP TABLE IF EXISTS event_days")
+        c.execute("DROP TABLE IF EXISTS events")
+        c.execute("DROP TABLE IF EXISTS sync_state")
+    if versao < 2:
+        # v2: chat_history guarda o resumo da conversa (ver prompt_budget.py)
+        existe = c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chat_history'").fetchone()
+        if existe:
+            c.execute("ALTER TABLE chat_history ADD COLUMN resumo TEXT")
+            c.execute("ALTER TABLE chat_history ADD COLUMN resumidas INTEGER DEFAULT 0")
+    if versao < 3:
+        # v3: reminders passa a ser por (calendar_id, event_id), com chat_id inteiro;
+        # o calendário dos lembretes pendentes vem do store de eventos
+        existe = c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'reminders'").fetchone()
+        if existe:
+            tem_eventos = c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events'").fetchone()
+            calendario = (
+                "COALESCE((SELECT e.calendar_id FROM events e WHERE e.event_id = r.event_id LIMIT 1), 'primary')"
+                if tem_eventos else "'primary'"
+            )
+            c.execute("ALTER TABLE reminders RENAME TO reminders_v2")
+            c.execute("DROP INDEX IF EXISTS idx_reminders_atualizado")
+            c.execute(_TABELA_REMINDERS)
+            c.execute(f"""
+                INSERT OR IGNORE INTO reminders (calendar_id, event_id, chat_id, disparo, inicio, titulo, atualizado)
+                SELECT {calendario}, r.event_id, CAST(r.chat_id AS INTEGER), r.disparo, r.inicio, r.titulo, r.atualizado
+                FROM reminders_v2 r
+            """)
+            c.execute("DROP TABLE reminders_v2")
+    if versao < 4:
+        # v4: a agenda do dono (CHAT_ID) tem uma chave só, "primary". Os
+        # lembretes gravados em "<CHAT_ID>/primary" passam para ela (e o
+        # REPLACE tira o duplicado); o cache de eventos dela é refeito
+        dono = os.getenv("CHAT_ID")
+        existe = c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'reminders'").fetchone()
+        if dono and existe:
+            antiga = f"{dono}/primary"
+            c.execute("UPDATE OR REPLACE reminders SET calendar_id = 'primary' WHERE calendar_id = ?", (antiga,))
+            for tabela in ("event_days", "events", "sync_state"):
+                if c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tabela,)).fetchone():
+                    c.execute(f"DELETE FROM {tabela} WHERE calendar_id = ?", (antiga,))
+    c.execute(f"PRAGMA user_version = {VERSAO_ESQUEMA}")
+
 
 def create_tables():
-    conn = get_connection()
+    conn = _conectar()
     c = conn.cursor()
+    _migrar(c)
 
     c.execute("""
         CREATE TABLE IF NOT EXISTS users (
@@ -17,7 +143,96 @@ def create_tables():
         )
     """)
 
+    # store local de eventos do Google Calendar (ver backend/event_store.py);
+    # calendar_id é a chave do store ("primary" ou "<telegram_id>/primary")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            calendar_id TEXT,
+            event_id TEXT,
+            summary TEXT,
+            inicio INTEGER,
+            fim INTEGER,
+            dados TEXT,
+            PRIMARY KEY (calendar_id, event_id)
+        )
+    """)
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS idx_events_intervalo
+        ON events (calendar_id, inicio, fim)
+    """)
+
+    # índice por dia: uma linha para cada dia local que o evento ocupa
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS event_days (
+            calendar_id TEXT,
+            dia TEXT,
+            event_id TEXT,
+            PRIMARY KEY (calendar_id, dia, event_id)
+        ) WITHOUT ROWID
+    """)
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS idx_event_days_evento
+        ON event_days (calendar_id, event_id)
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            calendar_id TEXT PRIMARY KEY,
+            sync_token TEXT,
+            ultima_sync REAL
+        )
+    """)
+
+    # cache persistente de geocoding do /tempo (ver weather.py)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            chave TEXT PRIMARY KEY,
+            lat REAL,
+            lon REAL,
+            nome TEXT,
+            pais TEXT
+        )
+    """)
+
+    # históricos de conversa despejados da memória (ver chat_memory.py)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS chat_history (
+            session_id TEXT PRIMARY KEY,
+            mensagens TEXT,
+            resumo TEXT,
+            resumidas INTEGER DEFAULT 0,
+            atualizado REAL
+        )
+    """)
+
+    # respostas do LLM em cache, quando LLM_CACHE_PERSISTIR=1 (ver response_cache.py)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            chave TEXT PRIMARY KEY,
+            texto TEXT,
+            latencia REAL,
+            tokens INTEGER,
+            criado REAL
+        )
+    """)
+
+    c.execute(_TABELA_REMINDERS)
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reminders_atualizado
+        ON reminders (atualizado)
+    """)
+
+    # resumo diário por chat (ver briefing.py); horario em HH:MM, temas em JSON
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS briefings (
+            chat_id TEXT PRIMARY KEY,
+            telegram_id TEXT,
+            horario TEXT,
+            cidade TEXT,
+            temas TEXT,
+            atualizado REAL
+        )
+    """)
+
     conn.commit()
     conn.close()
-
-create_tables()
@@ -0,0 +1,308 @@
+import os
+import json
+import time
+import datetime
+import threading
+
+import pytz
+
+from backend import title_index
+from backend.database import get_connection
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+# mesmo fuso usado pelo calendar_app para montar o índice por dia
+TZ = pytz.timezone("America/Sao_Paulo")
+
+# intervalo mínimo entre duas sincronizações incrementais
+SYNC_INTERVAL = 60
+
+# janela da sincronização completa (a mesma do /remover)
+FULL_SYNC_DIAS_PASSADO = 30
+
+# limita quantos dias um evento longo ocupa no índice
+MAX_DIAS_INDICE = 400
+
+# o dono do bot (CHAT_ID) usa o token.json, a mesma agenda de usuario=None
+# (como em google_service._chave)
+DONO = os.getenv("CHAT_ID")
+
+# só os campos que usamos, para respostas menores
+FIELDS = "items(id,status,summary,start,end,htmlLink),nextPageToken,nextSyncToken"
+
+# um lock por calendário (chave_calendario), só em volta das gravações locais
+_sync_locks = {}
+_sync_locks_lock = threading.Lock()
+
+
+def chave_calendario(calendar_id="primary", usuario=None):
+    """Chave do calendário no store: cada usuário tem o seu "primary"; o dono fica sem prefixo."""
+    if usuario is None or str(usuario) == DONO:
+        return calendar_id
+    return f"{usuario}/{calendar_id}"
+
+
+def _lock_do_calendario(chave):
+    lock = _sync_locks.get(chave)
+    if lock is None:
+        with _sync_locks_lock:
+            lock = _sync_locks.setdefault(chave, threading.Lock())
+    return lock
+
+
+# -------------------------------------------------------------------
+# CONVERSÃO DE HORÁRIOS
+# -------------------------------------------------------------------
+def _para_datetime(campo):
+    """Converte start/end do Calendar ({dateTime} ou {date}) em datetime aware."""
+    if "dateTime" in campo:
+        return datetime.datetime.fromisoformat(campo["dateTime"])
+    dia = datetime.date.fromisoformat(campo["date"])
+    return TZ.localize(datetime.datetime(dia.year, dia.month, dia.day))
+
+
+def _dias_do_evento(inicio, fim):
+    """Dias locais (YYYY-MM-DD) que o evento ocupa; o fim é exclusivo."""
+    primeiro = inicio.astimezone(TZ).date()
+    ultimo = (fim - datetime.timedelta(microseconds=1)).astimezone(TZ).date()
+    if ultimo < primeiro:
+        ultimo = primeiro
+
+    dias = []
+    dia = primeiro
+    while dia <= ultimo and len(dias) < MAX_DIAS_INDICE:
+        dias.append(dia.isoformat())
+        dia += datetime.timedelta(days=1)
+    return dias
+
+
+# -------------------------------------------------------------------
+# ESCRITA
+# -------------------------------------------------------------------
+def _gravar(c, ev, calendar_id):
+    inicio = _para_datetime(ev["start"])
+    fim = _para_datetime(ev.get("end", ev["start"]))
+
+    c.execute("DELETE FROM event_days WHERE calendar_id = ? AND event_id = ?", (calendar_id, ev["id"]))
+    c.execute(
+        """
+        INSERT OR REPLACE INTO events (calendar_id, event_id, summary, inicio, fim, dados)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (
+            calendar_id, ev["id"], ev.get("summary", ""),
+            int(inicio.timestamp()), int(fim.timestamp()), json.dumps(ev),
+        ),
+    )
+    c.executemany(
+        "INSERT OR IGNORE INTO event_days (calendar_id, dia, event_id) VALUES (?, ?, ?)",
+        [(calendar_id, dia, ev["id"]) for dia in _dias_do_evento(inicio, fim)],
+    )
+    title_index.ao_gravar(calendar_id, ev["id"], ev.get("summary", ""), int(inicio.timestamp()))
+
+
+def _apagar(c, event_id, calendar_id):
+    c.execute("DELETE FROM event_days WHERE calendar_id = ? AND event_id = ?", (calendar_id, event_id))
+    c.execute("DELETE FROM events WHERE calendar_id = ? AND event_id = ?", (calendar_id, event_id))
+    title_index.ao_apagar(calendar_id, event_id)
+
+
+def salvar_evento(ev, calendar_id="primary", usuario=None):
+    """Write-through: grava no store local um evento criado/alterado na API."""
+    chave = chave_calendario(calendar_id, usuario)
+    conn = get_connection()
+    with _lock_do_calendario(chave), conn:
+        _gravar(conn.cursor(), ev, chave)
+
+
+def remover_evento(event_id, calendar_id="primary", usuario=None):
+    """Write-through: apaga do store local um evento removido na API."""
+    chave = chave_calendario(calendar_id, usuario)
+    conn = get_connection()
+    with _lock_do_calendario(chave), conn:
+        _apagar(conn.cursor(), event_id, chave)
+
+
+# -------------------------------------------------------------------
+# SINCRONIZAÇÃO
+# -------------------------------------------------------------------
+def _aplicar_pagina(c, itens, chave):
+    for ev in itens:
+        if ev.get("status") == "cancelled":
+            _apagar(c, ev["id"], chave)
+        elif "start" in ev:
+            _gravar(c, ev, chave)
+
+
+def _listar_paginas(service, calendar_id, **params):
+    """Percorre todas as páginas e devolve o nextSyncToken da última."""
+    page_token = None
+    while True:
+        resultado = service.events().list(
+            calendarId=calendar_id,
+            singleEvents=True,
+            maxResults=2500,
+            fields=FIELDS,
+            pageToken=page_token,
+            **params,
+        ).execute()
+
+        yield resultado.get("items", []), resultado.get("nextSyncToken")
+
+        page_token = resultado.get("nextPageToken")
+        if not page_token:
+            return
+
+
+def _buscar_paginas(service, calendar_id, **params):
+    """Baixa todas as páginas antes de mexer no store: (itens, nextSyncToken)."""
+    itens = []
+    sync_token = None
+    for pagina, token in _listar_paginas(service, calendar_id, **params):
+        itens.extend(pagina)
+        sync_token = token or sync_token
+    return itens, sync_token
+
+
+def _aplicar(conn, chave, itens, sync_token, completa):
+    c = conn.cursor()
+    if completa:
+        c.execute("DELETE FROM event_days WHERE calendar_id = ?", (chave,))
+        c.execute("DELETE FROM events WHERE calendar_id = ?", (chave,))
+        title_index.descartar(chave)
+
+    _aplicar_pagina(c, itens, chave)
+    c.execute(
+        """
+        INSERT OR REPLACE INTO sync_state (calendar_id, sync_token, ultima_sync)
+        VALUES (?, ?, ?)
+        """,
+        (chave, sync_token, time.time()),
+    )
+    conn.commit()
+
+
+def _token_salvo(conn, chave):
+    return conn.execute(
+        "SELECT sync_token, ultima_sync FROM sync_state WHERE calendar_id = ?", (chave,)
+    ).fetchone()
+
+
+def sincronizar(service, calendar_id="primary", forcar=False, usuario=None):
+    """Traz as mudanças do Google Calendar para o store local.
+
+    Usa o syncToken salvo (sync incremental) e só refaz a sincronização
+    completa quando não há token ou quando o Google responde 410 (expirado).
+
+    As páginas são baixadas sem lock; o lock do calendário só cobre a
+    gravação local. Se outra thread gravou uma sync do mesmo calendário
+    enquanto esta baixava, o token salvo mudou e esta é descartada (a
+    outra já trouxe as mesmas mudanças, ou mais novas).
+    """
+    from googleapiclient.errors import HttpError
+
+    chave = chave_calendario(calendar_id, usuario)
+    conn = get_connection()
+    estado = _token_salvo(conn, chave)
+    if estado and not forcar and time.time() - estado[1] < SYNC_INTERVAL:
+        return
+
+    token = estado[0] if estado else None
+    completa = not token
+    if token:
+        try:
+            itens, novo_token = _buscar_paginas(service, calendar_id, syncToken=token)
+        except HttpError as e:
+            if e.resp.status != 410:
+                raise
+            print("Sync token expirado, refazendo sincronização completa.")
+            completa = True
+    if completa:
+        time_min = datetime.datetime.now(TZ) - datetime.timedelta(days=FULL_SYNC_DIAS_PASSADO)
+        itens, novo_token = _buscar_paginas(service, calendar_id, timeMin=time_min.isoformat())
+
+    with _lock_do_calendario(chave):
+        atual = _token_salvo(conn, chave)
+        if (atual[0] if atual else None) != token:
+            return
+        try:
+            _aplicar(conn, chave, itens, novo_token, completa)
+        except BaseException:
+            # a conexão é da thread e continua aberta: não deixa a sync pela metade
+            conn.rollback()
+            # o índice de títulos pode ter visto gravações que não ficaram
+            title_index.descartar(chave)
+            raise
+
+
+# -------------------------------------------------------------------
+# LEITURA
+# -------------------------------------------------------------------
+def _linhas_para_eventos(linhas):
+    eventos = []
+    for inicio, dados in linhas:
+        ev = json.loads(dados)
+        ev["_inicio"] = datetime.datetime.fromtimestamp(inicio, TZ)
+        eventos.append(ev)
+    return eventos
+
+
+def eventos_do_dia(dia, calendar_id="primary", usuario=None):
+    """Eventos que ocupam o dia local informado, ordenados pelo início."""
+    conn = get_connection()
+    linhas = conn.execute(
+        """
+        SELECT e.inicio, e.dados
+        FROM event_days d
+        JOIN events e ON e.calendar_id = d.calendar_id AND e.event_id = d.event_id
+        WHERE d.calendar_id = ? AND d.dia = ?
+        ORDER BY e.inicio
+        """,
+        (chave_calendario(calendar_id, usuario), dia.isoformat()),
+    ).fetchall()
+    return _linhas_para_eventos(linhas)
+
+
+def eventos_no_intervalo(inicio, fim, calendar_id="primary", usuario=None):
+    """Eventos que se sobrepõem a [inicio, fim), ordenados pelo início."""
+    conn = get_connection()
+    linhas = conn.execute(
+        """
+        SELECT inicio, dados FROM events
+        WHERE calendar_id = ? AND inicio < ? AND fim > ?
+        ORDER BY inicio
+        """,
+        (chave_calendario(calendar_id, usuario), int(fim.timestamp()), int(inicio.timestamp())),
+    ).fetchall()
+    return _linhas_para_eventos(linhas)
+
+
+def obter_evento(event_id, calendar_id="primary", usuario=None):
+    """Evento do store pelo id (com _inicio), ou None."""
+    conn = get_connection()
+    linha = conn.execute(
+        "SELECT inicio, dados FROM events WHERE calendar_id = ? AND event_id = ?",
+        (chave_calendario(calendar_id, usuario), event_id),
+    ).fetchone()
+    return _linhas_para_eventos([linha])[0] if linha else None
+
+
+def buscar_por_titulo(termo, inicio, fim, calendar_id="primary", usuario=None, limite=5):
+    """Eventos de [inicio, fim) com título parecido com o termo (sem acento, tolera erro de digitação).
+
+    Ordenados pela similaridade (em "_similaridade", de 0 a 1) e, no
+    empate, pela proximidade de agora.
+    """
+    agora = datetime.datetime.now(TZ).timestamp()
+    encontrados = title_index.buscar(
+        chave_calendario(calendar_id, usuario), termo, agora,
+        inicio_min=int(inicio.timestamp()), inicio_max=int(fim.timestamp()), limite=limite,
+    )
+    eventos = []
+    for event_id, similaridade, _ in encontrados:
+        ev = obter_evento(event_id, calendar_id, usuario)
+        if ev is not None:
+            ev["_similaridade"] = similaridade
+            eventos.append(ev)
+    return eventos
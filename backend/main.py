@@ -1,8 +1,81 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+import os
+import hmac
+import threading
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+import metrics
+
+load_dotenv()
+
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
 
 app = FastAPI()
 
+# o bot (handlers + dispatcher). Com `python app.py --webhook` e um worker,
+# o app.py entrega o seu com usar_bot() antes de subir o uvicorn: importar
+# o app de novo aqui criaria um segundo bot, fila de envio e agendadores,
+# porque lá ele roda como __main__. Só workers extras do uvicorn (processos
+# novos) criam o próprio bot no primeiro update.
+_bot = None
+_bot_lock = threading.Lock()
+
+
+def usar_bot(bot):
+    global _bot
+    with _bot_lock:
+        _bot = bot
+
+
+def get_bot():
+    global _bot
+    if _bot is None:
+        with _bot_lock:
+            if _bot is None:
+                import app as mia
+                _bot = mia.criar_bot()
+    return _bot
+
+
+def _secret_valido(recebido):
+    esperado = WEBHOOK_SECRET
+    return bool(esperado) and recebido is not None and hmac.compare_digest(recebido, esperado)
+
+
 @app.get("/")
 def home():
     return {"status": "Backend da MIA está rodando"}
+
+
+@app.get("/metrics")
+def metricas():
+    """Métricas no formato texto do Prometheus.
+
+    Com um worker é o mesmo registro do METRICS_PORT (o uvicorn roda no
+    processo do bot); com mais, cada worker responde com as suas, inclusive
+    as dos handlers que rodaram nele. O texto só é montado no scrape.
+    """
+    return PlainTextResponse(metrics.exportar(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/telegram/webhook")
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: str | None = Header(default=None),
+):
+    """Recebe updates do Telegram e entrega aos mesmos handlers do polling.
+
+    O update só é enfileirado no dispatcher do bot; a resposta 200 volta
+    na hora e o processamento segue nos workers, por chat.
+    """
+    if not _secret_valido(x_telegram_bot_api_secret_token):
+        raise HTTPException(status_code=403, detail="secret token inválido")
+
+    import telebot
+
+    dados = await request.json()
+    update = telebot.types.Update.de_json(dados)
+    get_bot().process_new_updates([update])
+    return JSONResponse({"ok": True})
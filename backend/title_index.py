@@ -0,0 +1,260 @@
+import re
+import math
+import bisect
+import time
+import threading
+from collections import OrderedDict
+
+from backend.database import get_connection
+from text_utils import normalizar_texto
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+# fração dos trigramas da busca que o título precisa ter ("dentsta" ~ "dentista")
+LIMIAR_SIMILARIDADE = 0.5
+
+# outros processos (workers do webhook) também gravam no store; o índice
+# do processo é refeito do SQLite depois disso
+TITULOS_TTL = 300
+
+# calendários com índice na memória (LRU)
+TITULOS_MAX_CALENDARIOS = 200
+
+_PALAVRAS = re.compile(r"\w+")
+
+
+def trigramas(texto):
+    """Trigramas no estilo do pg_trgm: por palavra, sem acento, com "  " antes e " " depois."""
+    resultado = set()
+    for palavra in _PALAVRAS.findall(normalizar_texto(texto)):
+        p = f"  {palavra} "
+        resultado.update(p[i:i + 3] for i in range(len(p) - 2))
+    return resultado
+
+
+def _normalizar(titulo):
+    return " ".join(_PALAVRAS.findall(normalizar_texto(titulo)))
+
+
+class _Titulo:
+    __slots__ = ("trigramas", "ocorrencias")
+
+    def __init__(self, texto):
+        self.trigramas = frozenset(trigramas(texto))
+        self.ocorrencias = []  # [(inicio, event_id)] ordenado
+
+
+class IndiceDeTitulos:
+    """Índice invertido trigrama -> títulos de um calendário.
+
+    Os trigramas apontam para títulos distintos (já sem acento), e cada
+    título guarda suas ocorrências ordenadas pelo início: um evento
+    recorrente com centenas de instâncias custa uma entrada só na busca,
+    e a instância mais próxima de agora sai por bisect.
+
+    A busca usa filtro por prefixo: com limiar s, um título parecido tem
+    que conter pelo menos um dos (n - ceil(s*n) + 1) trigramas mais raros
+    da consulta, então só essas listas são percorridas; a similaridade
+    exata é calculada só para esses candidatos.
+    """
+
+    def __init__(self):
+        self._eventos = {}   # event_id -> (título normalizado, inicio)
+        self._titulos = {}   # título normalizado -> _Titulo
+        self._postings = {}  # trigrama -> set(título normalizado)
+        self.criado_em = time.monotonic()
+
+    def __len__(self):
+        return len(self._eventos)
+
+    def adicionar(self, event_id, titulo, inicio):
+        self.remover(event_id)
+        chave = _normalizar(titulo)
+        entrada = self._titulos.get(chave)
+        if entrada is None:
+            entrada = self._titulos[chave] = _Titulo(chave)
+            for t in entrada.trigramas:
+                self._postings.setdefault(t, set()).add(chave)
+        bisect.insort(entrada.ocorrencias, (inicio, event_id))
+        self._eventos[event_id] = (chave, inicio)
+
+    def remover(self, event_id):
+        anterior = self._eventos.pop(event_id, None)
+        if anterior is None:
+            return
+        chave, inicio = anterior
+        entrada = self._titulos[chave]
+        i = bisect.bisect_left(entrada.ocorrencias, (inicio, event_id))
+        del entrada.ocorrencias[i]
+        if entrada.ocorrencias:
+            return
+        del self._titulos[chave]
+        for t in entrada.trigramas:
+            chaves = self._postings.get(t)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._postings[t]
+
+    @staticmethod
+    def _mais_proxima(ocorrencias, agora, inicio_min, inicio_max):
+        """Ocorrência em [inicio_min, inicio_max) mais próxima de agora, ou None."""
+        lo = 0 if inicio_min is None else bisect.bisect_left(ocorrencias, (inicio_min,))
+        hi = len(ocorrencias) if inicio_max is None else bisect.bisect_left(ocorrencias, (inicio_max,))
+        if lo >= hi:
+            return None
+        i = bisect.bisect_left(ocorrencias, (agora,), lo, hi)
+        if i == lo:
+            return ocorrencias[lo]
+        if i == hi:
+            return ocorrencias[hi - 1]
+        antes, depois = ocorrencias[i - 1], ocorrencias[i]
+        return antes if abs(antes[0] - agora) <= abs(depois[0] - agora) else depois
+
+    def buscar(self, termo, agora, inicio_min=None, inicio_max=None, limiar=LIMIAR_SIMILARIDADE, limite=5):
+        """[(event_id, similaridade, inicio)] por similaridade e, no empate, proximidade de `agora`.
+
+        Entram os títulos com pelo menos `limiar` dos trigramas da busca
+        ("consulta" acha "Consulta cardiologista"); a similaridade devolvida
+        é a de Jaccard (comuns / união), que só chega perto de 1 quando o
+        título inteiro bate: "reu" contido em "Reunião" dá 0.19, não 1.0.
+        Devolve uma ocorrência por título (a mais próxima de `agora` dentro
+        da janela), até `limite` títulos.
+        """
+        consulta = trigramas(termo)
+        if not consulta:
+            return []
+
+        minimo = math.ceil(limiar * len(consulta))
+        raros = sorted(consulta, key=lambda t: len(self._postings.get(t, ())))
+        candidatos = set()
+        for t in raros[:len(consulta) - minimo + 1]:
+            candidatos.update(self._postings.get(t, ()))
+
+        # agrupa pela similaridade; a ocorrência mais próxima só é
+        # procurada nos grupos mais parecidos, até completar o limite
+        grupos = {}
+        for chave in candidatos:
+            trigramas_titulo = self._titulos[chave].trigramas
+            comum = len(consulta & trigramas_titulo)
+            if comum >= minimo:
+                similaridade = round(comum / (len(consulta) + len(trigramas_titulo) - comum), 2)
+                grupos.setdefault(similaridade, []).append(chave)
+
+        resultado = []
+        for similaridade in sorted(grupos, reverse=True):
+            grupo = []
+            for chave in grupos[similaridade]:
+                ocorrencia = self._mais_proxima(self._titulos[chave].ocorrencias, agora, inicio_min, inicio_max)
+                if ocorrencia is not None:
+                    grupo.append((ocorrencia[1], similaridade, ocorrencia[0]))
+            grupo.sort(key=lambda r: abs(r[2] - agora))
+            resultado.extend(grupo)
+            if len(resultado) >= limite:
+                break
+        return resultado[:limite]
+
+
+# -------------------------------------------------------------------
+# ÍNDICES POR CALENDÁRIO (chave do event_store)
+# -------------------------------------------------------------------
+_indices = OrderedDict()
+_carregando = {}  # chave -> [registro de escritas de cada carga em andamento]
+_lock = threading.Lock()
+
+
+def _registrar(chave, *operacao):
+    """Anota a escrita nas cargas em andamento do calendário (com _lock)."""
+    for registro in _carregando.get(chave, ()):
+        registro.append(operacao)
+
+
+def _carregar(chave):
+    indice = IndiceDeTitulos()
+    linhas = get_connection().execute(
+        "SELECT event_id, summary, inicio FROM events WHERE calendar_id = ?", (chave,)
+    ).fetchall()
+    for event_id, summary, inicio in linhas:
+        indice.adicionar(event_id, summary or "", inicio)
+    return indice
+
+
+def _indice(chave):
+    """Índice do calendário, montado do SQLite na primeira busca ou depois do TTL.
+
+    A leitura do SQLite roda fora do _lock; as escritas que chegam nesse
+    meio tempo ficam num registro e são reaplicadas antes de instalar o
+    índice (a gravação pode não estar no snapshot lido). Um descartar()
+    durante a carga impede a instalação: o índice serve só a esta busca.
+    """
+    with _lock:
+        indice = _indices.get(chave)
+        if indice is not None and time.monotonic() - indice.criado_em <= TITULOS_TTL:
+            _indices.move_to_end(chave)
+            return indice
+        registro = []
+        _carregando.setdefault(chave, []).append(registro)
+
+    try:
+        indice = _carregar(chave)
+    except BaseException:
+        with _lock:
+            _fim_da_carga(chave, registro)
+        raise
+
+    with _lock:
+        _fim_da_carga(chave, registro)
+        descartado = False
+        for operacao, *args in registro:
+            if operacao == "gravar":
+                indice.adicionar(*args)
+            elif operacao == "apagar":
+                indice.remover(*args)
+            else:
+                descartado = True
+
+        if not descartado:
+            _indices[chave] = indice
+            _indices.move_to_end(chave)
+            while len(_indices) > TITULOS_MAX_CALENDARIOS:
+                _indices.popitem(last=False)
+    return indice
+
+
+def _fim_da_carga(chave, registro):
+    cargas = _carregando[chave]
+    cargas.remove(registro)
+    if not cargas:
+        del _carregando[chave]
+
+
+def buscar(chave, termo, agora, **kwargs):
+    indice = _indice(chave)
+    with _lock:
+        return indice.buscar(termo, agora, **kwargs)
+
+
+# o event_store chama estas a cada escrita; calendários sem índice
+# carregado são ignorados (serão lidos do SQLite quando preciso)
+def ao_gravar(chave, event_id, titulo, inicio):
+    with _lock:
+        _registrar(chave, "gravar", event_id, titulo, inicio)
+        indice = _indices.get(chave)
+        if indice is not None:
+            indice.adicionar(event_id, titulo, inicio)
+
+
+def ao_apagar(chave, event_id):
+    with _lock:
+        _registrar(chave, "apagar", event_id)
+        indice = _indices.get(chave)
+        if indice is not None:
+            indice.remover(event_id)
+
+
+def descartar(chave):
+    """Esquece o índice (sync completa, rollback): volta a ser lido do SQLite."""
+    with _lock:
+        _registrar(chave, "descartar")
+        _indices.pop(chave, None)
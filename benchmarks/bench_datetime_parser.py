@@ -0,0 +1,80 @@
+"""Benchmark e corpus de acurácia do parser de datas PT-BR.
+
+Roda o corpus de benchmarks/corpus_datas.json (frases de criação de
+evento, futuro=True) contra o horário de referência gravado nele, reporta acertos e a taxa do caminho rápido,
+e mede chamadas/s sem memoização (frio), com memoização (quente) e
+usando só o dateparser como referência.
+
+    python benchmarks/bench_datetime_parser.py [repeticoes]
+"""
+import os
+import sys
+import json
+import time
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import datetime_parser
+
+CORPUS = os.path.join(os.path.dirname(__file__), "corpus_datas.json")
+
+
+def carregar_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = json.load(f)
+    agora = datetime.datetime.fromisoformat(corpus["agora"]).astimezone(datetime_parser.TZ)
+    return agora, corpus["casos"]
+
+
+def acuracia(agora, casos):
+    datetime_parser.limpar_cache()
+    erros = []
+    for caso in casos:
+        resultado = datetime_parser.parse_datetime(caso["frase"], now=agora, futuro=True)
+        obtido = resultado.isoformat() if resultado else None
+        if obtido != caso["esperado"]:
+            erros.append((caso["frase"], caso["esperado"], obtido))
+
+    stats = datetime_parser.estatisticas()
+    acertos = len(casos) - len(erros)
+    print(f"acurácia: {acertos}/{len(casos)} ({acertos / len(casos):.1%})")
+    print(f"caminho rápido: {stats['rapido']}/{stats['chamadas']} ({stats['rapido'] / stats['chamadas']:.1%})")
+    for frase, esperado, obtido in erros:
+        print(f"  ERRO {frase!r}: esperado {esperado}, obtido {obtido}")
+
+
+def medir(nome, fn, frases, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for frase in frases:
+            fn(frase)
+    total = time.perf_counter() - inicio
+    print(f"{nome:<22} {repeticoes * len(frases) / total:12.0f} chamadas/s")
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    agora, casos = carregar_corpus()
+    frases = [caso["frase"] for caso in casos]
+
+    acuracia(agora, casos)
+
+    # frio: limpa a memoização antes de cada frase, mas o dateparser já está importado
+    def frio(frase):
+        datetime_parser.limpar_cache()
+        datetime_parser.parse_datetime(frase, now=agora, futuro=True)
+
+    def quente(frase):
+        datetime_parser.parse_datetime(frase, now=agora, futuro=True)
+
+    def so_dateparser(frase):
+        datetime_parser._fallback(frase.lower(), agora, True)
+
+    medir("só dateparser", so_dateparser, frases, max(1, repeticoes // 20))
+    medir("parser (frio)", frio, frases, max(1, repeticoes // 20))
+    medir("parser (quente)", quente, frases, repeticoes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark do dispatcher por chat contra backends simulados.
+
+Cada "mensagem" dorme o tempo típico do backend que ela usaria (LLM
+lento, calendar/tempo/notícias rápidos). Compara o processamento em
+série (como o polling antigo) com o ChatDispatcher, reportando vazão,
+latência p50/p95 por tipo e se a ordem dentro de cada chat foi mantida.
+
+    python benchmarks/bench_dispatcher.py [chats] [mensagens_por_chat]
+"""
+import os
+import sys
+import time
+import random
+import threading
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dispatcher import ChatDispatcher
+
+# latências simuladas (segundos), escaladas para o benchmark rodar rápido
+LATENCIAS = {"llm": 0.200, "calendar": 0.030, "tempo": 0.015, "noticias": 0.020}
+MIX = ["llm"] * 4 + ["calendar"] * 3 + ["tempo"] * 2 + ["noticias"]
+
+
+def gerar_carga(chats, por_chat, seed=42):
+    aleatorio = random.Random(seed)
+    carga = []
+    for seq in range(por_chat):
+        for chat_id in range(chats):
+            carga.append((chat_id, seq, aleatorio.choice(MIX)))
+    return carga
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def rodar(nome, carga, executar):
+    latencias = defaultdict(list)
+    ordem = defaultdict(list)
+    lock = threading.Lock()
+    fim = threading.Event()
+    restantes = [len(carga)]
+
+    def tratar(chat_id, seq, tipo, chegada):
+        time.sleep(LATENCIAS[tipo])
+        with lock:
+            latencias[tipo].append(time.perf_counter() - chegada)
+            ordem[chat_id].append(seq)
+            restantes[0] -= 1
+            if restantes[0] == 0:
+                fim.set()
+
+    inicio = time.perf_counter()
+    executar(carga, tratar)
+    fim.wait()
+    total = time.perf_counter() - inicio
+
+    em_ordem = all(seqs == sorted(seqs) for seqs in ordem.values())
+    print(f"\n{nome}: {len(carga) / total:.1f} msg/s, total {total:.2f}s, ordem por chat ok: {em_ordem}")
+    for tipo, valores in sorted(latencias.items()):
+        print(f"  {tipo:<9} p50 {percentil(valores, 0.50) * 1000:8.1f} ms   p95 {percentil(valores, 0.95) * 1000:8.1f} ms")
+
+
+def serial(carga, tratar):
+    chegada = time.perf_counter()
+    for chat_id, seq, tipo in carga:
+        tratar(chat_id, seq, tipo, chegada)
+
+
+def com_dispatcher(workers):
+    def executar(carga, tratar):
+        dispatcher = ChatDispatcher(max_workers=workers, max_pendentes=len(carga))
+        # todas as mensagens "chegam" juntas, como um lote de getUpdates
+        chegada = time.perf_counter()
+        for chat_id, seq, tipo in carga:
+            dispatcher.submit(chat_id, tratar, chat_id, seq, tipo, chegada)
+    return executar
+
+
+def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    por_chat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    carga = gerar_carga(chats, por_chat)
+
+    rodar("série (polling antigo)", carga, serial)
+    for workers in (4, 8, 16):
+        rodar(f"dispatcher ({workers} workers)", carga, com_dispatcher(workers))
+
+
+if __name__ == "__main__":
+    main()
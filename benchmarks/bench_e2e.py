@@ -0,0 +1,235 @@
+"""Teste de carga ponta a ponta do bot contra fakes locais (benchmarks/fakes.py).
+
+Sobe Telegram, OpenAI, Google Calendar, OpenWeather e GNews falsos,
+aponta o app para eles e cria o bot de verdade (handlers, dispatcher,
+cache, SQLite). Cada chat simulado manda uma mensagem, espera a resposta
+final chegar no Telegram fake e manda a próxima, numa mistura de /marcar,
+/listar, /remover, /tempo, /noticias e conversa livre. No fim mostra a
+vazão e a latência p50/p95/p99 por comando (até a resposta final) e o
+tempo até a primeira mensagem do bot.
+
+    python benchmarks/bench_e2e.py [--chats 50] [--mensagens 10] [--llm-primeiro-token 0.3]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import contextlib
+import tempfile
+import threading
+from collections import defaultdict
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakes import Latencias, iniciar_fakes, variaveis_de_ambiente, total_de_chamadas
+
+# pesos de cada comando na carga
+MIX = {"chat": 35, "marcar": 15, "listar": 15, "remover": 10, "tempo": 15, "noticias": 10}
+
+TITULOS = ["dentista", "academia", "consulta médica", "almoço com ana", "entrega do tcc", "revisão do carro"]
+CIDADES = ["são paulo", "rio de janeiro", "curitiba", "recife", "porto alegre", "salvador", "manaus", "natal"]
+TEMAS = ["tecnologia", "economia", "esportes", "ciência", "educação"]
+PERGUNTAS = [
+    "como organizo melhor minha semana?",
+    "me dá uma dica para estudar à noite",
+    "o que é a técnica pomodoro?",
+    "como priorizar tarefas urgentes?",
+]
+
+PRIMEIRO_CHAT = 1000
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+# -------------------------------------------------------------------
+# AMBIENTE
+# -------------------------------------------------------------------
+def preparar_ambiente(pasta, fakes, chats):
+    """Aponta o app para os fakes e cria credenciais para cada chat simulado."""
+    from cryptography.fernet import Fernet
+
+    os.environ.update(variaveis_de_ambiente(fakes))
+    os.environ.update({
+        "API_BOT_TOKEN": "123456:fake",
+        "CHAT_ID": "1",
+        "CREDENTIALS_KEY": Fernet.generate_key().decode(),
+        "DATABASE_PATH": os.path.join(pasta, "database.db"),
+    })
+    os.chdir(pasta)
+    with open("credentials.json", "w") as f:
+        json.dump({"installed": {"client_id": "fake", "client_secret": "fake"}}, f)
+
+    from backend import credential_store
+    expiry = (datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%S")
+    for chat_id in range(PRIMEIRO_CHAT, PRIMEIRO_CHAT + chats):
+        credential_store.salvar(chat_id, json.dumps({
+            "token": f"token-{chat_id}", "refresh_token": "fake", "expiry": expiry + "Z",
+        }))
+
+
+def criar_update(update_id, chat_id, texto):
+    import telebot
+
+    dados = {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": int(time.time()), "text": texto,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": f"chat{chat_id}"},
+        },
+    }
+    if texto.startswith("/"):
+        comando = texto.split()[0]
+        dados["message"]["entities"] = [{"type": "bot_command", "offset": 0, "length": len(comando)}]
+    return telebot.types.Update.de_json(dados)
+
+
+# -------------------------------------------------------------------
+# CARGA
+# -------------------------------------------------------------------
+class Chat:
+    """Um usuário simulado: manda uma mensagem e espera a resposta final."""
+
+    def __init__(self, chat_id, aleatorio):
+        self.chat_id = chat_id
+        self.aleatorio = aleatorio
+        self.titulos = []
+        self.resposta = threading.Event()
+        self.primeira = None
+
+    def proxima(self):
+        comando = self.aleatorio.choices(list(MIX), weights=list(MIX.values()))[0]
+        a = self.aleatorio
+        if comando == "marcar":
+            titulo = a.choice(TITULOS)
+            self.titulos.append(titulo)
+            dia = datetime.date.today() + datetime.timedelta(days=a.randint(1, 20))
+            return comando, f"/marcar {titulo} {dia.day:02d}/{dia.month:02d} às {a.randint(8, 18)}h"
+        if comando == "listar":
+            dia = datetime.date.today() + datetime.timedelta(days=a.randint(0, 20))
+            return comando, f"/listar {dia.strftime('%d/%m/%Y')}"
+        if comando == "remover":
+            titulo = self.titulos.pop(0) if self.titulos else a.choice(TITULOS)
+            return comando, f"/remover {titulo}"
+        if comando == "tempo":
+            return comando, f"/tempo {a.choice(CIDADES)}"
+        if comando == "noticias":
+            return comando, f"/noticias {a.choice(TEMAS)}"
+        return comando, a.choice(PERGUNTAS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--mensagens", type=int, default=10, help="mensagens por chat")
+    parser.add_argument("--telegram", type=float, default=Latencias().telegram)
+    parser.add_argument("--llm-primeiro-token", type=float, default=Latencias().openai_primeiro_token)
+    parser.add_argument("--llm-token", type=float, default=Latencias().openai_token)
+    parser.add_argument("--calendar", type=float, default=Latencias().calendar)
+    parser.add_argument("--openweather", type=float, default=Latencias().openweather)
+    parser.add_argument("--gnews", type=float, default=Latencias().gnews)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="mostra os prints do bot durante a carga")
+    args = parser.parse_args()
+
+    fakes = iniciar_fakes(Latencias(
+        args.telegram, args.llm_primeiro_token, args.llm_token,
+        args.calendar, args.openweather, args.gnews,
+    ))
+
+    with tempfile.TemporaryDirectory() as pasta:
+        preparar_ambiente(pasta, fakes, args.chats)
+
+        import app
+        from streaming import PLACEHOLDER, CURSOR
+
+        app.preparar_llm()  # o import do LangChain não entra na medição
+        bot = app.criar_bot()
+
+        chats = {
+            chat_id: Chat(chat_id, random.Random(args.seed + chat_id))
+            for chat_id in range(PRIMEIRO_CHAT, PRIMEIRO_CHAT + args.chats)
+        }
+
+        def ao_enviar(chat_id, metodo, texto):
+            chat = chats.get(chat_id)
+            if chat is None:
+                return
+            if chat.primeira is None:
+                chat.primeira = time.perf_counter()
+            final = (
+                (metodo == "sendMessage" and texto != PLACEHOLDER)
+                or (metodo == "editMessageText" and not texto.endswith(CURSOR))
+                or metodo == "sendDocument"
+            )
+            if final:
+                chat.resposta.set()
+
+        fakes.telegram.ao_enviar = ao_enviar
+
+        resultados = defaultdict(list)   # comando -> [(latência, primeira mensagem)]
+        sem_resposta = defaultdict(int)
+        ids = iter(range(1, 1 << 62))
+        ids_lock = threading.Lock()
+
+        def rodar_chat(chat):
+            for _ in range(args.mensagens):
+                comando, texto = chat.proxima()
+                with ids_lock:
+                    update = criar_update(next(ids), chat.chat_id, texto)
+                chat.resposta.clear()
+                chat.primeira = None
+
+                inicio = time.perf_counter()
+                bot.process_new_updates([update])
+                if not chat.resposta.wait(60):
+                    sem_resposta[comando] += 1
+                    continue
+                fim = time.perf_counter()
+                resultados[comando].append((fim - inicio, (chat.primeira or fim) - inicio))
+
+        silencio = open(os.devnull, "w") if not args.verbose else None
+        with contextlib.redirect_stdout(silencio or sys.stdout):
+            inicio = time.perf_counter()
+            threads = [threading.Thread(target=rodar_chat, args=(chat,)) for chat in chats.values()]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            duracao = time.perf_counter() - inicio
+        if silencio is not None:
+            silencio.close()
+
+        total = sum(len(v) for v in resultados.values())
+        print(f"{args.chats} chats x {args.mensagens} mensagens em {duracao:.1f}s "
+              f"-> {total / duracao:.1f} respostas/s")
+        print(f"{'comando':<10} {'n':>5} {'sem resp.':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'1ª msg p50':>11}  (ms)")
+        for comando in MIX:
+            medidas = resultados.get(comando, [])
+            if not medidas:
+                continue
+            latencias = [m[0] * 1000 for m in medidas]
+            primeiras = [m[1] * 1000 for m in medidas]
+            print(
+                f"{comando:<10} {len(medidas):>5} {sem_resposta[comando]:>9} "
+                f"{percentil(latencias, 0.50):>8.0f} {percentil(latencias, 0.95):>8.0f} "
+                f"{percentil(latencias, 0.99):>8.0f} {percentil(primeiras, 0.50):>11.0f}"
+            )
+
+        print("\nchamadas aos fakes:")
+        for nome, chamadas in total_de_chamadas(fakes).items():
+            print(f"  {nome:<12} {sum(chamadas.values()):>6}  {dict(sorted(chamadas.items()))}")
+
+        os.chdir(RAIZ)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark: service do Google Calendar no caminho frio vs quente.
+
+Compara o fluxo antigo (ler token.json + build() a cada comando) com o
+cache de google_service. Usa um token falso com expiração distante, então
+não faz nenhuma chamada de rede.
+
+    python benchmarks/bench_google_service.py [repeticoes]
+"""
+import os
+import sys
+import json
+import time
+import datetime
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+import google_service
+
+
+def criar_token_falso(pasta):
+    expiry = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+    token = {
+        "token": "token-falso",
+        "refresh_token": "refresh-falso",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "client_id": "cliente",
+        "client_secret": "segredo",
+        "scopes": google_service.SCOPES,
+        "expiry": expiry.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    caminho = os.path.join(pasta, "token.json")
+    with open(caminho, "w") as f:
+        json.dump(token, f)
+    return caminho
+
+
+def fluxo_antigo(token_file):
+    creds = Credentials.from_authorized_user_file(token_file, google_service.SCOPES)
+    return build("calendar", "v3", credentials=creds)
+
+
+def medir(nome, fn, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        fn()
+    total = time.perf_counter() - inicio
+    print(f"{nome:<28} {total / repeticoes * 1000:10.3f} ms/chamada")
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    with tempfile.TemporaryDirectory() as pasta:
+        token_file = criar_token_falso(pasta)
+
+        def frio():
+            google_service.limpar_cache()
+            google_service.get_calendar_service(token_file=token_file)
+
+        def quente():
+            google_service.get_calendar_service(token_file=token_file)
+
+        medir("antigo (build a cada vez)", lambda: fluxo_antigo(token_file), repeticoes)
+        medir("cache frio", frio, repeticoes)
+        google_service.get_calendar_service(token_file=token_file)
+        medir("cache quente", quente, repeticoes * 100)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Benchmark de importação/exportação ICS contra um Calendar simulado.
+
+O stand-in imita o custo de rede do Google: cada requisição HTTP (um
+insert avulso ou um batch inteiro) paga LATENCIA_RTT, e cada evento dentro
+dela paga LATENCIA_ITEM. Compara insert um a um (como o create_event_from_text)
+com a importação em lotes e mede a exportação em streaming.
+
+    python benchmarks/bench_ics.py [eventos]
+"""
+import os
+import sys
+import time
+import tempfile
+import datetime
+import itertools
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ics_io
+
+LATENCIA_RTT = 0.030
+LATENCIA_ITEM = 0.0005
+
+
+# -------------------------------------------------------------------
+# STAND-IN DO CALENDAR
+# -------------------------------------------------------------------
+class _Requisicao:
+    def __init__(self, servico, metodo, kwargs):
+        self.servico = servico
+        self.metodo = metodo
+        self.kwargs = kwargs
+
+    def _resultado(self):
+        if self.metodo == "insert":
+            body = dict(self.kwargs["body"])
+            body["id"] = f"ev{next(self.servico.ids)}"
+            self.servico.eventos.append(body)
+            return body
+        # list: pagina os eventos guardados
+        inicio = int(self.kwargs.get("pageToken") or 0)
+        fim = inicio + self.kwargs.get("maxResults", 250)
+        pagina = {"items": self.servico.eventos[inicio:fim]}
+        if fim < len(self.servico.eventos):
+            pagina["nextPageToken"] = str(fim)
+        return pagina
+
+    def execute(self):
+        time.sleep(LATENCIA_RTT + LATENCIA_ITEM)
+        return self._resultado()
+
+
+class _Batch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.itens = []
+
+    def add(self, requisicao, request_id):
+        self.itens.append((request_id, requisicao))
+
+    def execute(self):
+        time.sleep(LATENCIA_RTT + LATENCIA_ITEM * len(self.itens))
+        for request_id, requisicao in self.itens:
+            self.callback(request_id, requisicao._resultado(), None)
+
+
+class CalendarFalso:
+    def __init__(self):
+        self.eventos = []
+        self.ids = itertools.count()
+
+    def events(self):
+        return self
+
+    def insert(self, **kwargs):
+        return _Requisicao(self, "insert", kwargs)
+
+    def list(self, **kwargs):
+        return _Requisicao(self, "list", kwargs)
+
+    def new_batch_http_request(self, callback):
+        return _Batch(callback)
+
+
+# -------------------------------------------------------------------
+# BENCHMARK
+# -------------------------------------------------------------------
+def gerar_ics(caminho, quantidade):
+    base = datetime.datetime(2026, 1, 5, 8, 0)
+    with open(caminho, "w", encoding="utf-8", newline="") as f:
+        f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n")
+        for i in range(quantidade):
+            inicio = base + datetime.timedelta(hours=3 * i)
+            fim = inicio + datetime.timedelta(minutes=45)
+            f.write(
+                "BEGIN:VEVENT\r\n"
+                f"UID:{i}@bench\r\n"
+                f"DTSTART;TZID=America/Sao_Paulo:{inicio:%Y%m%dT%H%M%S}\r\n"
+                f"DTEND;TZID=America/Sao_Paulo:{fim:%Y%m%dT%H%M%S}\r\n"
+                f"SUMMARY:Reunião {i}\\, equipe\r\n"
+                "DESCRIPTION:Linha 1\\nLinha 2 com um texto um pouco mais longo para for\r\n"
+                " çar a dobra de linha do ICS\r\n"
+                "END:VEVENT\r\n"
+            )
+        f.write("END:VCALENDAR\r\n")
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    # o store local é write-through; aqui só o custo da API interessa
+    ics_io.event_store.salvar_evento = lambda ev, calendar_id="primary", usuario=None: None
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "agenda.ics")
+        gerar_ics(caminho, quantidade)
+
+        inicio = time.perf_counter()
+        with open(caminho, encoding="utf-8") as f:
+            bodies = [ics_io.vevent_para_body(v) for v in ics_io.ler_vevents(f)]
+        total = time.perf_counter() - inicio
+        print(f"parse ICS            {len(bodies) / total:12.0f} eventos/s")
+
+        servico = CalendarFalso()
+        amostra = bodies[:min(len(bodies), 100)]
+        inicio = time.perf_counter()
+        for body in amostra:
+            servico.events().insert(calendarId="primary", body=body).execute()
+        total = time.perf_counter() - inicio
+        print(f"insert um a um       {len(amostra) / total:12.0f} eventos/s  (amostra de {len(amostra)})")
+
+        servico = CalendarFalso()
+        inicio = time.perf_counter()
+        with open(caminho, encoding="utf-8") as f:
+            resultado = ics_io.importar_ics(f, servico)
+        total = time.perf_counter() - inicio
+        print(f"importação em lotes  {len(resultado.importados) / total:12.0f} eventos/s  ({len(resultado.falhas)} falhas)")
+
+        destino = os.path.join(pasta, "export.ics")
+        inicio = time.perf_counter()
+        with open(destino, "w", encoding="utf-8", newline="") as f:
+            exportados = ics_io.exportar_ics(
+                servico, datetime.datetime(2026, 1, 1), datetime.datetime(2027, 1, 1), f,
+            )
+        total = time.perf_counter() - inicio
+        print(f"exportação           {exportados / total:12.0f} eventos/s")
+
+
+if __name__ == "__main__":
+    main()
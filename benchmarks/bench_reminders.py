@@ -0,0 +1,69 @@
+"""Benchmark do TimerHeap dos lembretes.
+
+Agenda N timers espalhados por alguns segundos, cancela metade e mede o
+custo de agendar/cancelar e o atraso de disparo (p50/p95/p99) com um
+único thread de timers.
+
+    python benchmarks/bench_reminders.py [timers] [janela_segundos]
+"""
+import os
+import sys
+import time
+import random
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from reminders import TimerHeap
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    janela = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+
+    aleatorio = random.Random(42)
+    timers = TimerHeap("bench")
+    atrasos = []
+    lock = threading.Lock()
+    esperados = total - total // 2
+    fim = threading.Event()
+
+    def disparar(previsto):
+        atraso = time.time() - previsto
+        with lock:
+            atrasos.append(atraso)
+            if len(atrasos) == esperados:
+                fim.set()
+
+    base = time.time() + 1.0
+    t0 = time.perf_counter()
+    for i in range(total):
+        quando = base + aleatorio.random() * janela
+        timers.agendar(i, quando, disparar, quando)
+    t_agendar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i in range(0, total, 2):
+        timers.cancelar(i)
+    t_cancelar = time.perf_counter() - t0
+
+    timers.iniciar()
+    fim.wait(janela + 30)
+    timers.parar()
+
+    print(f"{total} timers agendados em {t_agendar * 1000:.0f} ms "
+          f"({t_agendar / total * 1e6:.1f} µs cada)")
+    print(f"{total // 2} cancelados em {t_cancelar * 1000:.0f} ms")
+    print(f"{len(atrasos)}/{esperados} disparados; atraso "
+          f"p50 {percentil(atrasos, 0.50) * 1000:.1f} ms, "
+          f"p95 {percentil(atrasos, 0.95) * 1000:.1f} ms, "
+          f"p99 {percentil(atrasos, 0.99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark de cold start: tempo de import por módulo e até a primeira resposta.
+
+Para cada módulo, roda `python -X importtime -c "import <módulo>"` num
+processo novo e mostra o tempo total e as dependências mais pesadas.
+Depois sobe um processo que importa o app, cria o bot (token falso, sem
+rede) e entrega um /help; mede o tempo do início do processo até o bot
+pronto e até a primeira resposta.
+
+    python benchmarks/bench_startup.py [repeticoes]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import statistics
+import subprocess
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+MODULOS = ["app", "calendar_app", "google_service", "datetime_parser", "weather", "news", "backend.main"]
+
+# processo filho: importa o app, cria o bot e responde um /help sem rede
+PRIMEIRA_RESPOSTA = r"""
+import json, sys, time, threading
+t0 = float(sys.argv[1])
+import app
+import telebot
+bot = app.criar_bot()
+pronto = time.time()
+respondeu = threading.Event()
+bot.send_message = lambda *a, **k: respondeu.set()
+update = telebot.types.Update.de_json({
+    "update_id": 1,
+    "message": {
+        "message_id": 1, "date": 0, "text": "/help",
+        "chat": {"id": 1, "type": "private"},
+        "from": {"id": 1, "is_bot": False, "first_name": "bench"},
+        "entities": [{"type": "bot_command", "offset": 0, "length": 5}],
+    },
+})
+bot.process_new_updates([update])
+respondeu.wait(30)
+print(json.dumps({"pronto": pronto - t0, "resposta": time.time() - t0}))
+"""
+
+
+def _ambiente():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = RAIZ + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("API_BOT_TOKEN", "123456:bench")
+    env.setdefault("OPENAI_API_KEY", "bench")
+    return env
+
+
+def importtime(modulo, pasta):
+    """{modulo: (self_us, cumulativo_us)} de um import num processo novo."""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=pasta, env=_ambiente(), capture_output=True, text=True,
+    )
+    tempos = {}
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        partes = linha[len("import time:"):].split("|")
+        try:
+            proprio, cumulativo = int(partes[0]), int(partes[1])
+        except ValueError:
+            continue  # cabeçalho
+        tempos[partes[2].strip()] = (proprio, cumulativo)
+    return tempos
+
+
+def primeira_resposta(pasta):
+    t0 = time.time()
+    resultado = subprocess.run(
+        [sys.executable, "-c", PRIMEIRA_RESPOSTA, repr(t0)],
+        cwd=pasta, env=_ambiente(), capture_output=True, text=True,
+    )
+    for linha in reversed(resultado.stdout.splitlines()):
+        if linha.startswith("{"):
+            return json.loads(linha)
+    raise RuntimeError(resultado.stderr[-2000:])
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    # roda fora da raiz para não criar/usar o database.db do projeto
+    with tempfile.TemporaryDirectory() as pasta:
+        print(f"{'módulo':<18} {'import (ms)':>12}   mais pesados (cumulativo)")
+        for modulo in MODULOS:
+            medidas = [importtime(modulo, pasta) for _ in range(repeticoes)]
+            total = statistics.median(m.get(modulo, (0, 0))[1] for m in medidas) / 1000
+
+            # dependências diretas de terceiros mais caras (nível de pacote)
+            ultima = medidas[-1]
+            pacotes = {}
+            for nome, (_, cumulativo) in ultima.items():
+                raiz = nome.split(".")[0]
+                if nome == raiz and raiz not in (modulo.split(".")[0], "site", "encodings"):
+                    pacotes[raiz] = cumulativo
+            pesados = sorted(pacotes.items(), key=lambda x: -x[1])[:4]
+            resumo = ", ".join(f"{nome} {us / 1000:.0f}" for nome, us in pesados)
+            print(f"{modulo:<18} {total:>12.1f}   {resumo}")
+
+        tempos = [primeira_resposta(pasta) for _ in range(repeticoes)]
+        print()
+        print(f"processo -> bot pronto:        {statistics.median(t['pronto'] for t in tempos) * 1000:8.1f} ms")
+        print(f"processo -> primeira resposta: {statistics.median(t['resposta'] for t in tempos) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark do índice de trigramas de títulos (/remover).
+
+Monta o índice com N eventos sintéticos (títulos repetidos, como os de
+eventos recorrentes, mais alguns únicos) e compara a busca por trigramas
+com a varredura linear antiga (`termo in summary`), para consultas
+exatas, sem acento e com erro de digitação.
+
+    python benchmarks/bench_title_index.py [eventos] [consultas]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.title_index import IndiceDeTitulos
+
+TIPOS = ["Reunião", "Consulta", "Dentista", "Almoço", "Aula", "Academia", "Entrega", "Revisão", "Call", "Viagem"]
+COMPLEMENTOS = ["com João", "de projeto", "médica", "do carro", "de inglês", "com a equipe", "mensal", "São Paulo"]
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Élen", "Fábio", "Gustavo", "Helena", "Íris", "Júlia"]
+CONSULTAS = ["reuniao", "dentsta", "consulta medica", "almoço", "revisao do carro", "aula ingles"]
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    aleatorio = random.Random(42)
+    agora = time.time()
+    recorrentes = [f"{t} {c} - {n}" for t in TIPOS for c in COMPLEMENTOS for n in NOMES]
+    titulos = {}
+    for i in range(total):
+        if aleatorio.random() < 0.1:
+            titulo = f"{aleatorio.choice(TIPOS)} #{i}"
+        else:
+            titulo = aleatorio.choice(recorrentes)
+        titulos[f"ev{i}"] = (titulo, int(agora + aleatorio.uniform(-30, 365) * 86400))
+
+    indice = IndiceDeTitulos()
+    t0 = time.perf_counter()
+    for event_id, (titulo, inicio) in titulos.items():
+        indice.adicionar(event_id, titulo, inicio)
+    t_montar = time.perf_counter() - t0
+    print(f"{total} títulos indexados em {t_montar * 1000:.0f} ms")
+
+    for consulta in CONSULTAS:
+        tempos = []
+        for _ in range(repeticoes):
+            t0 = time.perf_counter()
+            achados = indice.buscar(consulta, agora)
+            tempos.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        lineares = [t for t, _ in titulos.values() if consulta in t.lower()]
+        t_linear = time.perf_counter() - t0
+
+        melhor = titulos[achados[0][0]][0] if achados else "-"
+        print(f"{consulta!r:20} p50 {percentil(tempos, 0.5) * 1000:7.3f} ms  "
+              f"p99 {percentil(tempos, 0.99) * 1000:7.3f} ms  "
+              f"linear {t_linear * 1000:6.2f} ms ({len(lineares)} achados)  -> {melhor}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+"""Servidores fake (http.server) de todos os serviços externos do bot.
+
+Telegram Bot API, OpenAI chat completions (com streaming SSE), Google
+Calendar, OpenWeather e GNews, cada um num ThreadingHTTPServer local com
+latência configurável. Usados pelo benchmarks/bench_e2e.py; o app é
+apontado para eles pelas variáveis de ambiente de variaveis_de_ambiente().
+
+    fakes = iniciar_fakes(Latencias(calendar=0.04))
+    os.environ.update(variaveis_de_ambiente(fakes))
+"""
+import json
+import time
+import uuid
+import random
+import datetime
+import threading
+from collections import Counter, namedtuple
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# latências (s) de cada fake; openai_token é o intervalo entre chunks do stream
+Latencias = namedtuple(
+    "Latencias",
+    "telegram openai_primeiro_token openai_token calendar openweather gnews",
+    defaults=(0.015, 0.300, 0.010, 0.040, 0.030, 0.060),
+)
+
+
+# -------------------------------------------------------------------
+# BASE
+# -------------------------------------------------------------------
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, handler, fake):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.fake = fake
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como os serviços reais
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    def _params(self):
+        partes = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        if tamanho:
+            corpo = self.rfile.read(tamanho)
+            tipo = self.headers.get("Content-Type", "")
+            if "json" in tipo:
+                params["_json"] = json.loads(corpo or b"{}")
+            else:
+                params.update({k: v[-1] for k, v in parse_qs(corpo.decode()).items()})
+        return partes.path, params
+
+    def _json(self, status, dados):
+        corpo = json.dumps(dados).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _vazio(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        self._atender("GET")
+
+    def do_POST(self):
+        self._atender("POST")
+
+    def do_DELETE(self):
+        self._atender("DELETE")
+
+    def _atender(self, metodo):
+        caminho, params = self._params()
+        self.fake.chamadas[f"{metodo} {self.fake.rota(caminho)}"] += 1
+        time.sleep(self.fake.latencia)
+        self.fake.atender(self, metodo, caminho, params)
+
+
+class _Fake:
+    def __init__(self, latencia):
+        self.latencia = latencia
+        self.chamadas = Counter()
+        self.servidor = None
+
+    def rota(self, caminho):
+        return caminho
+
+    def iniciar(self):
+        self.servidor = _Servidor(_Handler, self)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def url(self):
+        return self.servidor.url
+
+    def parar(self):
+        self.servidor.shutdown()
+
+
+# -------------------------------------------------------------------
+# TELEGRAM
+# -------------------------------------------------------------------
+class FakeTelegram(_Fake):
+    """Bot API: responde sendMessage/editMessageText e avisa quem estiver ouvindo.
+
+    `ao_enviar(chat_id, metodo, texto)` é chamado a cada mensagem enviada
+    ou editada; é assim que o benchmark sabe quando o bot respondeu.
+    """
+
+    def __init__(self, latencia):
+        super().__init__(latencia)
+        self.ao_enviar = None
+        self._ids = iter(range(1, 1 << 62))
+        self._lock = threading.Lock()
+
+    def rota(self, caminho):
+        return caminho.rsplit("/", 1)[-1]
+
+    def atender(self, h, metodo, caminho, params):
+        nome = self.rota(caminho)
+        if nome in ("sendMessage", "editMessageText", "sendDocument"):
+            chat_id = int(params.get("chat_id", 0))
+            texto = params.get("text", params.get("caption", ""))
+            with self._lock:
+                message_id = int(params.get("message_id") or next(self._ids))
+            h._json(200, {"ok": True, "result": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": texto,
+            }})
+            if self.ao_enviar is not None:
+                self.ao_enviar(chat_id, nome, texto)
+        elif nome == "getMe":
+            h._json(200, {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "Mia", "username": "mia_bot"}})
+        elif nome == "getUpdates":
+            h._json(200, {"ok": True, "result": []})
+        else:
+            h._json(200, {"ok": True, "result": True})
+
+
+# -------------------------------------------------------------------
+# OPENAI
+# -------------------------------------------------------------------
+RESPOSTA_LLM = (
+    "Claro! Posso ajudar com isso. Organize as tarefas por prioridade, reserve blocos "
+    "de tempo na agenda para o que for mais importante e deixe intervalos curtos entre "
+    "os compromissos. Se quiser, posso marcar esses blocos para você."
+)
+
+
+def _chamadas_de_ferramenta(corpo):
+    """Tool calls que um modelo pediria para a última mensagem do usuário.
+
+    Regras fixas, só para exercitar o agente: "clima em A e B" pede a
+    ferramenta clima para cada cidade e "agenda" pede listar_eventos("hoje").
+    """
+    nomes = {t.get("function", {}).get("name") for t in corpo.get("tools", [])}
+    mensagens = corpo.get("messages", [])
+    if not nomes or not mensagens or mensagens[-1].get("role") != "user":
+        return []
+
+    texto = str(mensagens[-1].get("content", "")).lower()
+    pedidos = []
+    if "clima" in nomes and "clima em " in texto:
+        cidades = texto.split("clima em ", 1)[1].split(" agenda")[0]
+        for cidade in cidades.replace(",", " e ").split(" e "):
+            if cidade.strip():
+                pedidos.append(("clima", {"cidade": cidade.strip()}))
+    if "listar_eventos" in nomes and "agenda" in texto:
+        pedidos.append(("listar_eventos", {"dia": "hoje"}))
+
+    return [
+        {"id": f"call_{i}", "type": "function", "function": {"name": nome, "arguments": json.dumps(args)}}
+        for i, (nome, args) in enumerate(pedidos)
+    ]
+
+
+class FakeOpenAI(_Fake):
+    """POST /v1/chat/completions, com e sem stream (SSE em chunked encoding).
+
+    Com tools no pedido, pode responder com tool calls (ver
+    _chamadas_de_ferramenta); depois dos resultados, responde com eles.
+    """
+
+    def __init__(self, latencia, latencia_token):
+        super().__init__(latencia)
+        self.latencia_token = latencia_token
+
+    def atender(self, h, metodo, caminho, params):
+        corpo = params.get("_json", {})
+        chamadas = _chamadas_de_ferramenta(corpo)
+        mensagens = corpo.get("messages", [])
+        resultados = []
+        for m in reversed(mensagens):
+            if m.get("role") != "tool":
+                break
+            resultados.insert(0, str(m.get("content", "")))
+        palavras = ("\n".join(resultados) if resultados else RESPOSTA_LLM).split(" ")
+        if chamadas:
+            palavras = []
+        prompt_tokens = len(json.dumps(corpo.get("messages", []))) // 4
+        uso = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(palavras),
+            "total_tokens": prompt_tokens + len(palavras),
+        }
+        base = {
+            "id": "chatcmpl-fake",
+            "created": int(time.time()),
+            "model": corpo.get("model", "gpt-4o-mini"),
+        }
+
+        if not corpo.get("stream"):
+            time.sleep(self.latencia_token * len(palavras))
+            mensagem = {"role": "assistant", "content": " ".join(palavras) or None}
+            if chamadas:
+                mensagem["tool_calls"] = chamadas
+            h._json(200, {**base, "object": "chat.completion", "usage": uso, "choices": [{
+                "index": 0, "finish_reason": "tool_calls" if chamadas else "stop", "message": mensagem,
+            }]})
+            return
+
+        h.send_response(200)
+        h.send_header("Content-Type", "text/event-stream")
+        h.send_header("Transfer-Encoding", "chunked")
+        h.end_headers()
+
+        def evento(dados):
+            linha = f"data: {dados}\n\n".encode()
+            h.wfile.write(f"{len(linha):x}\r\n".encode() + linha + b"\r\n")
+            h.wfile.flush()
+
+        def chunk(delta, finish=None):
+            return json.dumps({**base, "object": "chat.completion.chunk", "choices": [
+                {"index": 0, "delta": delta, "finish_reason": finish},
+            ]})
+
+        for i, chamada in enumerate(chamadas):
+            evento(chunk({"role": "assistant", "tool_calls": [{**chamada, "index": i}]}))
+        for i, palavra in enumerate(palavras):
+            parte = palavra if i == 0 else " " + palavra
+            evento(chunk({"role": "assistant", "content": parte} if i == 0 else {"content": parte}))
+            time.sleep(self.latencia_token)
+        evento(chunk({}, "tool_calls" if chamadas else "stop"))
+        if corpo.get("stream_options", {}).get("include_usage"):
+            evento(json.dumps({**base, "object": "chat.completion.chunk", "choices": [], "usage": uso}))
+        evento("[DONE]")
+        h.wfile.write(b"0\r\n\r\n")
+
+
+# -------------------------------------------------------------------
+# GOOGLE CALENDAR
+# -------------------------------------------------------------------
+def _instante(valor):
+    return datetime.datetime.fromisoformat(valor.replace("Z", "+00:00"))
+
+
+class _Agenda:
+    def __init__(self):
+        self.eventos = {}
+        self.mudancas = []  # (seq, event_id)
+        self.seq = 0
+
+    def mudou(self, event_id):
+        self.seq += 1
+        self.mudancas.append((self.seq, event_id))
+
+
+class FakeCalendar(_Fake):
+    """events list/insert/delete + freeBusy, uma agenda por token (Bearer).
+
+    list entende timeMin/timeMax e syncToken (devolve só o que mudou,
+    com status "cancelled" para os removidos).
+    """
+
+    def __init__(self, latencia):
+        super().__init__(latencia)
+        self._agendas = {}
+        self._lock = threading.Lock()
+
+    def rota(self, caminho):
+        partes = caminho.split("/")
+        if "events" in partes:
+            return "events/{id}" if partes[-1] != "events" else "events"
+        return partes[-1]
+
+    def _agenda(self, h):
+        token = h.headers.get("Authorization", "")
+        agenda = self._agendas.get(token)
+        if agenda is None:
+            agenda = self._agendas.setdefault(token, _Agenda())
+        return agenda
+
+    def atender(self, h, metodo, caminho, params):
+        partes = caminho.rstrip("/").split("/")
+        with self._lock:
+            agenda = self._agenda(h)
+            if partes[-1] == "freeBusy":
+                status, dados = 200, self._freebusy(agenda, params.get("_json", {}))
+            elif partes[-1] == "events" and metodo == "GET":
+                status, dados = 200, self._listar(agenda, params)
+            elif partes[-1] == "events" and metodo == "POST":
+                status, dados = 200, self._inserir(agenda, params.get("_json", {}))
+            elif metodo == "DELETE":
+                status, dados = self._remover(agenda, partes[-1])
+            else:
+                status, dados = 404, {"error": {"code": 404, "message": "Not Found"}}
+
+        if dados is None:
+            h._vazio(status)
+        else:
+            h._json(status, dados)
+
+    def _remover(self, agenda, event_id):
+        ev = agenda.eventos.get(event_id)
+        if ev is None or ev["status"] == "cancelled":
+            return 410, {"error": {"code": 410, "message": "Resource has been deleted"}}
+        ev["status"] = "cancelled"
+        agenda.mudou(event_id)
+        return 204, None
+
+    def _inserir(self, agenda, body):
+        event_id = uuid.uuid4().hex
+        ev = {
+            **body,
+            "id": event_id,
+            "status": "confirmed",
+            "htmlLink": f"https://calendar.google.com/event?eid={event_id}",
+        }
+        agenda.eventos[event_id] = ev
+        agenda.mudou(event_id)
+        return ev
+
+    def _listar(self, agenda, params):
+        if "syncToken" in params:
+            desde = int(params["syncToken"])
+            ids = {event_id for seq, event_id in agenda.mudancas if seq > desde}
+            itens = [agenda.eventos[i] for i in ids]
+        else:
+            itens = [ev for ev in agenda.eventos.values() if ev["status"] != "cancelled"]
+            if "timeMin" in params:
+                minimo = _instante(params["timeMin"])
+                itens = [ev for ev in itens if _instante(ev["end"]["dateTime"]) > minimo]
+            if "timeMax" in params:
+                maximo = _instante(params["timeMax"])
+                itens = [ev for ev in itens if _instante(ev["start"]["dateTime"]) < maximo]
+            itens.sort(key=lambda ev: ev["start"]["dateTime"])
+        return {"items": itens, "nextSyncToken": str(agenda.seq)}
+
+    def _freebusy(self, agenda, body):
+        minimo, maximo = _instante(body["timeMin"]), _instante(body["timeMax"])
+        ocupado = []
+        for ev in agenda.eventos.values():
+            if ev["status"] == "cancelled":
+                continue
+            inicio, fim = _instante(ev["start"]["dateTime"]), _instante(ev["end"]["dateTime"])
+            if inicio < maximo and fim > minimo:
+                ocupado.append({"start": ev["start"]["dateTime"], "end": ev["end"]["dateTime"]})
+        calendarios = {item["id"]: {"busy": ocupado} for item in body.get("items", [{"id": "primary"}])}
+        return {"timeMin": body["timeMin"], "timeMax": body["timeMax"], "calendars": calendarios}
+
+
+# -------------------------------------------------------------------
+# OPENWEATHER / GNEWS
+# -------------------------------------------------------------------
+class FakeOpenWeather(_Fake):
+    def atender(self, h, metodo, caminho, params):
+        if caminho.endswith("/geo/1.0/direct"):
+            cidade = params.get("q", "")
+            aleatorio = random.Random(cidade)
+            h._json(200, [{
+                "name": cidade.title(), "country": "BR",
+                "lat": aleatorio.uniform(-30, 0), "lon": aleatorio.uniform(-60, -35),
+            }])
+        else:
+            h._json(200, {
+                "weather": [{"description": "céu limpo"}],
+                "main": {"temp": 24.3, "feels_like": 25.1, "humidity": 60},
+            })
+
+
+class FakeGNews(_Fake):
+    def atender(self, h, metodo, caminho, params):
+        tema = params.get("q", "")
+        h._json(200, {"totalArticles": 5, "articles": [
+            {"title": f"{tema.title()}: notícia {i}", "url": f"https://exemplo.com/{i}", "source": {"name": "Fonte"}}
+            for i in range(1, 6)
+        ]})
+
+
+# -------------------------------------------------------------------
+# TUDO JUNTO
+# -------------------------------------------------------------------
+Fakes = namedtuple("Fakes", "telegram openai calendar openweather gnews")
+
+
+def iniciar_fakes(latencias=Latencias()):
+    return Fakes(
+        telegram=FakeTelegram(latencias.telegram).iniciar(),
+        openai=FakeOpenAI(latencias.openai_primeiro_token, latencias.openai_token).iniciar(),
+        calendar=FakeCalendar(latencias.calendar).iniciar(),
+        openweather=FakeOpenWeather(latencias.openweather).iniciar(),
+        gnews=FakeGNews(latencias.gnews).iniciar(),
+    )
+
+
+def variaveis_de_ambiente(fakes):
+    """Variáveis que apontam o app (app.py, google_service, weather, news, OpenAI) para os fakes."""
+    return {
+        "TELEGRAM_API_URL": fakes.telegram.url,
+        "OPENAI_BASE_URL": fakes.openai.url + "/v1",
+        "OPENAI_API_KEY": "fake",
+        "GOOGLE_API_URL": fakes.calendar.url,
+        "OPENWEATHER_URL": fakes.openweather.url,
+        "OPENWEATHER_API_KEY": "fake",
+        "GNEWS_URL": fakes.gnews.url + "/api/v4/search",
+        "GNEWS_API_KEY": "fake",
+    }
+
+
+def total_de_chamadas(fakes):
+    return {nome: dict(fake.chamadas) for nome, fake in fakes._asdict().items()}
@@ -0,0 +1,323 @@
+import os
+import re
+import json
+import time
+import zlib
+import asyncio
+import datetime
+import threading
+
+import pytz
+
+from backend.database import get_connection
+from backend.event_store import chave_calendario
+from reminders import TimerHeap
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+TZ = pytz.timezone("America/Sao_Paulo")
+
+# o resumo é montado antes do horário, para a entrega sair na hora
+BRIEFING_ANTECEDENCIA = int(os.getenv("BRIEFING_ANTECEDENCIA", "600"))
+
+# a montagem de cada chat cai num ponto fixo desta janela (antes da
+# antecedência), para que quem escolheu 07:00 não chame as APIs no mesmo segundo
+BRIEFING_ESPALHAR = int(os.getenv("BRIEFING_ESPALHAR", "600"))
+
+# por quanto tempo um resumo montado vale para o /resumo
+BRIEFING_TTL = int(os.getenv("BRIEFING_TTL", "7200"))
+
+BRIEFING_MAX_TEMAS = 3
+
+# de quanto em quanto tempo relê a tabela (configurações feitas por outros processos)
+BRIEFING_RESYNC = 60
+
+USO = (
+    "Use assim:\n"
+    "/resumo → seu resumo do dia agora\n"
+    "/resumo 7h30 São Paulo; tecnologia, economia → resumo todo dia às 7h30\n"
+    "/resumo desligar → para de enviar o resumo diário"
+)
+
+_HORARIO = re.compile(r"^(\d{1,2})(?:[:h](\d{2})?)?\s+(.+)$", re.IGNORECASE | re.DOTALL)
+
+
+def interpretar_configuracao(texto):
+    """"7h30 São Paulo; tecnologia, economia" -> ("07:30", "São Paulo", ["tecnologia", "economia"]) ou None."""
+    encontrado = _HORARIO.match(texto.strip())
+    if encontrado is None:
+        return None
+    hora, minuto = int(encontrado.group(1)), int(encontrado.group(2) or 0)
+    if hora > 23 or minuto > 59:
+        return None
+
+    cidade, _, temas = encontrado.group(3).partition(";")
+    cidade = cidade.strip()
+    if not cidade:
+        return None
+    temas = [t.strip() for t in temas.split(",") if t.strip()][:BRIEFING_MAX_TEMAS]
+    return f"{hora:02d}:{minuto:02d}", cidade, temas
+
+
+# -------------------------------------------------------------------
+# MONTAGEM (busca as três fontes ao mesmo tempo)
+# -------------------------------------------------------------------
+# cada fonte devolve (texto, ok); com alguma falha o resumo não vai para o cache
+def _texto_do_erro(fonte, erro):
+    from google_service import ContaNaoVinculada
+    from resilience import ServicoIndisponivel
+
+    if isinstance(erro, ContaNaoVinculada):
+        return "Sua conta Google ainda não está vinculada."
+    if isinstance(erro, ServicoIndisponivel):
+        return str(erro)
+    print(f"Erro ao buscar {fonte} para o resumo: {erro}")
+    return f"Não consegui buscar {fonte} agora."
+
+
+async def _buscar(fonte, aguardavel):
+    try:
+        return await aguardavel, True
+    except Exception as e:
+        return _texto_do_erro(fonte, e), False
+
+
+def _buscar_agenda(telegram_id, dia):
+    from calendar_app import listar_eventos_do_dia_async
+
+    # REST do Calendar pelo httpx compartilhado, no mesmo loop do clima e das notícias
+    return _buscar("a agenda", listar_eventos_do_dia_async(dia, telegram_id=telegram_id))
+
+
+async def _buscar_tudo(telegram_id, dia, cidade, temas):
+    from weather import clima_async
+    from news import noticias_async
+
+    return await asyncio.gather(
+        _buscar_agenda(telegram_id, dia),
+        _buscar("o clima", clima_async(cidade)),
+        *(_buscar(f"as notícias de {tema}", noticias_async(tema)) for tema in temas),
+    )
+
+
+def _telegram_id(valor):
+    """telegram_id como gravado na tabela (texto) -> int, como o resto do app usa."""
+    return int(valor) if valor and valor.lstrip("-").isdigit() else None
+
+
+def _renderizar(dia, agenda, clima, noticias):
+    partes = [f"☀️ Seu resumo de {dia.strftime('%d/%m/%Y')}", agenda.strip(), f"🌤 {clima}"]
+    for tema, texto in noticias:
+        partes.append(f"📰 {tema}:\n{texto}")
+    return "\n\n".join(partes)
+
+
+class _Resumo:
+    __slots__ = ("dia", "calendario", "criado", "agenda", "clima", "noticias", "agenda_valida")
+
+    def __init__(self, dia, calendario, agenda, clima, noticias):
+        self.dia = dia
+        self.calendario = calendario  # chave do store da agenda usada (ver ao_alterar_evento)
+        self.criado = time.time()
+        self.agenda = agenda
+        self.clima = clima
+        self.noticias = noticias
+        self.agenda_valida = True
+
+    def texto(self):
+        return _renderizar(self.dia, self.agenda, self.clima, self.noticias)
+
+
+# -------------------------------------------------------------------
+# AGENDADOR
+# -------------------------------------------------------------------
+class BriefingScheduler:
+    """Resumo diário por chat: agenda de hoje, clima da cidade e notícias dos temas.
+
+    A configuração fica na tabela briefings. BRIEFING_ANTECEDENCIA antes
+    do horário (menos um deslocamento fixo por chat, até BRIEFING_ESPALHAR)
+    as fontes são buscadas em paralelo e o texto vai para um cache; na
+    hora só falta enviar. O /resumo usa o mesmo cache. Resumos com alguma
+    fonte fora do ar não entram no cache (a próxima chamada tenta de
+    novo). Mudanças na agenda de alguém invalidam só a parte da agenda
+    dos resumos dessa agenda, que é refeita na entrega.
+
+    Como nos lembretes, qualquer processo configura (grava na tabela) e
+    só o processo que chamou iniciar() monta e envia no horário.
+    """
+
+    def __init__(self):
+        self._timers = TimerHeap("resumos", workers=4)
+        self._cache = {}  # chat_id -> _Resumo
+        self._lock = threading.Lock()
+        self._enviar = None
+        self._ultimo_resync = 0.0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def ativo(self):
+        return self._enviar is not None
+
+    def estatisticas(self):
+        with self._lock:
+            return {"itens": len(self._cache), "hits": self._hits, "misses": self._misses}
+
+    # ---------------------------------------------------------
+    # API
+    # ---------------------------------------------------------
+    def configurar(self, chat_id, telegram_id, horario, cidade, temas):
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO briefings (chat_id, telegram_id, horario, cidade, temas, atualizado)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (str(chat_id), str(telegram_id), horario, cidade, json.dumps(temas), time.time()),
+            )
+        with self._lock:
+            self._cache.pop(str(chat_id), None)
+        if self.ativo:
+            self._agendar(str(chat_id), horario)
+
+    def desligar(self, chat_id):
+        """Apaga a configuração; devolve False se não havia resumo diário."""
+        conn = get_connection()
+        with conn:
+            apagadas = conn.execute("DELETE FROM briefings WHERE chat_id = ?", (str(chat_id),)).rowcount
+        with self._lock:
+            self._cache.pop(str(chat_id), None)
+        self._timers.cancelar(("montar", str(chat_id)))
+        self._timers.cancelar(("entregar", str(chat_id)))
+        return apagadas > 0
+
+    def configuracao(self, chat_id):
+        """(telegram_id, horario, cidade, temas) do chat, ou None."""
+        linha = get_connection().execute(
+            "SELECT telegram_id, horario, cidade, temas FROM briefings WHERE chat_id = ?", (str(chat_id),)
+        ).fetchone()
+        if linha is None:
+            return None
+        telegram_id, horario, cidade, temas = linha
+        return telegram_id, horario, cidade, json.loads(temas)
+
+    def resumo(self, chat_id):
+        """Texto do resumo de hoje: do cache se ainda vale, senão montado agora. None sem configuração."""
+        chat_id = str(chat_id)
+        hoje = datetime.datetime.now(TZ).date()
+        with self._lock:
+            em_cache = self._cache.get(chat_id)
+            valido = (
+                em_cache is not None and em_cache.dia == hoje
+                and time.time() - em_cache.criado <= BRIEFING_TTL
+            )
+            if valido:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+        if not valido:
+            return self._montar(chat_id)
+        if not em_cache.agenda_valida:
+            self._atualizar_agenda(chat_id, em_cache)
+        return em_cache.texto()
+
+    def ao_alterar_evento(self, acao, ev, chat_id=None, calendario="primary"):
+        """Observador do calendar_app: a agenda dos resumos desse calendário ficou velha."""
+        with self._lock:
+            for em_cache in self._cache.values():
+                if em_cache.calendario == calendario:
+                    em_cache.agenda_valida = False
+
+    def iniciar(self, enviar):
+        """Começa a montar e enviar os resumos diários com enviar(chat_id, texto)."""
+        self._enviar = enviar
+        self._resync()
+        self._timers.iniciar()
+        print(f"Resumos diários: {len(self._timers) // 2} agendados.")
+
+    # ---------------------------------------------------------
+    # INTERNOS
+    # ---------------------------------------------------------
+    def _montar(self, chat_id, dia=None):
+        """Busca agenda, clima e notícias juntos e guarda o resumo do dia (padrão: hoje)."""
+        from async_http import run_sync
+
+        configuracao = self.configuracao(chat_id)
+        if configuracao is None:
+            return None
+        telegram_id = _telegram_id(configuracao[0])
+        _, _, cidade, temas = configuracao
+
+        inicio = time.perf_counter()
+        dia = dia or datetime.datetime.now(TZ).date()
+        partes = run_sync(_buscar_tudo(telegram_id, dia, cidade, temas))
+        (agenda, _), (clima, _), *noticias = partes
+        resumo = _Resumo(
+            dia, chave_calendario(usuario=telegram_id), agenda, clima,
+            [(tema, texto) for tema, (texto, _) in zip(temas, noticias)],
+        )
+
+        completo = all(ok for _, ok in partes)
+        if completo:
+            with self._lock:
+                self._cache[chat_id] = resumo
+        print(
+            f"[resumo] chat {chat_id}: montado em {(time.perf_counter() - inicio) * 1000:.0f}ms"
+            + ("" if completo else " (com falhas, fora do cache)")
+        )
+        return resumo.texto()
+
+    def _atualizar_agenda(self, chat_id, em_cache):
+        from async_http import run_sync
+
+        configuracao = self.configuracao(chat_id)
+        telegram_id = _telegram_id(configuracao[0]) if configuracao else None
+        agenda, ok = run_sync(_buscar_agenda(telegram_id, em_cache.dia))
+        em_cache.agenda = agenda
+        # com erro, a próxima chamada tenta de novo
+        em_cache.agenda_valida = ok
+
+    def _proxima_entrega(self, horario):
+        """Próximo instante local com esse HH:MM (hoje ou amanhã)."""
+        hora, minuto = map(int, horario.split(":"))
+        agora = datetime.datetime.now(TZ)
+        entrega = TZ.localize(datetime.datetime.combine(agora.date(), datetime.time(hora, minuto)))
+        if entrega <= agora:
+            entrega = TZ.localize(datetime.datetime.combine(agora.date() + datetime.timedelta(days=1),
+                                                            datetime.time(hora, minuto)))
+        return entrega
+
+    def _agendar(self, chat_id, horario):
+        entrega = self._proxima_entrega(horario)
+        # deslocamento estável por chat: espalha as montagens de quem escolheu o mesmo horário
+        deslocamento = zlib.crc32(chat_id.encode()) % BRIEFING_ESPALHAR if BRIEFING_ESPALHAR else 0
+        montagem = max(entrega.timestamp() - BRIEFING_ANTECEDENCIA - deslocamento, time.time())
+        self._timers.agendar(("montar", chat_id), montagem, self._montar, chat_id, entrega.date())
+        self._timers.agendar(("entregar", chat_id), entrega.timestamp(), self._entregar, chat_id, horario)
+
+    def _resync(self):
+        """Agenda as configurações novas/alteradas desde a última leitura."""
+        agora = time.time()
+        linhas = get_connection().execute(
+            "SELECT chat_id, horario FROM briefings WHERE atualizado >= ?", (self._ultimo_resync,)
+        ).fetchall()
+        self._ultimo_resync = agora
+        for chat_id, horario in linhas:
+            self._agendar(chat_id, horario)
+        self._timers.agendar("__resync__", agora + BRIEFING_RESYNC, self._resync)
+
+    def _entregar(self, chat_id, horario):
+        configuracao = self.configuracao(chat_id)
+        # desligado ou com outro horário (configurado por outro processo)
+        if configuracao is None or configuracao[1] != horario:
+            return
+        try:
+            texto = self.resumo(chat_id)
+            if texto:
+                self._enviar(chat_id, texto)
+        finally:
+            self._agendar(chat_id, horario)
+
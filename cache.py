@@ -0,0 +1,202 @@
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+_AUSENTE = object()
+
+
+class AsyncSingleFlight:
+    """Junta chamadas assíncronas simultâneas para a mesma chave numa só.
+
+    A primeira corrotina cria a tarefa de carga; as que chegam enquanto
+    ela roda aguardam a mesma tarefa. shield() evita que o cancelamento
+    de quem espera cancele a carga compartilhada.
+    """
+
+    def __init__(self):
+        self._em_voo = {}  # (loop, chave) -> Task
+
+    def em_voo(self, chave):
+        return (id(asyncio.get_running_loop()), chave) in self._em_voo
+
+    async def executar(self, chave, carregar):
+        loop = asyncio.get_running_loop()
+        k = (id(loop), chave)
+        tarefa = self._em_voo.get(k)
+        if tarefa is None:
+            tarefa = loop.create_task(carregar())
+            self._em_voo[k] = tarefa
+            tarefa.add_done_callback(lambda _: self._em_voo.pop(k, None))
+        return await asyncio.shield(tarefa)
+
+
+class TTLCache:
+    """Cache em memória com expiração, limite de itens (LRU) e single-flight.
+
+    aget_or_load garante que, para a mesma chave, só uma carga roda por
+    vez; as demais corrotinas esperam e reaproveitam o resultado. Assim
+    uma chave popular custa no máximo uma chamada externa por janela de TTL.
+    """
+
+    def __init__(self, ttl, max_itens=1024):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self.hits = 0
+        self.misses = 0
+        self._dados = OrderedDict()  # chave -> (expira_em, valor)
+        self._voo = AsyncSingleFlight()
+        self._lock = threading.Lock()
+
+    def _buscar(self, chave):
+        item = self._dados.get(chave)
+        if item is None:
+            return _AUSENTE
+        expira_em, valor = item
+        if expira_em < time.monotonic():
+            del self._dados[chave]
+            return _AUSENTE
+        self._dados.move_to_end(chave)
+        return valor
+
+    def get(self, chave, padrao=None):
+        with self._lock:
+            valor = self._buscar(chave)
+            if valor is _AUSENTE:
+                self.misses += 1
+                return padrao
+            self.hits += 1
+            return valor
+
+    def set(self, chave, valor):
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + self.ttl, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_itens:
+                self._dados.popitem(last=False)
+
+    async def aget_or_load(self, chave, carregar):
+        """`carregar` é uma função que devolve corrotina."""
+        with self._lock:
+            valor = self._buscar(chave)
+            if valor is not _AUSENTE or self._voo.em_voo(chave):
+                self.hits += 1
+                if valor is not _AUSENTE:
+                    return valor
+            else:
+                self.misses += 1
+
+        async def carregar_e_guardar():
+            valor = await carregar()
+            self.set(chave, valor)
+            return valor
+
+        return await self._voo.executar(chave, carregar_e_guardar)
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "itens": len(self._dados)}
+
+
+class StaleWhileRevalidateCache:
+    """Cache que serve o valor expirado na hora e o atualiza em segundo plano.
+
+    - dentro de `ttl`: hit, devolve direto;
+    - entre `ttl` e `ttl + stale_ttl`: hit "stale", devolve o valor antigo
+      e agenda uma única atualização em background para a chave;
+    - ausente ou velho demais: miss, carrega na hora (single-flight).
+    """
+
+    def __init__(self, ttl, stale_ttl, max_itens=256):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_itens = max_itens
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.erros_refresh = 0
+        self._dados = OrderedDict()  # chave -> (carregado_em, valor)
+        self._atualizando = set()
+        self._tarefas = set()
+        self._voo = AsyncSingleFlight()
+        self._lock = threading.Lock()
+
+    def _guardar(self, chave, valor):
+        with self._lock:
+            self._dados[chave] = (time.monotonic(), valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_itens:
+                self._dados.popitem(last=False)
+
+    def _estado(self, chave):
+        """Retorna (valor, fresco) ou (_AUSENTE, False). Chamar com o lock."""
+        item = self._dados.get(chave)
+        if item is None:
+            return _AUSENTE, False
+        carregado_em, valor = item
+        idade = time.monotonic() - carregado_em
+        if idade > self.ttl + self.stale_ttl:
+            del self._dados[chave]
+            return _AUSENTE, False
+        self._dados.move_to_end(chave)
+        return valor, idade <= self.ttl
+
+    async def _aatualizar(self, chave, carregar):
+        try:
+            self._guardar(chave, await carregar())
+        except Exception as e:
+            with self._lock:
+                self.erros_refresh += 1
+            print(f"Erro ao atualizar cache ({chave}): {e}")
+        finally:
+            with self._lock:
+                self._atualizando.discard(chave)
+
+    async def aget_or_load(self, chave, carregar):
+        """`carregar` devolve corrotina; a atualização em background vira uma task do loop."""
+        with self._lock:
+            valor, fresco = self._estado(chave)
+            if valor is not _AUSENTE:
+                if fresco:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    if chave not in self._atualizando:
+                        self._atualizando.add(chave)
+                        self.refreshes += 1
+                        tarefa = asyncio.get_running_loop().create_task(self._aatualizar(chave, carregar))
+                        # guarda referência para a task não ser coletada antes de terminar
+                        self._tarefas.add(tarefa)
+                        tarefa.add_done_callback(self._tarefas.discard)
+                return valor
+            if self._voo.em_voo(chave):
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        async def carregar_e_guardar():
+            valor = await carregar()
+            self._guardar(chave, valor)
+            return valor
+
+        return await self._voo.executar(chave, carregar_e_guardar)
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "erros_refresh": self.erros_refresh,
+                "itens": len(self._dados),
+            }
@@ -1,159 +1,104 @@
-import os
 import re
+import time
+import asyncio
 import datetime
-import dateparser
+import threading
 import pytz
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+from google_service import GOOGLE_API_URL, get_calendar_service, get_credentials
+from backend import event_store
+import datetime_parser
+import ics_io
+import metrics
+import resilience
+import freebusy
+from text_utils import normalizar_texto
 
 # -------------------------------------------------------------------
 # CONFIGS
 # -------------------------------------------------------------------
-SCOPES = ["https://www.googleapis.com/auth/calendar"]
 TIMEZONE = "America/Sao_Paulo"
 TZ = pytz.timezone(TIMEZONE)
+CALENDAR_API = f"{GOOGLE_API_URL}/calendar/v3"
+EVENT_FIELDS = "id,status,summary,start,end,htmlLink"
 
+# /remover: quantos candidatos buscar e quando um deles é claro o bastante
+# para remover sem perguntar (similaridade de Jaccard mínima e distância para o segundo)
+REMOVER_CANDIDATOS = 5
+REMOVER_SIMILARIDADE_MIN = 0.8
+REMOVER_MARGEM = 0.2
 
-# -------------------------------------------------------------------
-# AUTENTICAÇÃO
-# -------------------------------------------------------------------
-def authenticate_google():
-    """autentica com o google agenda.
-       caso token já exista, o reutiliza
-    """
-    creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                "credentials.json", SCOPES
-            )
-            creds = flow.run_local_server(port=0)
-
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
+# por quanto tempo (s) a lista mostrada vale para "/remover <número>"
+REMOVER_ESCOLHA_TTL = 300
 
-    return build("calendar", "v3", credentials=creds)
+_escolhas = {}  # telegram_id -> (expira_em, [event_id, ...])
+_escolhas_lock = threading.Lock()
 
+# funções chamadas como fn(acao, evento, chat_id, calendario) quando um
+# evento é criado ou removido por aqui (ex.: os lembretes em reminders.py);
+# calendario é a chave do store (event_store.chave_calendario)
+_observadores = []
 
-# -------------------------------------------------------------------
-# PARSER PARA DATA E HORA
-# -------------------------------------------------------------------
-def parse_datetime(texto_raw: str):
-    """vai retornar datetime timezone-aware a partir de texto PT-BR."""
-    texto = texto_raw.lower()
-    now = datetime.datetime.now(TZ)
 
-    # palavras relativas
-    dia_hoje = "hoje" in texto
-    dia_amanha = "amanhã" in texto or "amanha" in texto
-
-    # regra de expressão regular para data e hora
-    date_regex = re.compile(
-        r"(\d{1,2}/\d{1,2}/\d{2,4}|"
-        r"\d{1,2}-\d{1,2}-\d{2,4}|"
-        r"\d{1,2}\s+de\s+[a-zçãéíóú]+(?:\s+de\s+\d{4})?|"
-        r"\b\d{1,2}/\d{1,2}\b)",
-        flags=re.IGNORECASE,
-    )
+def registrar_observador(fn):
+    _observadores.append(fn)
 
-    time_regex = re.compile(
-        r"(\d{1,2}:\d{2}|\d{1,2}h\d{0,2}|\b\d{1,2}h\b)",
-        flags=re.IGNORECASE,
-    )
-
-    date_match = date_regex.search(texto)
-    time_match = time_regex.search(texto)
-
-    data_hora = None
-
-    # --------------------------
-    # CASO TENHA DATA EXPLÍCITA
-    # --------------------------
-    if date_match:
-        data_str = date_match.group(0).replace("-", "/")
-
-        # caso "12/10" sem ano, assume ano atual
-        if re.match(r"^\d{1,2}/\d{1,2}$", data_str):
-            d, m = map(int, data_str.split("/"))
-            data_str = f"{d:02d}/{m:02d}/{datetime.datetime.now().year}"
-
-        # hora
-        if time_match:
-            hora_raw = time_match.group(0).lower().replace("h", ":")
-            if ":" not in hora_raw:
-                hora_raw += ":00"
-            hora_str = hora_raw
-        else:
-            hora_str = "09:00"
 
+def _notificar(acao, evento, chat_id=None, calendario="primary"):
+    for fn in _observadores:
         try:
-            d, m, a = map(int, data_str.split("/"))
-            h, mn = map(int, hora_str.split(":"))
+            fn(acao, evento, chat_id, calendario)
+        except Exception as e:
+            print(f"Erro no observador de eventos ({acao}): {e}")
 
-            # utilizando "localize" ao invés de tzinfo (como anteriormente) para evitar bug
-            data_hora = TZ.localize(datetime.datetime(a, m, d, h, mn))
 
-            return data_hora
-        except:
-            pass
+# -------------------------------------------------------------------
+# AUTENTICAÇÃO
+# -------------------------------------------------------------------
+def authenticate_google(telegram_id=None):
+    """autentica com o google agenda do usuário.
+       reutiliza o service e as credenciais em cache no processo;
+       o token só é renovado perto de expirar.
+    """
+    return get_calendar_service(telegram_id)
 
-    # --------------------------
-    # CASO SOMENTE HORA
-    # --------------------------
-    if time_match and not data_hora:
-        hora_raw = time_match.group(0).replace("h", ":")
-        if ":" not in hora_raw:
-            hora_raw += ":00"
 
-        try:
-            h, mn = map(int, hora_raw.split(":"))
-            candidato = now.replace(hour=h, minute=mn, second=0, microsecond=0)
-
-            if candidato < now and dia_amanha:
-                candidato += datetime.timedelta(days=1)
-
-            data_hora = candidato
-        except:
-            pass
-
-    # fallback dateparser
-    if data_hora is None:
-        settings = {
-            "DATE_ORDER": "DMY",
-            "PREFER_DATES_FROM": "future",
-            "TIMEZONE": TIMEZONE,
-            "RETURN_AS_TIMEZONE_AWARE": True,
-            "RELATIVE_BASE": now,
-        }
-        data_hora = dateparser.parse(texto, languages=["pt"], settings=settings)
+# -------------------------------------------------------------------
+# PARSER PARA DATA E HORA
+# -------------------------------------------------------------------
+def parse_datetime(texto_raw: str, futuro=False):
+    """vai retornar datetime timezone-aware a partir de texto PT-BR.
+       a gramática e a memoização ficam em datetime_parser.
+       futuro=True só na criação de eventos: datas que já passaram vão
+       para a próxima ocorrência; consultas mantêm o ano atual.
+    """
+    with metrics.PARSE_DATETIME.medir():
+        return datetime_parser.parse_datetime(texto_raw, futuro=futuro)
 
-    if not data_hora:
-        return None
 
-    if data_hora.tzinfo is None:
-        data_hora = TZ.localize(data_hora)
+def _metricas_parser():
+    # caminho rápido (gramática) x fallback (dateparser) x falhas
+    for caminho, total in datetime_parser.estatisticas().items():
+        if caminho != "chamadas":
+            yield ("mia_parse_datetime_total", "counter", "Chamadas ao parser por caminho.",
+                   {"caminho": caminho}, total)
 
-    if data_hora < now and not dia_hoje:
-        data_hora += datetime.timedelta(days=1)
 
-    return data_hora
+metrics.registrar_coletor(_metricas_parser)
 
 
 # -------------------------------------------------------------------
 # LÓGICA DE CRIAÇÃO DO EVENTO
 # -------------------------------------------------------------------
-def create_event_from_text(texto):
-    """Cria um evento no google calendar com título limpo e horário correto."""
-    service = authenticate_google()
+def create_event_from_text(texto, chat_id=None, telegram_id=None):
+    """Cria um evento no google calendar com título limpo e horário correto.
 
-    dt = parse_datetime(texto)
+    `chat_id` é repassado aos observadores (o lembrete vai para esse chat);
+    `telegram_id` escolhe de quem é a agenda (None = dono do bot).
+    Retorna (link, conflitos): os blocos já ocupados no horário, para o aviso.
+    """
+    service = authenticate_google(telegram_id)
+
+    dt = parse_datetime(texto, futuro=True)
     if dt is None:
         raise ValueError(
             "Não consegui entender a data/hora. Tente algo como '10/12/2025 às 15h'."
@@ -167,7 +112,7 @@ def create_event_from_text(texto):
     # ---------------------------------------------------------
     # EXTRAI O TÍTULO (apenas nome, sem datas/horas)
     # ---------------------------------------------------------
-    texto_limpo = re.sub(r"[\/,.:;@#\n]", " ", texto).strip()
+    texto_limpo = re.sub(r"[\/,.:;@#\n]", " ", datetime_parser.remover_datas(texto)).strip()
     palavras = texto_limpo.split()
 
     palavras_ignoradas = {
@@ -204,53 +149,152 @@ def create_event_from_text(texto):
         "end": {"dateTime": end_time.isoformat(), "timeZone": TIMEZONE},
     }
 
-    created = service.events().insert(calendarId="primary", body=event_body).execute()
+    # o aviso de conflito não pode impedir a criação do evento
+    try:
+        conflitos = freebusy.conflitos(service, start_time, end_time, usuario=telegram_id)
+    except Exception as e:
+        print(f"Erro ao verificar conflitos: {e}")
+        conflitos = []
+
+    with resilience.chamada("calendar", "inserir"):
+        created = service.events().insert(
+            calendarId="primary",
+            body=event_body,
+            fields=EVENT_FIELDS,
+        ).execute()
+
+    # write-through: o store local e o índice de ocupados já enxergam o evento
+    event_store.salvar_evento(created, usuario=telegram_id)
+    freebusy.registrar_ocupado(start_time, end_time, usuario=telegram_id)
+    _notificar("criado", created, chat_id, event_store.chave_calendario(usuario=telegram_id))
 
     print(f"Evento criado: {created.get('htmlLink')} — start: {start_time}")
-    return created.get("htmlLink")
+    return created.get("htmlLink"), conflitos
+
+
+def formatar_conflitos(conflitos):
+    """Texto do aviso de conflito ('' se não houver)."""
+    if not conflitos:
+        return ""
+    horarios = ", ".join(f"{a.strftime('%H:%M')} às {b.strftime('%H:%M')}" for a, b in conflitos)
+    return f"⚠️ Atenção: você já tem compromisso nesse horário ({horarios})."
+
+
+# -------------------------------------------------------------------
+# HORÁRIOS LIVRES
+# -------------------------------------------------------------------
+def listar_horarios_livres(texto, telegram_id=None):
+    """Horários livres do dia pedido ('/livre amanhã à tarde').
+
+    Manhã/tarde/noite limitam a janela; sem período usa o expediente.
+    Uma consulta freebusy por dia, depois o índice local responde.
+    """
+    dt = parse_datetime(texto)
+    if dt is None:
+        return "Não consegui entender o dia. Tente: '/livre hoje', '/livre amanhã à tarde' ou '/livre 29/11/2025'."
+
+    palavras = normalizar_texto(texto).split()
+    nome_periodo = next((p for p in freebusy.PERIODOS if p in palavras), None)
+    hora_inicio, hora_fim = freebusy.PERIODOS.get(nome_periodo, freebusy.EXPEDIENTE)
+
+    dia = dt.date()
+    inicio = TZ.localize(datetime.datetime(dia.year, dia.month, dia.day, hora_inicio))
+    fim = TZ.localize(datetime.datetime(dia.year, dia.month, dia.day, hora_fim))
+
+    # hoje: só o que ainda não passou
+    agora = datetime.datetime.now(TZ).replace(second=0, microsecond=0)
+    inicio = max(inicio, agora)
+    if inicio >= fim:
+        return f"Esse período de {dia.strftime('%d/%m/%Y')} já passou."
+
+    service = authenticate_google(telegram_id)
+    livres = freebusy.horarios_livres(service, inicio, fim, usuario=telegram_id)
+
+    janela = f"{inicio.strftime('%H:%M')}–{fim.strftime('%H:%M')}"
+    if not livres:
+        return f"Você não tem horário livre em {dia.strftime('%d/%m/%Y')} ({janela})."
 
-def listar_eventos_do_dia(texto):
-    service = authenticate_google()
+    resposta = f"Horários livres em {dia.strftime('%d/%m/%Y')} ({janela}):\n\n"
+    for a, b in livres:
+        resposta += f"- {a.strftime('%H:%M')} às {b.strftime('%H:%M')}\n"
+    return resposta
+
+def listar_eventos_do_dia(texto, telegram_id=None):
+    service = authenticate_google(telegram_id)
 
     # tenta parsear data usando a mesma função usada para criar eventos
     dt = parse_datetime(texto)
     if dt is None:
         return "Não consegui entender a data. Tente: 'hoje', 'amanhã' ou '29/11/2025'."
 
-    # início do dia
-    start = dt.replace(hour=0, minute=0, second=0, microsecond=0)
-    # fim do dia
-    end = dt.replace(hour=23, minute=59, second=59, microsecond=0)
+    # lê do store local, trazendo antes só as mudanças desde a última sync
+    with resilience.chamada("calendar", "sincronizar"):
+        event_store.sincronizar(service, usuario=telegram_id)
+    events = event_store.eventos_do_dia(dt.date(), usuario=telegram_id)
 
-    # query no calendar
-    events_result = service.events().list(
-        calendarId="primary",
-        timeMin=start.isoformat(),
-        timeMax=end.isoformat(),
-        singleEvents=True,
-        orderBy="startTime"
-    ).execute()
+    return _texto_da_agenda(dt.date(), [(ev.get("summary", "Sem título"), ev["_inicio"]) for ev in events])
 
-    events = events_result.get("items", [])
 
+def _texto_da_agenda(dia, eventos):
+    """Resposta do /listar para [(título, início)] de um dia."""
     # nenhuma reunião encontrada
-    if not events:
-        return f"Você não tem eventos em {dt.strftime('%d/%m/%Y')}."
+    if not eventos:
+        return f"Você não tem eventos em {dia.strftime('%d/%m/%Y')}."
 
     # monta resposta
-    resposta = f"Eventos em {dt.strftime('%d/%m/%Y')}:\n\n"
-    for ev in events:
-        inicio = ev["start"].get("dateTime", ev["start"].get("date"))
-        inicio_dt = dateparser.parse(inicio)
-        hora_formatada = inicio_dt.strftime("%H:%M")
-        resposta += f"- {ev.get('summary', 'Sem título')} às {hora_formatada}\n"
+    resposta = f"Eventos em {dia.strftime('%d/%m/%Y')}:\n\n"
+    for titulo, inicio in eventos:
+        hora_formatada = inicio.astimezone(TZ).strftime("%H:%M")
+        resposta += f"- {titulo} às {hora_formatada}\n"
 
     return resposta
 
-def remover_evento_por_nome(texto):
-    """Remove o evento mais próximo cujo título contenha o nome informado."""
+def _remover(service, evento, telegram_id):
+    # o googleapiclient já foi carregado pelo service; o import aqui sai de graça
+    from googleapiclient.errors import HttpError
+
+    try:
+        with resilience.chamada("calendar", "remover"):
+            service.events().delete(
+                calendarId="primary",
+                eventId=evento["id"]
+            ).execute()
+    except HttpError as e:
+        # 410: já tinha sido removido no Google, só falta o store local
+        if e.resp.status != 410:
+            raise
+
+    event_store.remover_evento(evento["id"], usuario=telegram_id)
+    freebusy.invalidar(telegram_id)
+    _notificar("removido", evento, calendario=event_store.chave_calendario(usuario=telegram_id))
+
+    return f"Evento '{evento.get('summary')}' removido com sucesso!"
+
 
-    service = authenticate_google()
+def _guardar_escolha(telegram_id, candidatos):
+    with _escolhas_lock:
+        _escolhas[telegram_id] = (time.monotonic() + REMOVER_ESCOLHA_TTL, [ev["id"] for ev in candidatos])
+
+
+def _escolhido(telegram_id, numero):
+    """id do evento da lista mostrada antes ao usuário, ou None (sem lista, vencida ou fora dela)."""
+    with _escolhas_lock:
+        expira_em, ids = _escolhas.get(telegram_id, (0, []))
+        if expira_em < time.monotonic() or not 1 <= numero <= len(ids):
+            return None
+        del _escolhas[telegram_id]
+        return ids[numero - 1]
+
+
+def remover_evento_por_nome(texto, telegram_id=None):
+    """Remove o evento cujo título é parecido com o nome informado.
+
+    Só remove direto quando há um candidato claro (similaridade alta e
+    bem acima do segundo); senão devolve a lista numerada, e o usuário
+    escolhe com o número ("/remover 2").
+    """
+
+    service = authenticate_google(telegram_id)
 
     # limpa o texto
     texto_limpo = re.sub(r"[\/,.:;@#\n]", " ", texto).strip()
@@ -262,44 +306,199 @@ def remover_evento_por_nome(texto):
     if not titulo_tokens:
         return "Diga o nome do evento. Ex: /remover consulta"
 
-    termo = " ".join(titulo_tokens).strip().lower()
+    termo = " ".join(titulo_tokens).strip()
+
+    # resposta a uma lista mostrada antes
+    if termo.isdigit():
+        event_id = _escolhido(telegram_id, int(termo))
+        if event_id is not None:
+            evento_alvo = event_store.obter_evento(event_id, usuario=telegram_id)
+            if evento_alvo is None:
+                return "Esse evento não está mais na sua agenda."
+            return _remover(service, evento_alvo, telegram_id)
 
     # busca TODOS eventos futuros e passados (últimos 30 dias)
     now = datetime.datetime.now(TZ)
     past = now - datetime.timedelta(days=30)
 
-    events_result = service.events().list(
-        calendarId="primary",
-        timeMin=past.isoformat(),
-        timeMax=(now + datetime.timedelta(days=365)).isoformat(),
-        singleEvents=True,
-        orderBy="startTime"
-    ).execute()
-
-    events = events_result.get("items", [])
-
-    # filtra por nome
-    candidatos = []
-    for ev in events:
-        summary = ev.get("summary", "").lower().strip()
-        if termo in summary:
-            # registra evento com data já convertida
-            inicio = ev["start"].get("dateTime", ev["start"].get("date"))
-            dt_inicio = dateparser.parse(inicio)
-            candidatos.append((ev, dt_inicio))
+    with resilience.chamada("calendar", "sincronizar"):
+        event_store.sincronizar(service, usuario=telegram_id)
+
+    # índice de trigramas: ignora acentos e erros de digitação; o primeiro
+    # é o mais parecido e, no empate, o mais próximo no tempo
+    candidatos = event_store.buscar_por_titulo(
+        termo, past, now + datetime.timedelta(days=365), usuario=telegram_id, limite=REMOVER_CANDIDATOS
+    )
 
     if not candidatos:
         return "Não encontrei nenhum evento com esse nome."
 
-    # ordena pelos mais próximos
-    candidatos.sort(key=lambda x: abs((x[1] - now).total_seconds()))
+    melhor = candidatos[0]["_similaridade"]
+    segundo = candidatos[1]["_similaridade"] if len(candidatos) > 1 else 0.0
+    if melhor >= REMOVER_SIMILARIDADE_MIN and melhor - segundo >= REMOVER_MARGEM:
+        return _remover(service, candidatos[0], telegram_id)
+
+    _guardar_escolha(telegram_id, candidatos)
+    resposta = "Qual destes você quer remover?\n\n" if len(candidatos) > 1 else "Você quis dizer este?\n\n"
+    for numero, ev in enumerate(candidatos, start=1):
+        quando = ev["_inicio"].astimezone(TZ).strftime("%d/%m/%Y às %H:%M")
+        resposta += f"{numero}. {ev.get('summary', 'Sem título')} — {quando}\n"
+    resposta += "\nResponda com /remover e o número (ex.: /remover 1)."
+    return resposta
+
+
+# -------------------------------------------------------------------
+# IMPORTAÇÃO / EXPORTAÇÃO ICS
+# -------------------------------------------------------------------
+def importar_agenda_ics(linhas, telegram_id=None):
+    """Importa um .ics (iterável de linhas) em lotes e devolve um resumo para o usuário."""
+    service = authenticate_google(telegram_id)
+    # cada lote passa pelo circuit breaker dentro do ics_io
+    resultado = ics_io.importar_ics(linhas, service, usuario=telegram_id)
+    freebusy.invalidar(telegram_id)
+
+    resposta = f"{len(resultado.importados)} evento(s) importado(s)."
+    if resultado.falhas:
+        resposta += f"\n{len(resultado.falhas)} falha(s):\n"
+        for indice, titulo, erro in resultado.falhas[:10]:
+            resposta += f"- #{indice} {titulo or 'Sem título'}: {erro}\n"
+        if len(resultado.falhas) > 10:
+            resposta += f"... e mais {len(resultado.falhas) - 10}.\n"
+    if resultado.erro:
+        resposta += f"\nImportação interrompida ({resultado.erro}); o restante do arquivo não foi importado."
+    return resposta
+
 
-    evento_alvo = candidatos[0][0]  # pega o mais próximo no tempo
+_DATA_EXPORTACAO = re.compile(r"\d{1,2}/\d{1,2}(?:/\d{2,4})?")
 
-    # remove
-    service.events().delete(
-        calendarId="primary",
-        eventId=evento_alvo["id"]
-    ).execute()
 
-    return f"Evento '{evento_alvo.get('summary')}' removido com sucesso!"
+def exportar_agenda_ics(texto, destino, telegram_id=None):
+    """Exporta para `destino` os eventos entre as duas datas do texto.
+
+    Retorna o número de eventos ou uma mensagem de erro (str).
+    """
+    datas = [parse_datetime(d) for d in _DATA_EXPORTACAO.findall(texto)]
+    if len(datas) != 2 or None in datas:
+        return "Use assim: /exportar 01/12/2025 31/12/2025"
+
+    inicio, fim = sorted(datas)
+    inicio = inicio.replace(hour=0, minute=0, second=0, microsecond=0)
+    fim = fim.replace(hour=23, minute=59, second=59, microsecond=0)
+
+    service = authenticate_google(telegram_id)
+    with resilience.chamada("calendar", "exportar_ics"):
+        return ics_io.exportar_ics(service, inicio, fim, destino)
+
+
+# -------------------------------------------------------------------
+# VARIANTES ASSÍNCRONAS (REST do Calendar pelo httpx compartilhado)
+# async_http (httpx) é importado só quando uma delas é usada
+async def _headers_google(telegram_id=None):
+    # get_credentials pode renovar o token (bloqueante), então roda fora do loop
+    creds = await asyncio.to_thread(get_credentials, telegram_id)
+    return {"Authorization": f"Bearer {creds.token}"}
+
+
+async def listar_eventos_async(inicio, fim, calendar_id="primary", telegram_id=None):
+    """Lista os eventos entre inicio e fim (datetimes aware), com paginação."""
+    from async_http import get_client, limite, timeout
+
+    headers = await _headers_google(telegram_id)
+    url = f"{CALENDAR_API}/calendars/{calendar_id}/events"
+
+    eventos = []
+    page_token = None
+    while True:
+        params = {
+            "timeMin": inicio.isoformat(),
+            "timeMax": fim.isoformat(),
+            "singleEvents": "true",
+            "orderBy": "startTime",
+            "maxResults": 2500,
+            "fields": f"items({EVENT_FIELDS}),nextPageToken",
+        }
+        if page_token:
+            params["pageToken"] = page_token
+
+        async with limite("calendar"):
+            # raise_for_status dentro do with: 5xx/429 contam para o circuit breaker
+            with resilience.chamada("calendar", "listar"):
+                response = await get_client().get(url, params=params, headers=headers, timeout=timeout("calendar"))
+                response.raise_for_status()
+
+        dados = response.json()
+        eventos.extend(dados.get("items", []))
+        page_token = dados.get("nextPageToken")
+        if not page_token:
+            return eventos
+
+
+async def inserir_evento_async(event_body, calendar_id="primary", chat_id=None, telegram_id=None):
+    """Cria o evento e grava no store local (write-through)."""
+    from async_http import get_client, limite, timeout
+
+    headers = await _headers_google(telegram_id)
+    async with limite("calendar"):
+        with resilience.chamada("calendar", "inserir"):
+            response = await get_client().post(
+                f"{CALENDAR_API}/calendars/{calendar_id}/events",
+                params={"fields": EVENT_FIELDS},
+                json=event_body,
+                headers=headers,
+                timeout=timeout("calendar"),
+            )
+            response.raise_for_status()
+
+    created = response.json()
+    await asyncio.to_thread(event_store.salvar_evento, created, calendar_id, telegram_id)
+    if calendar_id == "primary" and "dateTime" in created.get("start", {}):
+        freebusy.registrar_ocupado(
+            datetime.datetime.fromisoformat(created["start"]["dateTime"]),
+            datetime.datetime.fromisoformat(created["end"]["dateTime"]),
+            usuario=telegram_id,
+        )
+    await asyncio.to_thread(
+        _notificar, "criado", created, chat_id, event_store.chave_calendario(calendar_id, telegram_id)
+    )
+    return created
+
+
+async def remover_evento_async(event_id, calendar_id="primary", telegram_id=None):
+    """Remove o evento; 404/410 contam como já removido."""
+    from async_http import get_client, limite, timeout
+
+    headers = await _headers_google(telegram_id)
+    async with limite("calendar"):
+        with resilience.chamada("calendar", "remover"):
+            response = await get_client().delete(
+                f"{CALENDAR_API}/calendars/{calendar_id}/events/{event_id}",
+                headers=headers,
+                timeout=timeout("calendar"),
+            )
+            if response.status_code not in (404, 410):
+                response.raise_for_status()
+
+    await asyncio.to_thread(event_store.remover_evento, event_id, calendar_id, telegram_id)
+    freebusy.invalidar(telegram_id)
+    await asyncio.to_thread(
+        _notificar, "removido", {"id": event_id}, None, event_store.chave_calendario(calendar_id, telegram_id)
+    )
+
+
+def _inicio_do_evento(ev):
+    campo = ev["start"]
+    if "dateTime" in campo:
+        return datetime.datetime.fromisoformat(campo["dateTime"])
+    dia = datetime.date.fromisoformat(campo["date"])
+    return TZ.localize(datetime.datetime(dia.year, dia.month, dia.day))
+
+
+async def listar_eventos_do_dia_async(dia, telegram_id=None):
+    """Texto do /listar para um dia (date), direto da API, sem passar pelo store local.
+
+    Usado pelo resumo diário, que busca agenda, clima e notícias no mesmo loop.
+    """
+    inicio = TZ.localize(datetime.datetime(dia.year, dia.month, dia.day))
+    fim = TZ.localize(datetime.datetime.combine(dia + datetime.timedelta(days=1), datetime.time()))
+    eventos = await listar_eventos_async(inicio, fim, telegram_id=telegram_id)
+    return _texto_da_agenda(dia, [(ev.get("summary", "Sem título"), _inicio_do_evento(ev)) for ev in eventos])
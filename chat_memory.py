@@ -0,0 +1,156 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import messages_from_dict, messages_to_dict
+
+from backend.database import get_connection
+
+
+class BoundedChatMessageHistory(BaseChatMessageHistory):
+    """Histórico de um chat que guarda só as últimas `max_mensagens`.
+
+    `resumo` cobre as `resumidas` primeiras mensagens da lista (ver
+    prompt_budget). Só mensagens já resumidas são descartadas ao passar
+    de max_mensagens, até o teto de 2x, para nada sair sem entrar no resumo.
+    """
+
+    def __init__(self, session_id, max_mensagens, mensagens=None, store=None, resumo="", resumidas=0):
+        self.session_id = session_id
+        self.max_mensagens = max_mensagens
+        self.messages = list(mensagens or [])
+        self.resumo = resumo or ""
+        self.resumidas = min(resumidas or 0, len(self.messages))
+        self.resumindo = False
+        self.alterado = False
+        self.lock = threading.Lock()
+        self._store = store
+        self._aparar()
+
+    def _aparar(self):
+        excesso = len(self.messages) - self.max_mensagens
+        if excesso <= 0:
+            return
+        teto = len(self.messages) - 2 * self.max_mensagens
+        remover = max(min(excesso, self.resumidas), teto)
+        if remover > 0:
+            del self.messages[:remover]
+            self.resumidas = max(0, self.resumidas - remover)
+
+    def add_messages(self, messages):
+        with self.lock:
+            self.messages.extend(messages)
+            self._aparar()
+            self.alterado = True
+        if self._store is not None:
+            self._store.ao_alterar(self)
+
+    def incorporar_resumo(self, resumo, quantidade):
+        """O resumo passa a cobrir mais `quantidade` mensagens (as seguintes às já resumidas)."""
+        with self.lock:
+            self.resumo = resumo
+            self.resumidas = min(self.resumidas + quantidade, len(self.messages))
+            self._aparar()
+            self.alterado = True
+        if self._store is not None:
+            self._store.ao_alterar(self)
+
+    def clear(self):
+        with self.lock:
+            self.messages = []
+            self.resumo = ""
+            self.resumidas = 0
+            self.alterado = True
+        if self._store is not None:
+            self._store.ao_alterar(self)
+
+
+class ChatMemoryStore:
+    """Históricos por chat.id com LRU em memória e persistência em SQLite.
+
+    Só as `max_sessoes` conversas usadas mais recentemente ficam na RAM.
+    Uma sessão despejada é gravada na tabela chat_history (se mudou) e
+    recarregada sob demanda na próxima mensagem daquele chat.
+    """
+
+    def __init__(self, max_sessoes=500, max_mensagens=20):
+        self.max_sessoes = max_sessoes
+        self.max_mensagens = max_mensagens
+        self._sessoes = OrderedDict()  # session_id -> BoundedChatMessageHistory
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------
+    # PERSISTÊNCIA
+    # ---------------------------------------------------------
+    def _carregar(self, session_id):
+        conn = get_connection()
+        linha = conn.execute(
+            "SELECT mensagens, resumo, resumidas FROM chat_history WHERE session_id = ?", (session_id,)
+        ).fetchone()
+
+        if linha is None:
+            return BoundedChatMessageHistory(session_id, self.max_mensagens, store=self)
+        return BoundedChatMessageHistory(
+            session_id, self.max_mensagens, messages_from_dict(json.loads(linha[0])),
+            store=self, resumo=linha[1], resumidas=linha[2],
+        )
+
+    def _salvar(self, historico):
+        with historico.lock:
+            dados = (
+                historico.session_id, json.dumps(messages_to_dict(historico.messages)),
+                historico.resumo, historico.resumidas, time.time(),
+            )
+            historico.alterado = False
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_history (session_id, mensagens, resumo, resumidas, atualizado) "
+                "VALUES (?, ?, ?, ?, ?)",
+                dados,
+            )
+
+    # ---------------------------------------------------------
+    # API
+    # ---------------------------------------------------------
+    def get(self, session_id) -> BaseChatMessageHistory:
+        """Compatível com o get_session_history do RunnableWithMessageHistory."""
+        session_id = str(session_id)
+        with self._lock:
+            historico = self._sessoes.get(session_id)
+            if historico is not None:
+                self._sessoes.move_to_end(session_id)
+                return historico
+
+        historico = self._carregar(session_id)
+
+        with self._lock:
+            # outra thread pode ter carregado a mesma sessão nesse meio tempo
+            atual = self._sessoes.setdefault(session_id, historico)
+            self._sessoes.move_to_end(session_id)
+            despejados = []
+            while len(self._sessoes) > self.max_sessoes:
+                _, antigo = self._sessoes.popitem(last=False)
+                despejados.append(antigo)
+
+        for antigo in despejados:
+            if antigo.alterado:
+                self._salvar(antigo)
+        return atual
+
+    def ao_alterar(self, historico):
+        """Chamado pelo histórico; grava na hora se a sessão já saiu da RAM."""
+        with self._lock:
+            residente = self._sessoes.get(historico.session_id) is historico
+        if not residente:
+            self._salvar(historico)
+
+    def flush(self):
+        """Grava todas as sessões alteradas (usar ao encerrar o bot)."""
+        with self._lock:
+            sessoes = list(self._sessoes.values())
+        for historico in sessoes:
+            if historico.alterado:
+                self._salvar(historico)
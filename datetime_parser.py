@@ -0,0 +1,366 @@
+import re
+import datetime
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+import pytz
+
+from text_utils import normalizar_texto, remover_acentos
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+TIMEZONE = "America/Sao_Paulo"
+TZ = pytz.timezone(TIMEZONE)
+
+# horário usado quando o usuário informa uma data explícita sem hora
+HORA_PADRAO = (9, 0)
+
+MAX_CACHE_FALLBACK = 1024
+
+MESES = {
+    "janeiro": 1, "jan": 1, "fevereiro": 2, "fev": 2, "marco": 3, "mar": 3,
+    "abril": 4, "abr": 4, "maio": 5, "mai": 5, "junho": 6, "jun": 6,
+    "julho": 7, "jul": 7, "agosto": 8, "ago": 8, "setembro": 9, "set": 9,
+    "outubro": 10, "out": 10, "novembro": 11, "nov": 11, "dezembro": 12, "dez": 12,
+}
+
+DIAS_SEMANA = {
+    "segunda": 0, "terca": 1, "quarta": 2, "quinta": 3,
+    "sexta": 4, "sabado": 5, "domingo": 6,
+}
+
+NUMEROS = {
+    "um": 1, "uma": 1, "dois": 2, "duas": 2, "tres": 3, "quatro": 4,
+    "cinco": 5, "seis": 6, "sete": 7, "oito": 8, "nove": 9, "dez": 10,
+}
+
+# -------------------------------------------------------------------
+# GRAMÁTICA (compilada uma vez; o texto já chega sem acentos e minúsculo)
+# -------------------------------------------------------------------
+_MESES_RE = "|".join(sorted(MESES, key=len, reverse=True))
+_DIAS_RE = "|".join(DIAS_SEMANA)
+_NUMEROS_RE = "|".join(NUMEROS)
+
+_GRAMATICA = re.compile(
+    rf"""
+    (?P<relativo>\b(?P<rel_prefixo>daqui\s+a|dentro\s+de|em)\s+
+        (?P<rel_qtd>\d+|meia|{_NUMEROS_RE})\s*
+        (?P<rel_unidade>minutos?|min|horas?|h|dias?|semanas?)\b)
+    |(?P<data_num>\b(?P<dn_d>\d{{1,2}})[/-](?P<dn_m>\d{{1,2}})(?:[/-](?P<dn_a>\d{{4}}|\d{{2}}))?\b)
+    |(?P<data_ext>\b(?P<de_d>\d{{1,2}})\s+de\s+(?P<de_m>{_MESES_RE})\b(?:\s+de\s+(?P<de_a>\d{{4}}))?)
+    |(?P<depois_amanha>\bdepois\s+de\s+amanha\b)
+    |(?P<amanha>\bamanha\b)
+    |(?P<hoje>\bhoje\b)
+    |(?P<semana>\b(?:(?P<sem_proxima>proxim[ao])\s+)?(?P<sem_dia>{_DIAS_RE})(?:[\s-]feira)?\b
+        (?P<sem_que_vem>\s+que\s+vem)?
+        (?P<sem_seguinte>\s+da\s+(?:semana\s+que\s+vem|proxima\s+semana))?)
+    |(?P<hora>\b(?P<h_h>\d{{1,2}})(?::(?P<h_m>\d{{2}})|h(?P<h_m2>\d{{2}})?)\b)
+    |(?P<hora_as>\b(?:as|a)\s+(?P<as_h>\d{{1,2}})\b(?!\s*(?:[/:-]|de\s)))
+    |(?P<meio_dia>\bmeio[\s-]dia\b)
+    |(?P<meia_noite>\bmeia[\s-]noite\b)
+    |(?P<periodo>\b(?:da|de|a)\s+(?P<per_nome>manha|tarde|noite|madrugada)\b)
+    """,
+    flags=re.VERBOSE,
+)
+
+# plano de resolução: tudo o que depende só do texto e da data de hoje.
+# o que depende do relógio (rolagem para o dia seguinte, "daqui a") é
+# resolvido em _resolver, sem precisar reprocessar o texto.
+Plano = namedtuple("Plano", "data hora delta dia_semana explicita")
+
+# horário reconhecido mas impossível ("às 25h", "14h75"): não vale o fallback
+_INVALIDO = object()
+
+_stats = {"chamadas": 0, "rapido": 0, "fallback": 0, "falhas": 0}
+_stats_lock = threading.Lock()
+
+_cache_fallback = OrderedDict()
+_cache_fallback_lock = threading.Lock()
+
+
+# -------------------------------------------------------------------
+# CAMINHO RÁPIDO
+# -------------------------------------------------------------------
+def _ano(valor, padrao):
+    if valor is None:
+        return padrao
+    ano = int(valor)
+    return ano + 2000 if ano < 100 else ano
+
+
+def _data_futura(hoje, dia, mes, ano, futuro):
+    """Sem ano explícito, usa este ano; com `futuro`, o próximo se a data já passou."""
+    if ano is not None:
+        return datetime.date(_ano(ano, hoje.year), mes, dia)
+    data = datetime.date(hoje.year, mes, dia)
+    if futuro and data < hoje:
+        data = datetime.date(hoje.year + 1, mes, dia)
+    return data
+
+
+def _dia_da_semana(hoje, m):
+    alvo = DIAS_SEMANA[m.group("sem_dia")]
+    dias = (alvo - hoje.weekday()) % 7
+
+    if m.group("sem_seguinte"):
+        # "sexta da semana que vem": dia da semana seguinte (começando na segunda)
+        inicio_semana_que_vem = hoje + datetime.timedelta(days=7 - hoje.weekday())
+        return inicio_semana_que_vem + datetime.timedelta(days=alvo), False
+
+    if m.group("sem_proxima") or m.group("sem_que_vem"):
+        # "próxima sexta" / "sexta que vem": próxima ocorrência, nunca hoje
+        return hoje + datetime.timedelta(days=dias or 7), False
+
+    # "sexta": pode ser hoje; se o horário já passou, _resolver pula uma semana
+    return hoje + datetime.timedelta(days=dias), True
+
+
+def _delta_relativo(m):
+    qtd_raw = m.group("rel_qtd")
+    unidade = m.group("rel_unidade")
+
+    if qtd_raw == "meia":
+        if not unidade.startswith("hora"):
+            return None
+        return datetime.timedelta(minutes=30)
+
+    qtd = int(qtd_raw) if qtd_raw.isdigit() else NUMEROS[qtd_raw]
+    if unidade.startswith("min"):
+        return datetime.timedelta(minutes=qtd)
+    if unidade.startswith("h"):
+        return datetime.timedelta(hours=qtd)
+    if unidade.startswith("dia"):
+        return datetime.timedelta(days=qtd)
+    return datetime.timedelta(weeks=qtd)
+
+
+@lru_cache(maxsize=4096)
+def _plano(texto, hoje, futuro):
+    """Percorre o texto uma única vez e monta o plano.
+
+    None se nada foi reconhecido (o fallback tenta); _INVALIDO se o
+    horário está fora de 0-23h / 0-59min.
+    """
+    data = hora = delta = None
+    dia_semana = explicita = False
+    periodo = None
+
+    try:
+        for m in _GRAMATICA.finditer(texto):
+            # lastgroup é sempre a alternativa externa (ela fecha por último)
+            tipo = m.lastgroup
+
+            if tipo == "relativo":
+                # "em 15h" é horário, não duração
+                if m.group("rel_prefixo") == "em" and m.group("rel_unidade") == "h":
+                    if hora is None:
+                        hora = (int(m.group("rel_qtd")), 0) if m.group("rel_qtd").isdigit() else None
+                    continue
+                if delta is None and data is None:
+                    delta = _delta_relativo(m)
+
+            elif tipo == "data_num" and data is None:
+                data = _data_futura(hoje, int(m.group("dn_d")), int(m.group("dn_m")), m.group("dn_a"), futuro)
+                explicita = True
+
+            elif tipo == "data_ext" and data is None:
+                data = _data_futura(hoje, int(m.group("de_d")), MESES[m.group("de_m")], m.group("de_a"), futuro)
+                explicita = True
+
+            elif tipo == "depois_amanha" and data is None:
+                data = hoje + datetime.timedelta(days=2)
+
+            elif tipo == "amanha" and data is None:
+                data = hoje + datetime.timedelta(days=1)
+
+            elif tipo == "hoje" and data is None:
+                data = hoje
+
+            elif tipo == "semana" and data is None:
+                data, dia_semana = _dia_da_semana(hoje, m)
+
+            elif tipo == "hora" and hora is None:
+                minutos = m.group("h_m") or m.group("h_m2") or "0"
+                hora = (int(m.group("h_h")), int(minutos))
+
+            elif tipo == "hora_as" and hora is None:
+                hora = (int(m.group("as_h")), 0)
+
+            elif tipo == "meio_dia" and hora is None:
+                hora = (12, 0)
+
+            elif tipo == "meia_noite" and hora is None:
+                hora = (0, 0)
+
+            elif tipo == "periodo" and periodo is None:
+                periodo = m.group("per_nome")
+    except (ValueError, KeyError):
+        # data impossível (31/02) etc.: deixa o fallback tentar
+        return None
+
+    if hora is not None:
+        h, mn = hora
+        if periodo in ("tarde", "noite") and h < 12:
+            h += 12
+        if not (0 <= h <= 23 and 0 <= mn <= 59):
+            return _INVALIDO
+        hora = (h, mn)
+
+    if delta is not None:
+        if data is None and hora is None:
+            return Plano(None, None, delta, False, False)
+        # "daqui a 2 dias às 15h": a duração só define o dia
+        if data is None and delta.days:
+            data = hoje + datetime.timedelta(days=delta.days)
+
+    if data is None and hora is None:
+        return None
+
+    return Plano(data, hora, None, dia_semana, explicita)
+
+
+def _resolver(plano, now, futuro):
+    """Transforma o plano em datetime aware usando o relógio atual."""
+    if plano.delta is not None:
+        return now + plano.delta
+
+    if plano.data is None:
+        # só horário: hoje, ou (criando evento) amanhã se já passou
+        h, mn = plano.hora
+        candidato = now.replace(hour=h, minute=mn, second=0, microsecond=0)
+        if futuro and candidato < now:
+            candidato += datetime.timedelta(days=1)
+        return candidato
+
+    if plano.hora is not None:
+        h, mn = plano.hora
+    elif plano.explicita:
+        h, mn = HORA_PADRAO
+    else:
+        # "amanhã", "sexta" sem hora: mantém o horário atual
+        h, mn = now.hour, now.minute
+
+    d = plano.data
+    resultado = TZ.localize(datetime.datetime(d.year, d.month, d.day, h, mn))
+    if futuro and plano.dia_semana and resultado < now:
+        resultado += datetime.timedelta(days=7)
+    return resultado
+
+
+# -------------------------------------------------------------------
+# FALLBACK (dateparser, importado só quando necessário)
+# -------------------------------------------------------------------
+def _fallback(texto, now, futuro):
+    import dateparser
+
+    settings = {
+        "DATE_ORDER": "DMY",
+        "PREFER_DATES_FROM": "future" if futuro else "current_period",
+        "TIMEZONE": TIMEZONE,
+        "RETURN_AS_TIMEZONE_AWARE": True,
+        "RELATIVE_BASE": now.replace(tzinfo=None),
+    }
+    data_hora = dateparser.parse(texto, languages=["pt"], settings=settings)
+    if not data_hora:
+        return None
+
+    if data_hora.tzinfo is None:
+        data_hora = TZ.localize(data_hora)
+
+    if futuro and data_hora < now:
+        data_hora += datetime.timedelta(days=1)
+
+    return data_hora
+
+
+def _fallback_memoizado(texto, now, futuro):
+    chave = (texto, now.date(), futuro)
+    with _cache_fallback_lock:
+        if chave in _cache_fallback:
+            _cache_fallback.move_to_end(chave)
+            return _cache_fallback[chave]
+
+    resultado = _fallback(texto, now, futuro)
+
+    with _cache_fallback_lock:
+        _cache_fallback[chave] = resultado
+        if len(_cache_fallback) > MAX_CACHE_FALLBACK:
+            _cache_fallback.popitem(last=False)
+    return resultado
+
+
+# -------------------------------------------------------------------
+# API
+# -------------------------------------------------------------------
+def parse_datetime(texto_raw, now=None, futuro=False):
+    """Retorna datetime timezone-aware a partir de texto PT-BR, ou None.
+
+    Reconhece datas (29/11/2025, 29/11, 15 de dezembro, hoje, amanhã,
+    depois de amanhã, sexta, sexta que vem), horários (15h, 15h30, 15:30,
+    às 15, meio-dia, 3 da tarde) e durações (daqui a 2 horas, em 10 min).
+    Data explícita sem hora vira 09:00.
+
+    Com `futuro` (criação de evento), o que já passou vai para a próxima
+    ocorrência: data sem ano para o ano que vem, só horário para amanhã,
+    "sexta" para a semana seguinte. Sem ele (consultas como /listar e
+    /exportar), "15/03" é deste ano mesmo que já tenha passado.
+
+    O dateparser é usado apenas quando a gramática não reconhece nada;
+    horário impossível (às 25h, 14h75) devolve None sem passar por ele.
+    Os dois caminhos são memoizados por (texto normalizado, dia, futuro).
+    """
+    if now is None:
+        now = datetime.datetime.now(TZ)
+
+    texto = normalizar_texto(texto_raw)
+    plano = _plano(texto, now.date(), futuro)
+
+    if plano is _INVALIDO:
+        resultado = None
+        origem = "falhas"
+    elif plano is not None:
+        resultado = _resolver(plano, now, futuro)
+        origem = "rapido"
+    else:
+        resultado = _fallback_memoizado(texto_raw.lower(), now, futuro)
+        origem = "fallback" if resultado is not None else "falhas"
+
+    with _stats_lock:
+        _stats["chamadas"] += 1
+        _stats[origem] += 1
+
+    return resultado
+
+
+def remover_datas(texto):
+    """Apaga do texto original os trechos reconhecidos como data/hora.
+
+    Usado para limpar o título do evento ("dentista sexta que vem às 10h"
+    -> "dentista"). A normalização é feita caractere a caractere para que
+    as posições dos matches valham no texto original.
+    """
+    dobrado = "".join((remover_acentos(c) or c)[:1].lower()[:1] or c for c in texto)
+    partes = []
+    fim_anterior = 0
+    for m in _GRAMATICA.finditer(dobrado):
+        partes.append(texto[fim_anterior:m.start()])
+        fim_anterior = m.end()
+    partes.append(texto[fim_anterior:])
+    return " ".join(partes)
+
+
+def estatisticas():
+    """Contadores de uso; 'rapido' / 'chamadas' é a taxa do caminho rápido."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def limpar_cache():
+    _plano.cache_clear()
+    with _cache_fallback_lock:
+        _cache_fallback.clear()
+    with _stats_lock:
+        for chave in _stats:
+            _stats[chave] = 0
@@ -0,0 +1,103 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ChatDispatcher:
+    """Executa tarefas num pool limitado mantendo a ordem dentro de cada chat.
+
+    Cada chat tem sua própria fila; no máximo uma tarefa por chat roda por
+    vez, então as mensagens de um mesmo chat.id são tratadas em ordem,
+    enquanto chats diferentes rodam em paralelo. O total de tarefas
+    pendentes é limitado: acima de `max_pendentes`, submit devolve False.
+    """
+
+    def __init__(self, max_workers=8, max_pendentes=200):
+        self.max_pendentes = max_pendentes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat")
+        self._filas = {}       # chat_id -> deque de (fn, args)
+        self._pendentes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pendentes(self):
+        return self._pendentes
+
+    def submit(self, chat_id, fn, *args):
+        """Enfileira fn(*args) para o chat; False se a fila global está cheia."""
+        with self._lock:
+            if self._pendentes >= self.max_pendentes:
+                return False
+            self._pendentes += 1
+
+            fila = self._filas.get(chat_id)
+            if fila is not None:
+                # já existe uma tarefa do chat em andamento; ela drena a fila
+                fila.append((fn, args))
+                return True
+            self._filas[chat_id] = deque([(fn, args)])
+
+        self._executor.submit(self._executar_proxima, chat_id)
+        return True
+
+    def _executar_proxima(self, chat_id):
+        with self._lock:
+            fn, args = self._filas[chat_id].popleft()
+
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"Erro no dispatcher (chat {chat_id}): {e}")
+
+        with self._lock:
+            self._pendentes -= 1
+            if self._filas[chat_id]:
+                continuar = True
+            else:
+                del self._filas[chat_id]
+                continuar = False
+
+        # devolve a vez ao pool em vez de prender o worker neste chat
+        if continuar:
+            self._executor.submit(self._executar_proxima, chat_id)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+# -------------------------------------------------------------------
+# INTEGRAÇÃO COM O TELEBOT
+# -------------------------------------------------------------------
+def chat_id_do_update(update):
+    """chat.id de onde o update veio (None para updates sem chat)."""
+    for campo in ("message", "edited_message", "channel_post", "edited_channel_post"):
+        mensagem = getattr(update, campo, None)
+        if mensagem is not None:
+            return mensagem.chat.id
+
+    callback = getattr(update, "callback_query", None)
+    if callback is not None and callback.message is not None:
+        return callback.message.chat.id
+    return None
+
+
+def instalar_dispatcher(bot, dispatcher, mensagem_ocupado):
+    """Faz o bot entregar cada update ao dispatcher em vez de processar em linha.
+
+    O polling (e qualquer outra fonte de updates) chama
+    bot.process_new_updates; aqui cada update vira uma tarefa na fila do
+    seu chat. Se a fila global estiver cheia, o usuário é avisado.
+    """
+    processar = bot.process_new_updates
+
+    def process_new_updates(updates):
+        for update in updates:
+            chat_id = chat_id_do_update(update)
+            if not dispatcher.submit(chat_id, processar, [update]) and chat_id is not None:
+                try:
+                    bot.send_message(chat_id, mensagem_ocupado)
+                except Exception as e:
+                    print(f"Erro ao avisar fila cheia: {e}")
+
+    bot.process_new_updates = process_new_updates
+    return bot
@@ -0,0 +1,178 @@
+import os
+import time
+import bisect
+import datetime
+import threading
+
+import pytz
+
+import resilience
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+TZ = pytz.timezone("America/Sao_Paulo")
+
+# por quanto tempo os blocos ocupados de um usuário valem sem nova consulta
+# (mudanças feitas fora do bot só aparecem depois disso)
+FREEBUSY_TTL = int(os.getenv("FREEBUSY_TTL", "300"))
+
+# janelas (hora inicial, hora final) usadas pelo /livre
+PERIODOS = {"manha": (8, 12), "tarde": (12, 18), "noite": (18, 22)}
+EXPEDIENTE = (8, 20)
+
+# intervalos livres menores que isso não são sugeridos
+DURACAO_MINIMA = datetime.timedelta(minutes=30)
+
+
+# -------------------------------------------------------------------
+# ÍNDICE DE INTERVALOS
+# -------------------------------------------------------------------
+class Intervalos:
+    """Intervalos [inicio, fim) disjuntos e ordenados, em timestamps.
+
+    Intervalos que se tocam ou se sobrepõem são fundidos ao entrar, então
+    inícios e fins ficam ordenados juntos e a busca por sobreposição é um
+    bisect em cada lista: O(log n + k) para k blocos no resultado.
+    """
+
+    def __init__(self):
+        self._inicios = []
+        self._fins = []
+
+    def __len__(self):
+        return len(self._inicios)
+
+    def adicionar(self, inicio, fim):
+        if fim <= inicio:
+            return
+        # blocos que encostam em [inicio, fim] são fundidos com ele
+        i = bisect.bisect_left(self._fins, inicio)
+        j = bisect.bisect_right(self._inicios, fim)
+        if i < j:
+            inicio = min(inicio, self._inicios[i])
+            fim = max(fim, self._fins[j - 1])
+        self._inicios[i:j] = [inicio]
+        self._fins[i:j] = [fim]
+
+    def sobrepostos(self, inicio, fim):
+        """Blocos que têm algum instante dentro de [inicio, fim)."""
+        i = bisect.bisect_right(self._fins, inicio)
+        j = bisect.bisect_left(self._inicios, fim)
+        return list(zip(self._inicios[i:j], self._fins[i:j]))
+
+    def cobre(self, inicio, fim):
+        """True se [inicio, fim] está inteiro dentro de um único bloco."""
+        i = bisect.bisect_right(self._inicios, inicio) - 1
+        return i >= 0 and self._fins[i] >= fim
+
+    def lacunas(self, inicio, fim):
+        """Trechos de [inicio, fim) que não estão em nenhum bloco."""
+        livres = []
+        cursor = inicio
+        for b_inicio, b_fim in self.sobrepostos(inicio, fim):
+            if b_inicio > cursor:
+                livres.append((cursor, b_inicio))
+            cursor = max(cursor, b_fim)
+        if cursor < fim:
+            livres.append((cursor, fim))
+        return livres
+
+
+class _IndiceUsuario:
+    def __init__(self):
+        self.ocupado = Intervalos()
+        self.consultado = Intervalos()  # faixas já trazidas do freebusy
+        self.criado_em = time.monotonic()
+
+
+# -------------------------------------------------------------------
+# ÍNDICE POR USUÁRIO
+# -------------------------------------------------------------------
+_indices = {}  # usuario (telegram_id ou None para o dono) -> _IndiceUsuario
+_lock = threading.Lock()
+
+
+def _indice(usuario):
+    """Índice do usuário; recomeça do zero depois de FREEBUSY_TTL."""
+    indice = _indices.get(usuario)
+    if indice is None or time.monotonic() - indice.criado_em > FREEBUSY_TTL:
+        indice = _indices[usuario] = _IndiceUsuario()
+    return indice
+
+
+def _consultar_api(service, inicio, fim):
+    """Uma chamada freebusy.query para [inicio, fim); devolve [(inicio, fim)] em timestamps."""
+    with resilience.chamada("calendar", "freebusy"):
+        resposta = service.freebusy().query(body={
+            "timeMin": inicio.isoformat(),
+            "timeMax": fim.isoformat(),
+            "items": [{"id": "primary"}],
+        }).execute()
+
+    blocos = resposta.get("calendars", {}).get("primary", {}).get("busy", [])
+    return [
+        (
+            datetime.datetime.fromisoformat(b["start"]).timestamp(),
+            datetime.datetime.fromisoformat(b["end"]).timestamp(),
+        )
+        for b in blocos
+    ]
+
+
+def _garantir(service, inicio, fim, usuario):
+    """Traz do Calendar os dias de [inicio, fim) que o índice ainda não conhece."""
+    # consulta dias inteiros: /marcar e /livre do mesmo dia usam a mesma chamada
+    dia_inicio = inicio.astimezone(TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+    dia_fim = TZ.normalize(fim.astimezone(TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+                           + datetime.timedelta(days=1))
+    ts_inicio, ts_fim = inicio.timestamp(), fim.timestamp()
+
+    with _lock:
+        indice = _indice(usuario)
+        if indice.consultado.cobre(ts_inicio, ts_fim):
+            return indice
+
+    blocos = _consultar_api(service, dia_inicio, dia_fim)
+
+    with _lock:
+        indice = _indice(usuario)
+        for b_inicio, b_fim in blocos:
+            indice.ocupado.adicionar(b_inicio, b_fim)
+        indice.consultado.adicionar(dia_inicio.timestamp(), dia_fim.timestamp())
+        return indice
+
+
+def conflitos(service, inicio, fim, usuario=None):
+    """Blocos ocupados que se sobrepõem a [inicio, fim), como datetimes em TZ."""
+    indice = _garantir(service, inicio, fim, usuario)
+    with _lock:
+        blocos = indice.ocupado.sobrepostos(inicio.timestamp(), fim.timestamp())
+    return [(datetime.datetime.fromtimestamp(a, TZ), datetime.datetime.fromtimestamp(b, TZ)) for a, b in blocos]
+
+
+def horarios_livres(service, inicio, fim, usuario=None, duracao_minima=DURACAO_MINIMA):
+    """Trechos livres de [inicio, fim) com pelo menos duracao_minima."""
+    indice = _garantir(service, inicio, fim, usuario)
+    with _lock:
+        livres = indice.ocupado.lacunas(inicio.timestamp(), fim.timestamp())
+    minimo = duracao_minima.total_seconds()
+    return [
+        (datetime.datetime.fromtimestamp(a, TZ), datetime.datetime.fromtimestamp(b, TZ))
+        for a, b in livres
+        if b - a >= minimo
+    ]
+
+
+def registrar_ocupado(inicio, fim, usuario=None):
+    """Write-through de um evento criado pelo bot (só se o dia já está no índice)."""
+    with _lock:
+        indice = _indices.get(usuario)
+        if indice is not None:
+            indice.ocupado.adicionar(inicio.timestamp(), fim.timestamp())
+
+
+def invalidar(usuario=None):
+    """Esquece o índice do usuário (remoções não dá para descontar de blocos fundidos)."""
+    with _lock:
+        _indices.pop(usuario, None)
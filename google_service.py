@@ -0,0 +1,295 @@
+import os
+import json
+import datetime
+import threading
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from backend import credential_store
+import resilience
+
+load_dotenv()
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+SCOPES = ["https://www.googleapis.com/auth/calendar"]
+TOKEN_FILE = "token.json"
+CREDENTIALS_FILE = "credentials.json"
+
+# raiz das APIs do Google; trocar só para apontar para um servidor fake
+GOOGLE_API_URL = os.getenv("GOOGLE_API_URL", "https://www.googleapis.com").rstrip("/")
+
+# timeout (s) das chamadas feitas pelo googleapiclient (o httplib2 só tem um,
+# então vale o de leitura do Calendar em resilience.TIMEOUTS)
+HTTP_TIMEOUT = resilience.timeout("calendar")[1]
+
+# renova o token só quando faltar menos que isso para expirar
+REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+# credenciais de usuários que ficam decifradas em memória (LRU)
+CREDENCIAIS_MAX = int(os.getenv("CREDENCIAIS_MAX", "1000"))
+
+# o dono do bot (CHAT_ID) continua usando o token.json
+DONO = os.getenv("CHAT_ID")
+
+# transportes HTTP guardados por thread antes de descartar os mais antigos
+TRANSPORTES_POR_THREAD = 64
+
+# _lock protege os caches; o load/refresh de cada conta roda sob a trava da conta
+_lock = threading.Lock()
+_travas = {}                 # chave -> [Lock, threads usando/esperando]
+_credenciais = OrderedDict() # chave -> Credentials (LRU)
+_token_salvo = {}            # chave -> json gravado por último
+_servicos = OrderedDict()    # chave -> service do calendar (LRU)
+_client_config = None        # client_id/secret do credentials.json
+_documento = None            # discovery do Calendar v3, já parseado
+_local = threading.local()   # transporte HTTP por thread (httplib2 não é thread-safe)
+
+
+class ContaNaoVinculada(Exception):
+    """O usuário ainda não autorizou o acesso à agenda dele."""
+
+
+def _chave(telegram_id, token_file):
+    """("arquivo", token.json) para o dono; ("usuario", id) para os demais."""
+    if telegram_id is None or str(telegram_id) == DONO:
+        return ("arquivo", token_file)
+    return ("usuario", str(telegram_id))
+
+
+# -------------------------------------------------------------------
+# CREDENCIAIS
+# -------------------------------------------------------------------
+def _precisa_renovar(creds):
+    """True se o token já expirou ou vai expirar dentro da margem."""
+    if not creds.token:
+        return True
+    if creds.expiry is None:
+        return False
+    # google-auth guarda expiry como datetime UTC sem tzinfo
+    agora = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return creds.expiry - agora < REFRESH_MARGIN
+
+
+def _config_do_cliente():
+    """client_id/client_secret/token_uri do credentials.json (lido uma vez)."""
+    global _client_config
+    if _client_config is None:
+        with open(CREDENTIALS_FILE) as f:
+            dados = json.load(f)
+        cliente = dados.get("installed") or dados.get("web")
+        _client_config = {
+            "client_id": cliente["client_id"],
+            "client_secret": cliente["client_secret"],
+            "token_uri": cliente.get("token_uri", "https://oauth2.googleapis.com/token"),
+        }
+    return _client_config
+
+
+def _salvar_se_mudou(chave, creds):
+    """Grava o token apenas quando o conteúdo realmente mudou."""
+    conteudo = creds.to_json()
+    if _token_salvo.get(chave) == conteudo:
+        return
+    tipo, ident = chave
+    if tipo == "arquivo":
+        with open(ident, "w") as token:
+            token.write(conteudo)
+    else:
+        credential_store.salvar(ident, conteudo)
+    _token_salvo[chave] = conteudo
+
+
+def _carregar_credenciais(chave):
+    # google-auth só é importado quando alguma conta é carregada de fato
+    from google.oauth2.credentials import Credentials
+
+    tipo, ident = chave
+    if tipo == "arquivo":
+        if not os.path.exists(ident):
+            return None
+        with open(ident) as token:
+            conteudo = token.read()
+        creds = Credentials.from_authorized_user_info(json.loads(conteudo), SCOPES)
+        _token_salvo[chave] = conteudo
+        return creds
+
+    info = credential_store.carregar(ident)
+    if info is None:
+        return None
+    creds = Credentials.from_authorized_user_info({**_config_do_cliente(), **info}, SCOPES)
+    _token_salvo[chave] = creds.to_json()
+    return creds
+
+
+def _guardar(chave, creds):
+    """Coloca no LRU (com _lock), descartando as contas menos usadas."""
+    _credenciais[chave] = creds
+    _credenciais.move_to_end(chave)
+    while len(_credenciais) > CREDENCIAIS_MAX:
+        antiga, _ = _credenciais.popitem(last=False)
+        _token_salvo.pop(antiga, None)
+        _servicos.pop(antiga, None)
+        _descartar_trava(antiga)
+
+
+def _descartar_trava(chave):
+    """Tira a trava da conta só se ninguém a usa nem espera por ela (com _lock).
+
+    Senão uma terceira thread criaria outra trava para a mesma conta e
+    carregaria/renovaria o token junto com quem ainda segura a antiga.
+    """
+    entrada = _travas.get(chave)
+    if entrada is not None and entrada[1] == 0:
+        del _travas[chave]
+
+
+def get_credentials(telegram_id=None, token_file=TOKEN_FILE):
+    """Retorna as credenciais do usuário, renovando só perto do vencimento.
+
+    No caminho quente (conta em cache e token válido) não há disco nem
+    rede. Sem telegram_id, ou para o dono do bot, usa o token.json; os
+    demais usuários vêm da tabela users (tokens cifrados).
+    """
+    chave = _chave(telegram_id, token_file)
+    with _lock:
+        creds = _credenciais.get(chave)
+        if creds is not None:
+            _credenciais.move_to_end(chave)
+            if not _precisa_renovar(creds):
+                return creds
+        entrada = _travas.setdefault(chave, [threading.Lock(), 0])
+        entrada[1] += 1
+
+    try:
+        with entrada[0]:
+            return _carregar_ou_renovar(chave)
+    finally:
+        with _lock:
+            entrada[1] -= 1
+            if chave not in _credenciais:
+                _descartar_trava(chave)
+
+
+def _carregar_ou_renovar(chave):
+    """Roda sob a trava da conta."""
+    # outro thread pode ter carregado/renovado enquanto esperávamos
+    creds = _credenciais.get(chave) or _carregar_credenciais(chave)
+
+    if not creds or (_precisa_renovar(creds) and not creds.refresh_token):
+        if chave[0] == "usuario":
+            raise ContaNaoVinculada(f"usuário {chave[1]} sem conta Google vinculada")
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
+        creds = flow.run_local_server(port=0)
+    elif _precisa_renovar(creds):
+        from google.auth.transport.requests import Request
+        creds.refresh(Request())
+
+    _salvar_se_mudou(chave, creds)
+    with _lock:
+        _guardar(chave, creds)
+    return creds
+
+
+def vincular_usuario(telegram_id, email=None):
+    """Autoriza a agenda de um usuário (fluxo OAuth local) e grava na tabela users."""
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
+    creds = flow.run_local_server(port=0)
+    credential_store.salvar(telegram_id, creds.to_json(), email)
+
+    chave = _chave(telegram_id, TOKEN_FILE)
+    with _lock:
+        _token_salvo[chave] = creds.to_json()
+        _guardar(chave, creds)
+    return creds
+
+
+# -------------------------------------------------------------------
+# SERVICE DO CALENDAR
+# -------------------------------------------------------------------
+def _documento_calendar():
+    """Discovery do Calendar v3 que vem junto com o googleapiclient.
+
+    É lido e parseado uma vez por processo, sem rede; cada build por
+    usuário reaproveita o mesmo dict.
+    """
+    global _documento
+    if _documento is None:
+        from googleapiclient.discovery_cache import get_static_doc
+        _documento = json.loads(get_static_doc("calendar", "v3"))
+    return _documento
+
+
+def _http_da_thread(chave, creds_padrao):
+    """Um AuthorizedHttp (com pool de conexões) por conta e por thread."""
+    import httplib2
+    import google_auth_httplib2
+
+    transportes = getattr(_local, "transportes", None)
+    if transportes is None or len(transportes) > TRANSPORTES_POR_THREAD:
+        transportes = _local.transportes = {}
+
+    creds = _credenciais.get(chave) or creds_padrao
+    atual = transportes.get(chave)
+    if atual is None or atual.credentials is not creds:
+        atual = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+        transportes[chave] = atual
+    return atual
+
+
+def get_calendar_service(telegram_id=None, token_file=TOKEN_FILE):
+    """Retorna o service do calendar da conta, montado uma vez e mantido em LRU.
+
+    O build usa o discovery local (_documento_calendar); as requisições
+    seguintes usam o transporte HTTP da thread que as executa.
+    """
+    creds = get_credentials(telegram_id, token_file)
+    chave = _chave(telegram_id, token_file)
+
+    with _lock:
+        servico = _servicos.get(chave)
+        if servico is not None:
+            _servicos.move_to_end(chave)
+            return servico
+
+        from googleapiclient.discovery import build_from_document
+        from googleapiclient.http import HttpRequest
+
+        def request_builder(http, *args, **kwargs):
+            return HttpRequest(_http_da_thread(chave, creds), *args, **kwargs)
+
+        servico = build_from_document(
+            _documento_calendar(),
+            credentials=creds,
+            requestBuilder=request_builder,
+            client_options={"api_endpoint": f"{GOOGLE_API_URL}/calendar/v3/"},
+        )
+        _servicos[chave] = servico
+        while len(_servicos) > CREDENCIAIS_MAX:
+            _servicos.popitem(last=False)
+    return servico
+
+
+def limpar_cache():
+    """Descarta credenciais, services e transportes em cache (usado no benchmark)."""
+    with _lock:
+        _credenciais.clear()
+        _token_salvo.clear()
+        _servicos.clear()
+        for chave in list(_travas):
+            _descartar_trava(chave)
+    _local.__dict__.clear()
+
+
+if __name__ == "__main__":
+    # python google_service.py vincular <telegram_id> [email]
+    import sys
+    if len(sys.argv) >= 3 and sys.argv[1] == "vincular":
+        vincular_usuario(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        print(f"Conta Google vinculada ao usuário {sys.argv[2]}.")
+    else:
+        print("uso: python google_service.py vincular <telegram_id> [email]")
@@ -0,0 +1,29 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# -------------------------------------------------------------------
+# SESSION HTTP COMPARTILHADA
+# -------------------------------------------------------------------
+# uma única Session por processo reaproveita conexões TCP/TLS entre
+# chamadas (keep-alive) em vez de abrir uma nova a cada requests.get
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 20
+
+_session = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """Retorna a requests.Session compartilhada, com pool de conexões."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
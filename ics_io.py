@@ -0,0 +1,314 @@
+import re
+import datetime
+from collections import namedtuple
+
+import pytz
+
+import resilience
+from backend import event_store
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+TIMEZONE = "America/Sao_Paulo"
+TZ = pytz.timezone(TIMEZONE)
+EVENT_FIELDS = "id,status,summary,start,end,htmlLink"
+
+# o Calendar aceita até 50 chamadas por batch sem reclamar de limite
+TAMANHO_LOTE = 50
+
+DURACAO_PADRAO = datetime.timedelta(minutes=30)  # a mesma do create_event_from_text
+
+# erro: por que a importação parou no meio (None se o arquivo foi até o fim)
+ResultadoImportacao = namedtuple("ResultadoImportacao", "importados falhas erro", defaults=(None,))
+
+_ESCAPES_LEITURA = re.compile(r"\\([\\;,nN])")
+_DATA_HORA = re.compile(r"^(\d{4})(\d{2})(\d{2})(?:T(\d{2})(\d{2})(\d{2})(Z)?)?$")
+
+
+# -------------------------------------------------------------------
+# LEITURA (streaming)
+# -------------------------------------------------------------------
+def _desdobrar(linhas):
+    """Junta as linhas dobradas do ICS (continuação começa com espaço/tab).
+
+    Linhas vazias não existem no formato e são puladas: um CRLF partido
+    entre dois chunks do download vira uma linha vazia, que não pode
+    virar o início da linha seguinte.
+    """
+    atual = None
+    for linha in linhas:
+        linha = linha.rstrip("\r\n")
+        if not linha:
+            continue
+        if linha[:1] in (" ", "\t") and atual is not None:
+            atual += linha[1:]
+            continue
+        if atual is not None:
+            yield atual
+        atual = linha
+    if atual:
+        yield atual
+
+
+def _propriedade(linha):
+    """'DTSTART;TZID=America/Sao_Paulo:20251201T150000' -> (nome, params, valor)."""
+    cabecalho, _, valor = linha.partition(":")
+    partes = cabecalho.split(";")
+    params = {}
+    for parte in partes[1:]:
+        chave, _, v = parte.partition("=")
+        params[chave.upper()] = v.strip('"')
+    return partes[0].upper(), params, valor
+
+
+def ler_vevents(linhas):
+    """Gera um dict {propriedade: (params, valor)} por VEVENT, sem ler o arquivo todo."""
+    evento = None
+    profundidade = 0  # ignora VALARM e outros blocos dentro do VEVENT
+    for linha in _desdobrar(linhas):
+        nome, params, valor = _propriedade(linha)
+        if nome == "BEGIN":
+            if valor.upper() == "VEVENT":
+                evento = {}
+            elif evento is not None:
+                profundidade += 1
+        elif nome == "END":
+            if valor.upper() == "VEVENT" and evento is not None:
+                yield evento
+                evento = None
+            elif evento is not None and profundidade:
+                profundidade -= 1
+        elif evento is not None and not profundidade and nome not in evento:
+            evento[nome] = (params, valor)
+
+
+def _texto(valor):
+    return _ESCAPES_LEITURA.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), valor)
+
+
+def _data_google(params, valor):
+    """Converte DTSTART/DTEND para o formato {date} / {dateTime, timeZone} do Google."""
+    m = _DATA_HORA.match(valor.strip())
+    if not m:
+        raise ValueError(f"data inválida: {valor}")
+    ano, mes, dia, h, mn, s, utc = m.groups()
+
+    if h is None or params.get("VALUE", "").upper() == "DATE":
+        return {"date": f"{ano}-{mes}-{dia}"}
+
+    local = f"{ano}-{mes}-{dia}T{h}:{mn}:{s}"
+    if utc:
+        return {"dateTime": local + "Z", "timeZone": "UTC"}
+    return {"dateTime": local, "timeZone": params.get("TZID", TIMEZONE)}
+
+
+def _somar(campo, delta):
+    if "date" in campo:
+        dia = datetime.date.fromisoformat(campo["date"]) + datetime.timedelta(days=max(delta.days, 1))
+        return {"date": dia.isoformat()}
+    inicio = datetime.datetime.fromisoformat(campo["dateTime"].replace("Z", ""))
+    fim = (inicio + delta).isoformat()
+    return {"dateTime": fim + ("Z" if campo["dateTime"].endswith("Z") else ""), "timeZone": campo["timeZone"]}
+
+
+_DURACAO = re.compile(r"^P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+def _duracao(valor):
+    m = _DURACAO.match(valor.strip())
+    if not m:
+        return DURACAO_PADRAO
+    semanas, dias, horas, minutos, segundos = (int(x or 0) for x in m.groups())
+    return datetime.timedelta(weeks=semanas, days=dias, hours=horas, minutes=minutos, seconds=segundos)
+
+
+def vevent_para_body(vevent):
+    """Monta o body do events.insert no mesmo formato do create_event_from_text."""
+    start = _data_google(*vevent["DTSTART"])
+
+    if "DTEND" in vevent:
+        end = _data_google(*vevent["DTEND"])
+    elif "DURATION" in vevent:
+        end = _somar(start, _duracao(vevent["DURATION"][1]))
+    else:
+        end = _somar(start, DURACAO_PADRAO)
+
+    body = {
+        "summary": _texto(vevent.get("SUMMARY", ({}, "Evento"))[1]) or "Evento",
+        "start": start,
+        "end": end,
+    }
+    if "DESCRIPTION" in vevent:
+        body["description"] = _texto(vevent["DESCRIPTION"][1])
+    if "LOCATION" in vevent:
+        body["location"] = _texto(vevent["LOCATION"][1])
+    if "RRULE" in vevent:
+        body["recurrence"] = ["RRULE:" + vevent["RRULE"][1]]
+    return body
+
+
+# -------------------------------------------------------------------
+# IMPORTAÇÃO EM LOTES
+# -------------------------------------------------------------------
+def _enviar_lote(service, calendar_id, lote, importados, falhas, usuario):
+    """Envia um lote; se o batch inteiro falhar, os eventos sem resposta vão para `falhas` e o erro sobe."""
+    respondidos = set()
+
+    def callback(request_id, response, exception):
+        respondidos.add(int(request_id))
+        indice, body = lote[int(request_id)]
+        if exception is not None:
+            falhas.append((indice, body.get("summary"), str(exception)))
+        else:
+            # já existe no Google: conta como importado mesmo se o store local falhar
+            importados.append(response["id"])
+            # evento com RRULE: a resposta é o mestre da série e a sync (singleEvents)
+            # traz as ocorrências; gravar o mestre duplicaria a primeira delas
+            if "recurrence" in body:
+                return
+            try:
+                event_store.salvar_evento(response, calendar_id, usuario)
+            except Exception as e:
+                print(f"Erro ao gravar evento importado no store local: {e}")
+
+    batch = service.new_batch_http_request(callback=callback)
+    for request_id, (_, body) in enumerate(lote):
+        batch.add(
+            service.events().insert(calendarId=calendar_id, body=body, fields=EVENT_FIELDS),
+            request_id=str(request_id),
+        )
+    try:
+        with resilience.chamada("calendar", "importar_ics"):
+            batch.execute()
+    except Exception as e:
+        for posicao, (indice, body) in enumerate(lote):
+            if posicao not in respondidos:
+                falhas.append((indice, body.get("summary"), str(e)))
+        raise
+
+
+def importar_ics(linhas, service, calendar_id="primary", tamanho_lote=TAMANHO_LOTE, usuario=None):
+    """Importa os VEVENTs de um ICS usando batch requests do Google.
+
+    `linhas` pode ser qualquer iterável de linhas (arquivo aberto, resposta
+    HTTP em streaming); só um lote fica em memória por vez. Eventos que
+    não dão para converter ou que a API recusa vão para `falhas` como
+    (posição no arquivo, título, erro), sem interromper o resto.
+
+    Se um lote inteiro falhar (rede, serviço fora), a importação para
+    ali e devolve o que já foi gravado, com o motivo em `erro`.
+    """
+    importados = []
+    falhas = []
+    lote = []
+
+    for indice, vevent in enumerate(ler_vevents(linhas), start=1):
+        try:
+            lote.append((indice, vevent_para_body(vevent)))
+        except KeyError as e:
+            falhas.append((indice, _texto(vevent.get("SUMMARY", ({}, ""))[1]), f"evento sem {e.args[0]}"))
+            continue
+        except ValueError as e:
+            falhas.append((indice, _texto(vevent.get("SUMMARY", ({}, ""))[1]), str(e)))
+            continue
+
+        if len(lote) >= tamanho_lote:
+            try:
+                _enviar_lote(service, calendar_id, lote, importados, falhas, usuario)
+            except Exception as e:
+                return ResultadoImportacao(importados, falhas, str(e))
+            lote = []
+
+    if lote:
+        try:
+            _enviar_lote(service, calendar_id, lote, importados, falhas, usuario)
+        except Exception as e:
+            return ResultadoImportacao(importados, falhas, str(e))
+
+    return ResultadoImportacao(importados, falhas)
+
+
+# -------------------------------------------------------------------
+# EXPORTAÇÃO (streaming)
+# -------------------------------------------------------------------
+def _escapar(texto):
+    return (
+        texto.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+    )
+
+
+def _dobrar(linha):
+    """Quebra linhas com mais de 75 octetos, como pede a RFC 5545."""
+    dados = linha.encode("utf-8")
+    if len(dados) <= 75:
+        return linha + "\r\n"
+
+    partes = []
+    limite = 75
+    while dados:
+        corte = min(limite, len(dados))
+        # não corta no meio de um caractere UTF-8
+        while corte < len(dados) and (dados[corte] & 0xC0) == 0x80:
+            corte -= 1
+        partes.append(dados[:corte].decode("utf-8"))
+        dados = dados[corte:]
+        limite = 74  # as continuações começam com um espaço
+    return "\r\n ".join(partes) + "\r\n"
+
+
+def _data_ics(campo):
+    if "date" in campo:
+        return ";VALUE=DATE:" + campo["date"].replace("-", "")
+    dt = datetime.datetime.fromisoformat(campo["dateTime"]).astimezone(pytz.utc)
+    return ":" + dt.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _linhas_vevent(ev, agora):
+    yield "BEGIN:VEVENT"
+    yield f"UID:{ev['id']}@google.com"
+    yield f"DTSTAMP:{agora}"
+    yield "DTSTART" + _data_ics(ev["start"])
+    yield "DTEND" + _data_ics(ev.get("end", ev["start"]))
+    yield "SUMMARY:" + _escapar(ev.get("summary", "Sem título"))
+    if ev.get("description"):
+        yield "DESCRIPTION:" + _escapar(ev["description"])
+    if ev.get("location"):
+        yield "LOCATION:" + _escapar(ev["location"])
+    yield "END:VEVENT"
+
+
+def exportar_ics(service, inicio, fim, destino, calendar_id="primary"):
+    """Escreve em `destino` (arquivo texto) os eventos entre inicio e fim.
+
+    As páginas da API são escritas conforme chegam, então a memória
+    usada não depende do tamanho da agenda. Retorna quantos eventos saíram.
+    """
+    agora = datetime.datetime.now(pytz.utc).strftime("%Y%m%dT%H%M%SZ")
+    destino.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//MIA//Virtual Agent//PT-BR\r\n")
+
+    total = 0
+    page_token = None
+    while True:
+        resultado = service.events().list(
+            calendarId=calendar_id,
+            timeMin=inicio.isoformat(),
+            timeMax=fim.isoformat(),
+            singleEvents=True,
+            orderBy="startTime",
+            maxResults=2500,
+            fields="items(id,summary,description,location,start,end),nextPageToken",
+            pageToken=page_token,
+        ).execute()
+
+        for ev in resultado.get("items", []):
+            for linha in _linhas_vevent(ev, agora):
+                destino.write(_dobrar(linha))
+            total += 1
+
+        page_token = resultado.get("nextPageToken")
+        if not page_token:
+            break
+
+    destino.write("END:VCALENDAR\r\n")
+    return total
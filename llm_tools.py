@@ -0,0 +1,177 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+import metrics
+import resilience
+from google_service import ContaNaoVinculada
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+# chamadas de ferramenta do mesmo turno rodam juntas (ex.: clima em duas cidades + agenda)
+FERRAMENTAS_WORKERS = int(os.getenv("FERRAMENTAS_WORKERS", "8"))
+
+# quantas vezes seguidas o modelo pode pedir ferramentas antes de ter que responder
+FERRAMENTAS_MAX_RODADAS = int(os.getenv("FERRAMENTAS_MAX_RODADAS", "3"))
+
+ERROS_FERRAMENTA = metrics.Contador(
+    "mia_ferramenta_erros_total", "Ferramentas do LLM que terminaram em erro.", ("ferramenta",),
+)
+FERRAMENTAS = metrics.Histograma(
+    "mia_ferramenta_segundos", "Duração de cada ferramenta chamada pelo LLM.", ("ferramenta",),
+    erros=ERROS_FERRAMENTA,
+)
+
+
+def _usuario(config):
+    """(chat_id, telegram_id) de quem está conversando, vindos do config do chain."""
+    configuravel = (config or {}).get("configurable", {})
+    return configuravel.get("chat_id"), configuravel.get("telegram_id")
+
+
+# -------------------------------------------------------------------
+# FERRAMENTAS
+# -------------------------------------------------------------------
+# os módulos pesados (googleapiclient, httpx) só entram quando a ferramenta roda
+@tool
+def marcar_evento(texto: str, config: RunnableConfig) -> str:
+    """Cria um evento na agenda do usuário.
+
+    texto: título, dia e horário em português, como o usuário falaria
+    (ex.: "dentista amanhã às 15h", "reunião com João 29/11/2025 às 10h").
+    """
+    from calendar_app import create_event_from_text, formatar_conflitos
+
+    chat_id, telegram_id = _usuario(config)
+    link, conflitos = create_event_from_text(texto, chat_id=chat_id, telegram_id=telegram_id)
+    aviso = formatar_conflitos(conflitos)
+    return f"Evento criado: {link}" + (f"\n{aviso}" if aviso else "")
+
+
+@tool
+def listar_eventos(dia: str, config: RunnableConfig) -> str:
+    """Lista os eventos da agenda do usuário em um dia ("hoje", "amanhã", "sexta", "29/11/2025")."""
+    from calendar_app import listar_eventos_do_dia
+
+    _, telegram_id = _usuario(config)
+    return listar_eventos_do_dia(dia, telegram_id=telegram_id)
+
+
+@tool
+def remover_evento(nome: str, config: RunnableConfig) -> str:
+    """Remove da agenda do usuário o evento com esse nome.
+
+    Se o nome for ambíguo, devolve uma lista numerada em vez de remover;
+    mostre a lista ao usuário e, quando ele escolher, chame de novo com
+    o número como nome (ex.: "2").
+    """
+    from calendar_app import remover_evento_por_nome
+
+    _, telegram_id = _usuario(config)
+    return remover_evento_por_nome(nome, telegram_id=telegram_id)
+
+
+@tool
+def clima(cidade: str) -> str:
+    """Tempo agora em uma cidade ("São Paulo" ou "Lisboa, Portugal")."""
+    from weather import get_weather
+
+    return get_weather(cidade)
+
+
+@tool
+def noticias(assunto: str) -> str:
+    """As 5 notícias mais relevantes sobre um assunto."""
+    from news import get_news
+
+    return get_news(assunto)
+
+
+FERRAMENTAS_DISPONIVEIS = [marcar_evento, listar_eventos, remover_evento, clima, noticias]
+
+
+# -------------------------------------------------------------------
+# AGENTE
+# -------------------------------------------------------------------
+class AgenteComFerramentas:
+    """Chama o modelo com as ferramentas e executa o que ele pedir.
+
+    Quando uma resposta traz várias chamadas de ferramenta, elas rodam
+    ao mesmo tempo num pool de threads, e os resultados voltam ao modelo
+    numa nova rodada, até ele responder em texto (ou acabarem as
+    rodadas). Só o texto é emitido, em chunks, então serve tanto ao
+    streaming quanto ao invoke, e o histórico guarda só a resposta final.
+
+    Usado como RunnableLambda(agente.responder) depois do MontadorDePrompt
+    (o RunnableLambda só faz stream de funções geradoras). Os nomes das
+    ferramentas usadas são anotados em configurable["ferramentas_usadas"]
+    (se existir), para quem chamou saber que a resposta dependeu delas.
+    """
+
+    def __init__(self, llm, ferramentas=FERRAMENTAS_DISPONIVEIS, max_rodadas=FERRAMENTAS_MAX_RODADAS):
+        self.llm = llm
+        self.llm_com_ferramentas = llm.bind_tools(ferramentas)
+        self.ferramentas = {f.name: f for f in ferramentas}
+        self.max_rodadas = max_rodadas
+        self._executor = ThreadPoolExecutor(max_workers=FERRAMENTAS_WORKERS, thread_name_prefix="ferramenta")
+
+    def responder(self, mensagens, config):
+        mensagens = list(mensagens)
+        for rodada in range(self.max_rodadas + 1):
+            # a última rodada vai sem ferramentas: o modelo tem que responder
+            llm = self.llm_com_ferramentas if rodada < self.max_rodadas else self.llm
+            resposta = None
+            # o breaker mede só as leituras da OpenAI, não o tempo parado em cada yield
+            for chunk in resilience.stream("openai", "stream", llm.stream(mensagens, config=config)):
+                resposta = chunk if resposta is None else resposta + chunk
+                if chunk.content or chunk.usage_metadata:
+                    yield AIMessageChunk(content=chunk.content, usage_metadata=chunk.usage_metadata)
+
+            if resposta is None or not resposta.tool_calls:
+                return
+
+            mensagens.append(AIMessage(content=resposta.content, tool_calls=resposta.tool_calls))
+            mensagens.extend(self._executar(resposta.tool_calls, config))
+
+    # ---------------------------------------------------------------
+    def _executar(self, chamadas, config):
+        """Roda as chamadas (em paralelo se forem várias); devolve os ToolMessage na mesma ordem."""
+        inicio = time.perf_counter()
+        usadas = (config or {}).get("configurable", {}).get("ferramentas_usadas")
+        if usadas is not None:
+            usadas.extend(c["name"] for c in chamadas)
+
+        if len(chamadas) == 1:
+            resultados = [self._executar_uma(chamadas[0], config)]
+        else:
+            resultados = list(self._executor.map(lambda c: self._executar_uma(c, config), chamadas))
+
+        session_id = (config or {}).get("configurable", {}).get("session_id")
+        print(
+            f"[ferramentas] chat {session_id}: {', '.join(c['name'] for c in chamadas)} "
+            f"em {(time.perf_counter() - inicio) * 1000:.0f}ms"
+        )
+        return resultados
+
+    def _executar_uma(self, chamada, config):
+        """Um ToolMessage; erros voltam como texto para o modelo explicar ao usuário."""
+        nome = chamada["name"]
+        ferramenta = self.ferramentas.get(nome)
+        try:
+            if ferramenta is None:
+                raise ValueError(f"ferramenta desconhecida: {nome}")
+            with FERRAMENTAS.medir(nome):
+                conteudo = ferramenta.invoke(chamada["args"], config=config)
+        except ContaNaoVinculada:
+            conteudo = "A conta Google do usuário não está vinculada; é preciso pedir ao administrador para vincular."
+        except resilience.ServicoIndisponivel as e:
+            conteudo = str(e)
+        except Exception as e:
+            print(f"Erro na ferramenta {nome}: {e}")
+            conteudo = f"Erro ao executar {nome}: {e}"
+        return ToolMessage(content=str(conteudo), tool_call_id=chamada["id"], name=nome)
@@ -0,0 +1,267 @@
+import os
+import time
+import bisect
+import functools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+# limites (s) dos histogramas de latência; +Inf é implícito
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BUCKETS_PARSER = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+
+# /metrics é servido pelo próprio processo do bot (polling ou webhook), onde
+# vivem os lembretes, resumos e a fila de envio; 0 desliga
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+_metricas = []   # histogramas e contadores, na ordem de criação
+_coletores = []  # funções chamadas só na hora do scrape
+_registro_lock = threading.Lock()
+
+
+def _rotulos(nomes, valores):
+    if not nomes:
+        return ""
+    pares = ",".join(
+        f'{nome}="{str(valor).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for nome, valor in zip(nomes, valores)
+    )
+    return "{" + pares + "}"
+
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+# -------------------------------------------------------------------
+# TIPOS
+# -------------------------------------------------------------------
+class Contador:
+    """Contador monotônico com rótulos (Prometheus counter)."""
+
+    tipo = "counter"
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+        with _registro_lock:
+            _metricas.append(self)
+
+    def inc(self, *valores_rotulos, valor=1):
+        with self._lock:
+            self._valores[valores_rotulos] = self._valores.get(valores_rotulos, 0) + valor
+
+    def exportar(self):
+        with self._lock:
+            itens = sorted(self._valores.items())
+        for valores, total in itens:
+            yield f"{self.nome}{_rotulos(self.rotulos, valores)} {_numero(total)}"
+
+
+class Histograma:
+    """Histograma de latência com rótulos (Prometheus histogram).
+
+    observar() só acha o bucket (bisect) e soma sob um lock; os
+    acumulados do formato Prometheus são montados no scrape.
+    """
+
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_LATENCIA, erros=None):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.buckets = tuple(buckets)
+        self.erros = erros  # Contador incrementado quando o bloco de medir() levanta
+        self._series = {}  # rótulos -> [contagens por bucket..., +Inf, soma]
+        self._lock = threading.Lock()
+        with _registro_lock:
+            _metricas.append(self)
+
+    def observar(self, valor, *valores_rotulos):
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores_rotulos)
+            if serie is None:
+                serie = self._series[valores_rotulos] = [0] * (len(self.buckets) + 2)
+            serie[indice] += 1
+            serie[-1] += valor
+
+    def medir(self, *valores_rotulos):
+        """Context manager (também serve em código async) que observa a duração do bloco."""
+        return _Cronometro(self, valores_rotulos)
+
+    def exportar(self):
+        with self._lock:
+            itens = sorted((valores, list(serie)) for valores, serie in self._series.items())
+        nomes = self.rotulos + ("le",)
+        for valores, serie in itens:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float("inf"),), serie):
+                acumulado += contagem
+                yield f"{self.nome}_bucket{_rotulos(nomes, valores + (_numero(limite),))} {acumulado}"
+            yield f"{self.nome}_sum{_rotulos(self.rotulos, valores)} {_numero(serie[-1])}"
+            yield f"{self.nome}_count{_rotulos(self.rotulos, valores)} {acumulado}"
+
+
+class _Cronometro:
+    __slots__ = ("histograma", "rotulos", "inicio")
+
+    def __init__(self, histograma, rotulos):
+        self.histograma = histograma
+        self.rotulos = rotulos
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, erro, tb):
+        self.histograma.observar(time.perf_counter() - self.inicio, *self.rotulos)
+        if erro is not None and self.histograma.erros is not None:
+            self.histograma.erros.inc(*self.rotulos)
+        return False
+
+
+def medido(histograma, *valores_rotulos):
+    """Decorator: observa a duração de cada chamada da função."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with histograma.medir(*valores_rotulos):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def registrar_coletor(fn):
+    """fn() gera tuplas (nome, tipo, ajuda, rotulos: dict, valor); roda só quando /metrics é lido.
+
+    É assim que os contadores que já existem nos caches (hits, misses...)
+    entram no /metrics sem custo nenhum no caminho quente.
+    """
+    with _registro_lock:
+        _coletores.append(fn)
+
+
+def registrar_cache(nome, estatisticas):
+    """Expõe o estatisticas() de um cache como mia_cache_*{cache=nome}.
+
+    Além de hits/misses, a economia acumulada (latencia_economizada_s e
+    tokens_economizados, no cache de respostas do LLM) vira contador.
+    """
+    def coletar():
+        for chave, valor in estatisticas().items():
+            if not isinstance(valor, (int, float)) or chave.startswith("taxa"):
+                continue
+            if chave == "latencia_economizada_s":
+                yield ("mia_cache_latencia_economizada_segundos_total", "counter",
+                       "Segundos de chamada evitados pelos hits de cada cache.", {"cache": nome}, valor)
+            elif chave == "tokens_economizados":
+                yield ("mia_cache_tokens_economizados_total", "counter",
+                       "Tokens de LLM evitados pelos hits de cada cache.", {"cache": nome}, valor)
+            elif chave == "itens":
+                yield ("mia_cache_itens", "gauge", "Itens guardados em cada cache.", {"cache": nome}, valor)
+            else:
+                yield ("mia_cache_eventos_total", "counter", "Hits, misses e afins de cada cache.",
+                       {"cache": nome, "tipo": chave}, valor)
+    registrar_coletor(coletar)
+
+
+def exportar():
+    """Todas as métricas no formato texto do Prometheus (version 0.0.4)."""
+    linhas = []
+    with _registro_lock:
+        metricas = list(_metricas)
+        coletores = list(_coletores)
+
+    for metrica in metricas:
+        linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+        linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+        linhas.extend(metrica.exportar())
+
+    # o formato exige as amostras de cada nome juntas, mas coletores
+    # diferentes podem gerar o mesmo nome (ex.: mia_cache_itens)
+    familias = {}
+    for coletor in coletores:
+        try:
+            for nome, tipo, ajuda, rotulos, valor in coletor():
+                familia = familias.setdefault(nome, (tipo, ajuda, []))
+                familia[2].append(f"{nome}{_rotulos(tuple(rotulos), tuple(rotulos.values()))} {_numero(valor)}")
+        except Exception as e:
+            print(f"Erro no coletor de métricas: {e}")
+    for nome, (tipo, ajuda, amostras) in familias.items():
+        linhas.append(f"# HELP {nome} {ajuda}")
+        linhas.append(f"# TYPE {nome} {tipo}")
+        linhas.extend(amostras)
+    return "\n".join(linhas) + "\n"
+
+
+class _HandlerMetricas(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        corpo = exportar().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+def iniciar_servidor(porta=METRICS_PORT, host=METRICS_HOST):
+    """Serve GET /metrics numa thread do processo atual; devolve o servidor (None se desligado)."""
+    if not porta:
+        return None
+    try:
+        servidor = ThreadingHTTPServer((host, porta), _HandlerMetricas)
+    except OSError as e:
+        print(f"Não foi possível servir /metrics na porta {porta}: {e}")
+        return None
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="metrics", daemon=True).start()
+    print(f"Métricas em http://{host}:{servidor.server_address[1]}/metrics")
+    return servidor
+
+
+# -------------------------------------------------------------------
+# MÉTRICAS DO BOT
+# -------------------------------------------------------------------
+ERROS_HANDLER = Contador(
+    "mia_handler_erros_total", "Handlers que terminaram em erro.", ("handler",),
+)
+HANDLERS = Histograma(
+    "mia_handler_segundos", "Duração de cada handler do bot.", ("handler",), erros=ERROS_HANDLER,
+)
+ERROS_EXTERNOS = Contador(
+    "mia_chamada_externa_erros_total", "Chamadas a serviços externos que levantaram exceção.", ("servico", "operacao"),
+)
+CHAMADAS_EXTERNAS = Histograma(
+    "mia_chamada_externa_segundos", "Duração das chamadas a serviços externos.", ("servico", "operacao"),
+    erros=ERROS_EXTERNOS,
+)
+PARSE_DATETIME = Histograma(
+    "mia_parse_datetime_segundos", "Duração do parse_datetime.", buckets=BUCKETS_PARSER,
+)
+LLM_PRIMEIRO_TOKEN = Histograma(
+    "mia_llm_primeiro_token_segundos", "Tempo até o primeiro token do LLM (streaming).",
+)
+LLM_TOKENS = Contador(
+    "mia_llm_tokens_total", "Tokens usados nas respostas do LLM.",
+)
+
+
+def externo(servico, operacao):
+    """Atalho: with metrics.externo("gnews", "busca"): ..."""
+    return CHAMADAS_EXTERNAS.medir(servico, operacao)
@@ -1,46 +1,89 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+from cache import StaleWhileRevalidateCache
+from async_http import get_json, run_sync
+from text_utils import normalizar_texto
+import metrics
+import resilience
+from resilience import ServicoIndisponivel
+
 load_dotenv()
 
 GNEWS_API_KEY = os.getenv("GNEWS_API_KEY")
+GNEWS_URL = os.getenv("GNEWS_URL", "https://gnews.io/api/v4/search")
 
-def get_news(query):
+# notícias ficam "frescas" por NEWS_TTL; depois disso ainda são servidas
+# por até NEWS_STALE_TTL enquanto uma atualização roda em segundo plano
+NEWS_TTL = int(os.getenv("NEWS_TTL", "900"))
+NEWS_STALE_TTL = int(os.getenv("NEWS_STALE_TTL", "3600"))
+
+_news_cache = StaleWhileRevalidateCache(ttl=NEWS_TTL, stale_ttl=NEWS_STALE_TTL)
+metrics.registrar_cache("noticias", _news_cache.estatisticas)
+
+
+class GNewsError(Exception):
+    """Erro retornado pela própria API (não vai para o cache)."""
+
+
+async def _buscar_noticias(query):
+    with resilience.chamada("gnews", "busca"):
+        data = await get_json("gnews", GNEWS_URL, hedge=True, params={
+            "q": query, "lang": "pt", "country": "br", "max": 5, "apikey": GNEWS_API_KEY,
+        })
+
+    # Verifica se veio erro
+    if "errors" in data:
+        raise GNewsError(data["errors"])
+
+    # Verifica se 'articles' existe
+    articles = data.get("articles")
+    if not articles:
+        return "Nenhuma notícia encontrada para essa pesquisa."
+
+    mensagens = []
+    for art in articles:
+        titulo = art.get("title", "Sem título")
+        link = art.get("url", "")
+        fonte = art.get("source", {}).get("name", "Fonte desconhecida")
+
+        mensagens.append(
+            f"📰 *{titulo}*\n"
+            f"🔗 {link}\n"
+            f"📌 {fonte}\n"
+        )
+
+    return "\n".join(mensagens)
+
+
+async def noticias_async(query):
+    """Como get_news_async, mas deixa o erro subir (o resumo diário não guarda falhas)."""
+    # 'São Paulo', 'sao paulo' e 'SAO  PAULO' dividem a mesma entrada
+    chave = normalizar_texto(query)
+    return await _news_cache.aget_or_load(chave, lambda: _buscar_noticias(query))
+
+
+async def get_news_async(query):
     """
     Retorna as 5 principais notícias relacionadas à busca do usuário
     """
     try:
-        url = (
-            "https://gnews.io/api/v4/search"
-            f"?q={query}&lang=pt&country=br&max=5&apikey={GNEWS_API_KEY}"
-        )
+        return await noticias_async(query)
 
-        response = requests.get(url)
-        data = response.json()
+    except GNewsError as e:
+        return f"Erro da API: {e}"
 
-        # Verifica se veio erro
-        if "errors" in data:
-            return f"Erro da API: {data['errors']}"
+    except ServicoIndisponivel as e:
+        return str(e)
 
-        # Verifica se 'articles' existe
-        articles = data.get("articles")
-        if not articles:
-            return "Nenhuma notícia encontrada para essa pesquisa."
+    except Exception as e:
+        return f"Erro ao buscar notícias: {str(e)}"
 
-        mensagens = []
-        for art in articles:
-            titulo = art.get("title", "Sem título")
-            link = art.get("url", "")
-            fonte = art.get("source", {}).get("name", "Fonte desconhecida")
 
-            mensagens.append(
-                f"📰 *{titulo}*\n"
-                f"🔗 {link}\n"
-                f"📌 {fonte}\n"
-            )
+def get_news(query):
+    return run_sync(get_news_async(query))
 
-        return "\n".join(mensagens)
 
-    except Exception as e:
-        return f"Erro ao buscar notícias: {str(e)}"
+def estatisticas_cache():
+    """Hits/misses do cache de notícias, para ajustar NEWS_TTL."""
+    return _news_cache.estatisticas()
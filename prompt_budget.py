@@ -0,0 +1,172 @@
+import os
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+import metrics
+import resilience
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+# orçamento de tokens do prompt inteiro (sistema + resumo + histórico + entrada)
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "3000"))
+
+# só resume quando há pelo menos isso de mensagens fora da janela (amortiza a chamada)
+RESUMO_LOTE = int(os.getenv("RESUMO_LOTE", "4"))
+
+# o resumo em si também tem teto
+RESUMO_MAX_TOKENS = 300
+
+# custo fixo por mensagem no formato de chat da OpenAI (papel, separadores)
+TOKENS_POR_MENSAGEM = 4
+
+PROMPT_RESUMO = (
+    "Atualize o resumo da conversa entre o usuário e a assistente Mia com as novas mensagens. "
+    "Mantenha fatos, preferências, compromissos e pedidos em aberto; descarte cumprimentos. "
+    f"Responda só com o resumo, em português, em no máximo {RESUMO_MAX_TOKENS // 2} palavras.\n\n"
+    "Resumo atual:\n{resumo}\n\nNovas mensagens:\n{mensagens}"
+)
+
+PROMPT_TOKENS = metrics.Histograma(
+    "mia_llm_prompt_tokens", "Tokens do prompt montado para o LLM.",
+    buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 8000),
+)
+
+
+# -------------------------------------------------------------------
+# CONTAGEM DE TOKENS
+# -------------------------------------------------------------------
+_codificador = None
+_codificador_lock = threading.Lock()
+
+
+def _encoder():
+    """tiktoken do gpt-4o; None se não der para carregar (o arquivo vem da rede na 1ª vez)."""
+    global _codificador
+    if _codificador is None:
+        with _codificador_lock:
+            if _codificador is None:
+                try:
+                    import tiktoken
+                    _codificador = tiktoken.get_encoding("o200k_base").encode
+                except Exception as e:
+                    print(f"tiktoken indisponível ({type(e).__name__}); estimando tokens por tamanho")
+                    _codificador = False
+    return _codificador or None
+
+
+@lru_cache(maxsize=16384)
+def contar_tokens(texto):
+    """Tokens de um texto; cada texto é contado uma vez só (memoizado)."""
+    codificar = _encoder()
+    if codificar is None:
+        return len(texto) // 4 + 1
+    return len(codificar(texto))
+
+
+def tokens_da_mensagem(mensagem):
+    return contar_tokens(mensagem.content if isinstance(mensagem.content, str) else str(mensagem.content)) \
+        + TOKENS_POR_MENSAGEM
+
+
+def _inicio_da_janela(mensagens, orcamento, max_mensagens):
+    """Índice a partir do qual as mensagens mais novas cabem no orçamento; (índice, tokens usados)."""
+    usados = 0
+    inicio = len(mensagens)
+    while inicio > 0 and len(mensagens) - inicio < max_mensagens:
+        custo = tokens_da_mensagem(mensagens[inicio - 1])
+        if usados + custo > orcamento:
+            break
+        usados += custo
+        inicio -= 1
+    return inicio, usados
+
+
+# -------------------------------------------------------------------
+# MONTAGEM DO PROMPT
+# -------------------------------------------------------------------
+class MontadorDePrompt:
+    """Monta [sistema + resumo, histórico recente, entrada] dentro de PROMPT_MAX_TOKENS.
+
+    O histórico entra uma vez só, das mensagens mais novas para as mais
+    antigas, até o orçamento acabar. O que fica de fora vai sendo
+    incorporado a um resumo (historico.resumo) em segundo plano, aos
+    lotes: o resumo anterior + as mensagens novas geram o próximo, então
+    nenhuma mensagem é resumida duas vezes.
+    """
+
+    def __init__(self, sistema, memoria, llm_resumo, max_tokens=PROMPT_MAX_TOKENS):
+        self.sistema = sistema
+        self.memoria = memoria
+        self.llm_resumo = llm_resumo
+        self.max_tokens = max_tokens
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="resumo")
+
+    def __call__(self, entrada, config):
+        """Usado como RunnableLambda antes do modelo; devolve a lista de mensagens."""
+        session_id = config["configurable"]["session_id"]
+        historico = self.memoria.get(session_id)
+
+        with historico.lock:
+            resumo = historico.resumo
+            recentes = historico.messages[historico.resumidas:]
+
+        sistema = self.sistema
+        if resumo:
+            sistema += f"\n\nResumo da conversa até aqui:\n{resumo}"
+        pergunta = HumanMessage(content=entrada["input"])
+
+        fixos = contar_tokens(sistema) + TOKENS_POR_MENSAGEM + tokens_da_mensagem(pergunta)
+        inicio, usados = _inicio_da_janela(recentes, self.max_tokens - fixos, historico.max_mensagens)
+        usados += fixos
+
+        fora = inicio  # mensagens ainda não resumidas que não couberam
+        PROMPT_TOKENS.observar(usados)
+        print(
+            f"[prompt] chat {session_id}: {usados} tokens, "
+            f"{len(recentes) - inicio} mensagens no histórico, resumo {'sim' if resumo else 'não'}, "
+            f"{fora} aguardando resumo"
+        )
+        if fora >= RESUMO_LOTE:
+            self._agendar_resumo(historico)
+
+        return [SystemMessage(content=sistema), *recentes[inicio:], pergunta]
+
+    # ---------------------------------------------------------------
+    def _agendar_resumo(self, historico):
+        with historico.lock:
+            if historico.resumindo:
+                return
+            historico.resumindo = True
+        self._executor.submit(self._resumir, historico)
+
+    def _resumir(self, historico):
+        try:
+            with historico.lock:
+                resumo = historico.resumo
+                recentes = historico.messages[historico.resumidas:]
+
+            # resume até sobrar só metade da janela em mensagens soltas,
+            # para não precisar de um novo resumo a cada mensagem
+            inicio, _ = _inicio_da_janela(recentes, self.max_tokens // 2, historico.max_mensagens // 2)
+            novas = recentes[:inicio]
+            if not novas:
+                return
+
+            texto = "\n".join(
+                f"{'Usuário' if m.type == 'human' else 'Mia'}: {m.content}" for m in novas
+            )
+            with resilience.chamada("openai", "resumo"):
+                resposta = self.llm_resumo.invoke(
+                    PROMPT_RESUMO.format(resumo=resumo or "(vazio)", mensagens=texto)
+                )
+            historico.incorporar_resumo(resposta.content.strip(), len(novas))
+            print(f"[prompt] chat {historico.session_id}: {len(novas)} mensagens incorporadas ao resumo")
+        except Exception as e:
+            print(f"Erro ao resumir conversa {historico.session_id}: {e}")
+        finally:
+            with historico.lock:
+                historico.resumindo = False
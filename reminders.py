@@ -0,0 +1,250 @@
+import os
+import time
+import heapq
+import datetime
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytz
+
+from backend.database import get_connection
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+TZ = pytz.timezone("America/Sao_Paulo")
+
+# quantos minutos antes do evento o lembrete é enviado
+REMINDER_MINUTOS = int(os.getenv("REMINDER_MINUTOS", "15"))
+
+# de quanto em quanto tempo relê a tabela (lembretes criados por outros processos)
+REMINDER_RESYNC = 60
+
+# janela de eventos futuros carregada do store local na inicialização
+REMINDER_HORIZONTE_DIAS = 7
+
+
+# -------------------------------------------------------------------
+# HEAP DE TIMERS
+# -------------------------------------------------------------------
+class TimerHeap:
+    """Timers num único thread, ordenados por um heap.
+
+    agendar e cancelar custam O(log n) / O(1): cancelar só marca a
+    entrada como inativa, e ela é descartada quando chega ao topo.
+    Reagendar a mesma chave substitui o timer anterior. Os callbacks
+    rodam num pool pequeno para que um envio lento não atrase os demais.
+    """
+
+    def __init__(self, nome="timers", workers=2):
+        self.nome = nome
+        self._heap = []               # [quando, seq, chave, callback, args, ativo]
+        self._por_chave = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=nome)
+        self._thread = None
+        self._parar = False
+
+    def __len__(self):
+        return len(self._por_chave)
+
+    def agendar(self, chave, quando, callback, *args):
+        """Agenda callback(*args) para o timestamp `quando` (time.time())."""
+        entrada = [quando, next(self._seq), chave, callback, args, True]
+        with self._cond:
+            anterior = self._por_chave.get(chave)
+            if anterior is not None:
+                anterior[5] = False
+            self._por_chave[chave] = entrada
+            heapq.heappush(self._heap, entrada)
+            # só acorda o thread se o novo timer passou a ser o próximo
+            if self._heap[0] is entrada:
+                self._cond.notify()
+
+    def cancelar(self, chave):
+        with self._cond:
+            entrada = self._por_chave.pop(chave, None)
+            if entrada is not None:
+                entrada[5] = False
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._rodar, name=self.nome, daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        with self._cond:
+            self._parar = True
+            self._cond.notify()
+
+    def _rodar(self):
+        while True:
+            with self._cond:
+                while not self._parar:
+                    # descarta cancelados que chegaram ao topo
+                    while self._heap and not self._heap[0][5]:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    espera = self._heap[0][0] - time.time()
+                    if espera <= 0:
+                        break
+                    self._cond.wait(espera)
+                if self._parar:
+                    return
+
+                entrada = heapq.heappop(self._heap)
+                entrada[5] = False
+                if self._por_chave.get(entrada[2]) is entrada:
+                    del self._por_chave[entrada[2]]
+
+            self._executor.submit(self._executar, entrada)
+
+    def _executar(self, entrada):
+        _, _, chave, callback, args, _ = entrada
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"Erro no timer {chave}: {e}")
+
+
+# -------------------------------------------------------------------
+# LEMBRETES DE EVENTOS
+# -------------------------------------------------------------------
+def _inicio_do_evento(ev):
+    campo = ev["start"]
+    if "dateTime" in campo:
+        return datetime.datetime.fromisoformat(campo["dateTime"])
+    dia = datetime.date.fromisoformat(campo["date"])
+    return TZ.localize(datetime.datetime(dia.year, dia.month, dia.day))
+
+
+class ReminderScheduler:
+    """Envia uma mensagem no Telegram REMINDER_MINUTOS antes de cada evento.
+
+    Os lembretes ficam na tabela reminders (sobrevivem a reinícios) e num
+    TimerHeap em memória. Qualquer processo pode agendar/cancelar (grava
+    na tabela); só o processo que chamou iniciar() dispara, relendo a
+    tabela a cada REMINDER_RESYNC segundos.
+    """
+
+    def __init__(self, minutos_antes=REMINDER_MINUTOS):
+        self.minutos_antes = minutos_antes
+        self._timers = TimerHeap("lembretes")
+        self._enviar = None
+        self._ultimo_resync = 0.0
+
+    @property
+    def ativo(self):
+        return self._enviar is not None
+
+    # ---------------------------------------------------------
+    # API
+    # ---------------------------------------------------------
+    def agendar_evento(self, ev, chat_id, calendario="primary"):
+        """Agenda (ou reagenda) o lembrete de um evento do Calendar.
+
+        `calendario` é a chave do store (event_store.chave_calendario):
+        ids de eventos só são únicos dentro do mesmo calendário.
+        """
+        inicio = _inicio_do_evento(ev).timestamp()
+        agora = time.time()
+        if inicio <= agora:
+            return
+
+        # se a antecedência já passou mas o evento ainda não começou, avisa já
+        disparo = max(inicio - self.minutos_antes * 60, agora)
+        titulo = ev.get("summary", "Evento")
+
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO reminders (calendar_id, event_id, chat_id, disparo, inicio, titulo, atualizado)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (calendario, ev["id"], int(chat_id), disparo, inicio, titulo, agora),
+            )
+
+        if self.ativo:
+            self._timers.agendar((calendario, ev["id"]), disparo, self._disparar, calendario, ev["id"])
+
+    def cancelar_evento(self, event_id, calendario="primary"):
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM reminders WHERE calendar_id = ? AND event_id = ?", (calendario, event_id)
+            )
+        self._timers.cancelar((calendario, event_id))
+
+    def ao_alterar_evento(self, acao, ev, chat_id=None, calendario="primary"):
+        """Observador do calendar_app: mantém os lembretes em dia com a agenda."""
+        if acao == "criado" and chat_id is not None:
+            self.agendar_evento(ev, chat_id, calendario)
+        elif acao == "removido":
+            self.cancelar_evento(ev["id"], calendario)
+
+    def iniciar(self, enviar, eventos_iniciais=(), chat_id_padrao=None):
+        """Começa a disparar lembretes usando enviar(chat_id, texto).
+
+        Carrega os lembretes persistidos e agenda os `eventos_iniciais`
+        (próximos eventos do calendário do dono, chave "primary", a mesma
+        que o /marcar do dono usa) que ainda não tinham lembrete.
+        """
+        self._enviar = enviar
+
+        if chat_id_padrao is not None:
+            conn = get_connection()
+            existentes = {
+                linha[0] for linha in conn.execute("SELECT event_id FROM reminders WHERE calendar_id = 'primary'")
+            }
+            for ev in eventos_iniciais:
+                if ev["id"] not in existentes:
+                    self.agendar_evento(ev, chat_id_padrao)
+
+        self._resync()
+        self._timers.iniciar()
+        print(f"Lembretes: {len(self._timers) - 1} agendados.")  # -1: o próprio resync
+
+    # ---------------------------------------------------------
+    # INTERNOS
+    # ---------------------------------------------------------
+    def _resync(self):
+        """Carrega da tabela os lembretes novos/alterados desde a última leitura."""
+        agora = time.time()
+        conn = get_connection()
+        with conn:
+            linhas = conn.execute(
+                "SELECT calendar_id, event_id, disparo FROM reminders WHERE atualizado >= ?",
+                (self._ultimo_resync,),
+            ).fetchall()
+            conn.execute("DELETE FROM reminders WHERE inicio < ?", (agora,))
+
+        self._ultimo_resync = agora
+        for calendario, event_id, disparo in linhas:
+            self._timers.agendar((calendario, event_id), disparo, self._disparar, calendario, event_id)
+
+        self._timers.agendar("__resync__", agora + REMINDER_RESYNC, self._resync)
+
+    def _disparar(self, calendario, event_id):
+        conn = get_connection()
+        with conn:
+            linha = conn.execute(
+                "SELECT chat_id, inicio, titulo FROM reminders WHERE calendar_id = ? AND event_id = ?",
+                (calendario, event_id),
+            ).fetchone()
+            conn.execute(
+                "DELETE FROM reminders WHERE calendar_id = ? AND event_id = ?", (calendario, event_id)
+            )
+
+        # removido por outro processo depois de entrar no heap
+        if linha is None:
+            return
+
+        chat_id, inicio, titulo = linha
+        hora = datetime.datetime.fromtimestamp(inicio, TZ).strftime("%H:%M")
+        # linhas antigas podem ter o chat_id como texto; o Telegram quer o número
+        self._enviar(int(chat_id), f"⏰ Lembrete: {titulo} às {hora}")
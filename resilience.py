@@ -0,0 +1,279 @@
+import os
+import time
+import asyncio
+import threading
+
+import metrics
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+# (connect, read) em segundos, por serviço externo
+TIMEOUTS = {
+    "openweather": (3.0, 5.0),
+    "gnews": (3.0, 8.0),
+    "calendar": (5.0, 15.0),
+    "openai": (5.0, 60.0),
+    "telegram": (5.0, 30.0),
+}
+TIMEOUT_PADRAO = (5.0, 10.0)
+
+# circuit breaker: abre depois de N falhas seguidas e fica aberto por X segundos
+CIRCUITO_FALHAS = int(os.getenv("CIRCUITO_FALHAS", "5"))
+CIRCUITO_ABERTO_S = float(os.getenv("CIRCUITO_ABERTO_S", "30"))
+
+# hedge: se o GET não voltou em HEDGE_ATRASO[servico] segundos, dispara uma
+# segunda cópia e fica com a que responder primeiro (só para GETs idempotentes)
+HEDGE = os.getenv("HEDGE", "1") == "1"
+HEDGE_ATRASO = {
+    "openweather": 0.5,
+    "gnews": 1.0,
+}
+HEDGE_ATRASO_PADRAO = 1.0
+
+# como cada serviço aparece nas mensagens para o usuário
+NOMES = {
+    "openweather": "de previsão do tempo",
+    "gnews": "de notícias",
+    "calendar": "do Google Agenda",
+    "openai": "de inteligência artificial",
+}
+
+FECHADO, MEIO_ABERTO, ABERTO = "fechado", "meio_aberto", "aberto"
+
+TRANSICOES = metrics.Contador(
+    "mia_circuito_transicoes_total", "Mudanças de estado dos circuit breakers.", ("servico", "estado"),
+)
+HEDGES = metrics.Contador(
+    "mia_hedge_total", "GETs duplicados por demora, e quem respondeu primeiro.", ("servico", "vencedor"),
+)
+
+
+class ServicoIndisponivel(Exception):
+    """O circuito do serviço está aberto; a chamada nem foi feita."""
+
+    def __init__(self, servico):
+        self.servico = servico
+        super().__init__(
+            f"O serviço {NOMES.get(servico, servico)} está fora do ar no momento. "
+            "Tente de novo em alguns minutos."
+        )
+
+
+def timeout(servico):
+    """(connect, read) do serviço."""
+    return TIMEOUTS.get(servico, TIMEOUT_PADRAO)
+
+
+def falha_do_servico(erro):
+    """True se o erro indica problema no serviço (rede, timeout, 5xx, 429), não no pedido.
+
+    Olha o status no formato do httpx/requests (response.status_code), do
+    googleapiclient (resp.status) e do SDK da OpenAI (status_code).
+    """
+    status = (
+        getattr(getattr(erro, "response", None), "status_code", None)
+        or getattr(getattr(erro, "resp", None), "status", None)
+        or getattr(erro, "status_code", None)
+    )
+    if status is not None:
+        status = int(status)
+        return status >= 500 or status == 429
+    nome = type(erro).__name__
+    return isinstance(erro, (TimeoutError, ConnectionError)) or "Timeout" in nome or "Connect" in nome
+
+
+# -------------------------------------------------------------------
+# CIRCUIT BREAKER
+# -------------------------------------------------------------------
+class CircuitBreaker:
+    """Fechado -> aberto após CIRCUITO_FALHAS falhas seguidas do serviço.
+
+    Aberto, toda chamada falha na hora com ServicoIndisponivel. Passado
+    CIRCUITO_ABERTO_S, uma única chamada de teste passa (meio aberto):
+    se der certo o circuito fecha, se falhar volta a abrir.
+    """
+
+    def __init__(self, servico, falhas=CIRCUITO_FALHAS, aberto_s=CIRCUITO_ABERTO_S):
+        self.servico = servico
+        self.limite_falhas = falhas
+        self.aberto_s = aberto_s
+        self.estado = FECHADO
+        self._falhas = 0
+        self._aberto_em = 0.0
+        self._testando = False
+        self._lock = threading.Lock()
+
+    def _mudar(self, estado):
+        if estado != self.estado:
+            print(f"[circuito] {self.servico}: {self.estado} -> {estado}")
+            TRANSICOES.inc(self.servico, estado)
+            self.estado = estado
+
+    def permitir(self):
+        """Levanta ServicoIndisponivel se a chamada não deve ser feita."""
+        with self._lock:
+            if self.estado == FECHADO:
+                return
+            if self.estado == ABERTO:
+                if time.monotonic() - self._aberto_em < self.aberto_s:
+                    raise ServicoIndisponivel(self.servico)
+                self._mudar(MEIO_ABERTO)
+            if self._testando:
+                raise ServicoIndisponivel(self.servico)
+            self._testando = True
+
+    def sucesso(self):
+        with self._lock:
+            self._falhas = 0
+            self._testando = False
+            self._mudar(FECHADO)
+
+    def falha(self):
+        with self._lock:
+            self._falhas += 1
+            self._testando = False
+            if self.estado == MEIO_ABERTO or self._falhas >= self.limite_falhas:
+                self._aberto_em = time.monotonic()
+                self._mudar(ABERTO)
+
+    def liberar(self):
+        """A chamada terminou com erro do pedido (4xx): não conta como sucesso nem falha."""
+        with self._lock:
+            self._testando = False
+
+
+_circuitos = {}
+_circuitos_lock = threading.Lock()
+
+
+def circuito(servico):
+    breaker = _circuitos.get(servico)
+    if breaker is None:
+        with _circuitos_lock:
+            breaker = _circuitos.setdefault(servico, CircuitBreaker(servico))
+    return breaker
+
+
+def _metricas_circuitos():
+    codigos = {FECHADO: 0, MEIO_ABERTO: 1, ABERTO: 2}
+    for servico, breaker in list(_circuitos.items()):
+        yield ("mia_circuito_estado", "gauge", "Estado do circuit breaker (0 fechado, 1 meio aberto, 2 aberto).",
+               {"servico": servico}, codigos[breaker.estado])
+
+
+metrics.registrar_coletor(_metricas_circuitos)
+
+
+class _Chamada:
+    __slots__ = ("breaker", "cronometro")
+
+    def __init__(self, servico, operacao):
+        self.breaker = circuito(servico)
+        self.cronometro = metrics.externo(servico, operacao)
+
+    def __enter__(self):
+        self.breaker.permitir()
+        self.cronometro.__enter__()
+        return self
+
+    def __exit__(self, tipo, erro, tb):
+        self.cronometro.__exit__(tipo, erro, tb)
+        if erro is None:
+            self.breaker.sucesso()
+        elif falha_do_servico(erro):
+            self.breaker.falha()
+        else:
+            self.breaker.liberar()
+        return False
+
+
+def chamada(servico, operacao):
+    """with resilience.chamada("calendar", "inserir"): ...
+
+    Passa pelo circuit breaker do serviço e mede a latência/erros
+    (metrics.externo). Serve também em volta de await.
+    """
+    return _Chamada(servico, operacao)
+
+
+def stream(servico, operacao, iteravel):
+    """for chunk in resilience.stream("openai", "stream", llm.stream(...)): yield ...
+
+    Como chamada(), mas para respostas em stream consumidas por um
+    gerador: o breaker e a latência (metrics.externo) contam só o tempo
+    dentro das leituras do upstream, não o que o consumidor faz entre
+    um chunk e outro (ex.: editar a mensagem no Telegram). Se o
+    consumidor desistir no meio, o stream é fechado sem contar sucesso
+    nem falha.
+    """
+    breaker = circuito(servico)
+    breaker.permitir()
+    lendo = 0.0
+    erro = None
+    terminou = False
+    iterador = None
+    try:
+        while True:
+            inicio = time.perf_counter()
+            try:
+                if iterador is None:
+                    iterador = iter(iteravel)
+                chunk = next(iterador)
+            except StopIteration:
+                terminou = True
+                return
+            except Exception as e:
+                erro = e
+                raise
+            finally:
+                lendo += time.perf_counter() - inicio
+            yield chunk
+    finally:
+        metrics.CHAMADAS_EXTERNAS.observar(lendo, servico, operacao)
+        if terminou:
+            breaker.sucesso()
+        elif erro is None:
+            breaker.liberar()
+            if hasattr(iterador, "close"):
+                iterador.close()
+        else:
+            metrics.ERROS_EXTERNOS.inc(servico, operacao)
+            if falha_do_servico(erro):
+                breaker.falha()
+            else:
+                breaker.liberar()
+
+
+# -------------------------------------------------------------------
+# HEDGE (GETs idempotentes)
+# -------------------------------------------------------------------
+async def com_hedge(servico, fazer):
+    """Roda fazer(); se demorar mais que o atraso do serviço, roda uma cópia.
+
+    Fica com o primeiro resultado bem-sucedido e cancela o outro. Corta
+    a cauda de latência (uma conexão lenta) ao custo de alguns GETs a mais.
+    """
+    if not HEDGE:
+        return await fazer()
+
+    primeira = asyncio.ensure_future(fazer())
+    feitas, _ = await asyncio.wait({primeira}, timeout=HEDGE_ATRASO.get(servico, HEDGE_ATRASO_PADRAO))
+    if feitas:
+        return primeira.result()
+
+    segunda = asyncio.ensure_future(fazer())
+    pendentes = {primeira, segunda}
+    erro = None
+    try:
+        while pendentes:
+            feitas, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+            for tarefa in feitas:
+                if tarefa.exception() is None:
+                    HEDGES.inc(servico, "original" if tarefa is primeira else "copia")
+                    return tarefa.result()
+                erro = tarefa.exception()
+        raise erro
+    finally:
+        for tarefa in pendentes:
+            tarefa.cancel()
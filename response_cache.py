@@ -0,0 +1,102 @@
+import time
+import hashlib
+import threading
+from collections import namedtuple
+
+import metrics
+from cache import TTLCache
+from text_utils import normalizar_texto
+from backend.database import get_connection
+
+RespostaCache = namedtuple("RespostaCache", "texto latencia tokens")
+
+# os totais (hits, misses, latência e tokens economizados) saem pelo
+# metrics.registrar_cache; o histograma mostra quanto cada hit poupou
+LATENCIA_ECONOMIZADA = metrics.Histograma(
+    "mia_llm_cache_latencia_economizada_segundos", "Latência da resposta original do LLM em cada hit do cache.",
+)
+
+
+class LLMResponseCache:
+    """Cache de respostas do LLM para perguntas repetidas.
+
+    A chave é o texto normalizado da pergunta + um hash das últimas
+    `mensagens_contexto` mensagens do histórico, então a mesma pergunta
+    em contextos diferentes não reaproveita a resposta. Memória (TTL +
+    LRU) na frente e, opcionalmente, a tabela llm_cache no SQLite.
+    """
+
+    def __init__(self, ttl=3600, max_itens=1000, persistir=False, mensagens_contexto=2):
+        self.ttl = ttl
+        self.persistir = persistir
+        self.mensagens_contexto = mensagens_contexto
+        self._memoria = TTLCache(ttl=ttl, max_itens=max_itens)
+        self.hits = 0
+        self.misses = 0
+        self.latencia_economizada = 0.0
+        self.tokens_economizados = 0
+        self._lock = threading.Lock()
+
+    def chave(self, entrada, historico):
+        contexto = historico[-self.mensagens_contexto:] if self.mensagens_contexto else []
+        h = hashlib.sha256(normalizar_texto(entrada).encode())
+        for mensagem in contexto:
+            h.update(b"\x1f" + mensagem.type.encode() + b"\x1e" + str(mensagem.content).encode())
+        return h.hexdigest()
+
+    # ---------------------------------------------------------
+    # PERSISTÊNCIA (opcional)
+    # ---------------------------------------------------------
+    def _do_banco(self, chave):
+        conn = get_connection()
+        linha = conn.execute(
+            "SELECT texto, latencia, tokens FROM llm_cache WHERE chave = ? AND criado > ?",
+            (chave, time.time() - self.ttl),
+        ).fetchone()
+        return RespostaCache(*linha) if linha else None
+
+    def _gravar_banco(self, chave, resposta):
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (chave, texto, latencia, tokens, criado) VALUES (?, ?, ?, ?, ?)",
+                (chave, *resposta, time.time()),
+            )
+
+    # ---------------------------------------------------------
+    # API
+    # ---------------------------------------------------------
+    def get(self, chave):
+        resposta = self._memoria.get(chave)
+        if resposta is None and self.persistir:
+            resposta = self._do_banco(chave)
+            if resposta is not None:
+                self._memoria.set(chave, resposta)
+
+        with self._lock:
+            if resposta is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.latencia_economizada += resposta.latencia
+                self.tokens_economizados += resposta.tokens
+        if resposta is not None:
+            LATENCIA_ECONOMIZADA.observar(resposta.latencia)
+        return resposta
+
+    def set(self, chave, texto, latencia, tokens=0):
+        resposta = RespostaCache(texto, latencia, tokens or 0)
+        self._memoria.set(chave, resposta)
+        if self.persistir:
+            self._gravar_banco(chave, resposta)
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": self.hits / total if total else 0.0,
+                "latencia_economizada_s": round(self.latencia_economizada, 3),
+                "tokens_economizados": self.tokens_economizados,
+            }
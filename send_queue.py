@@ -0,0 +1,296 @@
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from requests.exceptions import ConnectionError, Timeout
+from telebot.apihelper import ApiTelegramException
+
+import metrics
+from reminders import TimerHeap
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+LIMITE_TELEGRAM = 4096
+
+# limites da Bot API: ~30 mensagens/s no total, ~1/s por chat e 20/min em grupos
+ENVIO_TAXA_GLOBAL = float(os.getenv("ENVIO_TAXA_GLOBAL", "30"))
+ENVIO_TAXA_CHAT = float(os.getenv("ENVIO_TAXA_CHAT", "1"))
+ENVIO_TAXA_GRUPO = float(os.getenv("ENVIO_TAXA_GRUPO", str(20 / 60)))
+ENVIO_RAJADA_CHAT = int(os.getenv("ENVIO_RAJADA_CHAT", "3"))
+
+# tentativas por mensagem (429 e falhas de rede); o 429 espera o retry_after
+ENVIO_TENTATIVAS = int(os.getenv("ENVIO_TENTATIVAS", "5"))
+ENVIO_BACKOFF = 1.0
+
+ENVIO_WORKERS = int(os.getenv("ENVIO_WORKERS", "4"))
+ENVIO_MAX_CHATS = 10000  # baldes por chat guardados (LRU)
+
+ENVIOS = metrics.Contador(
+    "mia_telegram_envios_total", "Mensagens enviadas ao Telegram pela fila, por resultado.", ("resultado",),
+)
+
+
+class TokenBucket:
+    """Balde de fichas: `taxa` por segundo, acumulando até `capacidade`."""
+
+    __slots__ = ("taxa", "capacidade", "fichas", "atualizado")
+
+    def __init__(self, taxa, capacidade):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.fichas = float(capacidade)
+        self.atualizado = time.monotonic()
+
+    def espera(self):
+        """Segundos até haver uma ficha (0 se já há)."""
+        agora = time.monotonic()
+        self.fichas = min(self.capacidade, self.fichas + (agora - self.atualizado) * self.taxa)
+        self.atualizado = agora
+        return 0.0 if self.fichas >= 1 else (1 - self.fichas) / self.taxa
+
+    def consumir(self):
+        self.fichas -= 1
+
+
+def dividir_mensagem(texto, limite=LIMITE_TELEGRAM):
+    """Quebra o texto em partes de até `limite`, preferindo quebras de linha e espaços."""
+    partes = []
+    while len(texto) > limite:
+        corte = texto.rfind("\n", 0, limite)
+        if corte <= 0:
+            corte = texto.rfind(" ", 0, limite)
+        if corte <= 0:
+            corte = limite
+        partes.append(texto[:corte])
+        texto = texto[corte:].lstrip("\n ")
+    if texto or not partes:
+        partes.append(texto)
+    return partes
+
+
+class _Item:
+    __slots__ = ("texto", "kwargs", "futuros", "coalescer", "urgente", "tentativas")
+
+    def __init__(self, texto, kwargs, futuro, coalescer, urgente=False):
+        self.texto = texto
+        self.kwargs = kwargs
+        self.futuros = [futuro] if futuro is not None else []
+        self.coalescer = coalescer
+        self.urgente = urgente
+        self.tentativas = 0
+
+
+# -------------------------------------------------------------------
+# FILA DE ENVIO
+# -------------------------------------------------------------------
+class FilaDeEnvio:
+    """Fila central de mensagens para o Telegram.
+
+    Cada chat tem sua fila (a ordem é mantida) e seu balde de fichas; um
+    balde global limita o total. O envio roda nos workers de um TimerHeap:
+    quando falta ficha, ou o Telegram manda esperar (429 retry_after), o
+    chat é reagendado para o instante certo em vez de prender um worker.
+    Mensagens longas são quebradas em partes de 4096; mensagens que se
+    acumulam na fila do mesmo chat são juntadas num envio só. Mensagens
+    urgentes (o placeholder do streaming) furam a fila do chat e não esperam
+    o balde dele: a ficha é descontada mesmo assim, e quem atrasa são os
+    envios seguintes.
+    """
+
+    def __init__(self, enviar, workers=ENVIO_WORKERS):
+        self._enviar = enviar  # o send_message original do bot
+        self._filas = {}       # chat_id -> deque de _Item
+        self._enviando = set() # chats com um envio em andamento
+        self._baldes = OrderedDict()
+        self._global = TokenBucket(ENVIO_TAXA_GLOBAL, ENVIO_TAXA_GLOBAL)
+        self._lock = threading.Lock()
+        self._vazia = threading.Condition(self._lock)
+        self._timers = TimerHeap("envio", workers=workers)
+        self._timers.iniciar()
+
+    def pendentes(self):
+        with self._lock:
+            return sum(len(fila) for fila in self._filas.values())
+
+    def enviar(self, chat_id, texto, coalescer=True, urgente=False, **kwargs):
+        """Enfileira a mensagem; o Future resolve com a (última) Message enviada.
+
+        urgente=True coloca a mensagem na frente da fila do chat (depois de
+        outras urgentes) e a envia sem esperar o balde do chat.
+        """
+        futuro = Future()
+        partes = dividir_mensagem(str(texto))
+        with self._lock:
+            fila = self._filas.get(chat_id)
+            novo = fila is None
+            if novo:
+                fila = self._filas[chat_id] = deque()
+            posicao = len(fila)
+            if urgente:
+                posicao = 0
+                while posicao < len(fila) and fila[posicao].urgente:
+                    posicao += 1
+            for i, parte in enumerate(partes):
+                ultima = i == len(partes) - 1
+                fila.insert(posicao + i, _Item(parte, kwargs, futuro if ultima else None, coalescer, urgente))
+            # o chat pode estar reagendado para quando o balde encher; antecipa
+            antecipar = urgente and not novo and chat_id not in self._enviando
+        if novo or antecipar:
+            self._timers.agendar(chat_id, time.time(), self._drenar, chat_id)
+        return futuro
+
+    def aguardar_vez(self, chat_id):
+        """Bloqueia até haver ficha no chat e no global e consome (ex.: edições do streaming)."""
+        while True:
+            with self._lock:
+                balde = self._balde(chat_id)
+                espera = max(balde.espera(), self._global.espera())
+                if espera == 0:
+                    balde.consumir()
+                    self._global.consumir()
+                    return
+            time.sleep(espera)
+
+    def esvaziar(self, timeout=5):
+        """Espera a fila terminar (até timeout); usado no encerramento."""
+        limite = time.monotonic() + timeout
+        with self._vazia:
+            while self._filas:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return False
+                self._vazia.wait(restante)
+        return True
+
+    # ---------------------------------------------------------------
+    def _balde(self, chat_id):
+        balde = self._baldes.get(chat_id)
+        if balde is None:
+            taxa = ENVIO_TAXA_GRUPO if isinstance(chat_id, int) and chat_id < 0 else ENVIO_TAXA_CHAT
+            balde = self._baldes[chat_id] = TokenBucket(taxa, ENVIO_RAJADA_CHAT)
+            if len(self._baldes) > ENVIO_MAX_CHATS:
+                self._baldes.popitem(last=False)
+        else:
+            self._baldes.move_to_end(chat_id)
+        return balde
+
+    def _proximo(self, fila):
+        """Tira da fila o próximo envio, juntando as mensagens seguintes compatíveis."""
+        item = fila.popleft()
+        if not item.coalescer or item.urgente:
+            return item
+        while fila:
+            seguinte = fila[0]
+            if (
+                not seguinte.coalescer
+                or seguinte.kwargs != item.kwargs
+                or len(item.texto) + 2 + len(seguinte.texto) > LIMITE_TELEGRAM
+            ):
+                break
+            fila.popleft()
+            ENVIOS.inc("agrupado")
+            juntado = _Item(item.texto + "\n\n" + seguinte.texto, item.kwargs, None, True)
+            juntado.futuros = item.futuros + seguinte.futuros
+            juntado.tentativas = item.tentativas
+            item = juntado
+        return item
+
+    def _drenar(self, chat_id):
+        with self._lock:
+            fila = self._filas.get(chat_id)
+            if not fila:
+                self._filas.pop(chat_id, None)
+                self._vazia.notify_all()
+                return
+            balde = self._balde(chat_id)
+            espera = self._global.espera()
+            if not fila[0].urgente:
+                espera = max(balde.espera(), espera)
+            if espera > 0:
+                self._timers.agendar(chat_id, time.time() + espera, self._drenar, chat_id)
+                return
+            balde.consumir()  # urgente pode deixar o balde negativo
+            self._global.consumir()
+            item = self._proximo(fila)
+            self._enviando.add(chat_id)
+
+        espera = self._tentar(chat_id, item)
+
+        with self._lock:
+            self._enviando.discard(chat_id)
+            if espera is not None:
+                fila.appendleft(item)
+            if not fila:
+                self._filas.pop(chat_id, None)
+                self._vazia.notify_all()
+                return
+        self._timers.agendar(chat_id, time.time() + (espera or 0), self._drenar, chat_id)
+
+    def _tentar(self, chat_id, item):
+        """Envia o item; devolve None se terminou ou os segundos até tentar de novo."""
+        try:
+            mensagem = self._enviar(chat_id, item.texto, **item.kwargs)
+        except ApiTelegramException as e:
+            if e.error_code != 429:
+                return self._falhar(chat_id, item, e)
+            ENVIOS.inc("429")
+            espera = (e.result_json or {}).get("parameters", {}).get("retry_after", 1)
+        except (ConnectionError, Timeout) as e:
+            espera = ENVIO_BACKOFF * 2 ** item.tentativas
+            print(f"Erro de rede ao enviar para {chat_id}: {e}; tentando em {espera:.0f}s")
+        except Exception as e:
+            return self._falhar(chat_id, item, e)
+        else:
+            ENVIOS.inc("ok")
+            for futuro in item.futuros:
+                futuro.set_result(mensagem)
+            return None
+
+        item.tentativas += 1
+        if item.tentativas >= ENVIO_TENTATIVAS:
+            return self._falhar(chat_id, item, RuntimeError(f"desistiu após {item.tentativas} tentativas"))
+        return espera
+
+    def _falhar(self, chat_id, item, erro):
+        ENVIOS.inc("erro")
+        print(f"Erro ao enviar mensagem para {chat_id}: {erro}")
+        for futuro in item.futuros:
+            futuro.set_exception(erro)
+        return None
+
+
+def instalar_fila_de_envio(bot, fila=None):
+    """Faz bot.send_message passar pela fila; edições e documentos respeitam os mesmos limites.
+
+    send_message passa a devolver um Future (quem precisa da Message,
+    como o streaming, chama .result()); coalescer=False impede que a
+    mensagem seja juntada com outras e urgente=True a manda na frente,
+    sem esperar o balde do chat.
+    """
+    if fila is None:
+        fila = FilaDeEnvio(bot.send_message)
+    editar = bot.edit_message_text
+    enviar_documento = bot.send_document
+
+    def send_message(chat_id, text, coalescer=True, urgente=False, **kwargs):
+        return fila.enviar(chat_id, text, coalescer=coalescer, urgente=urgente, **kwargs)
+
+    def edit_message_text(text, chat_id=None, message_id=None, **kwargs):
+        if chat_id is not None:
+            fila.aguardar_vez(chat_id)
+        return editar(text, chat_id, message_id, **kwargs)
+
+    def send_document(chat_id, document, **kwargs):
+        fila.aguardar_vez(chat_id)
+        return enviar_documento(chat_id, document, **kwargs)
+
+    bot.send_message = send_message
+    bot.edit_message_text = edit_message_text
+    bot.send_document = send_document
+    metrics.registrar_coletor(lambda: [(
+        "mia_telegram_fila", "gauge", "Mensagens esperando na fila de envio.", {}, fila.pendentes(),
+    )])
+    return fila
@@ -0,0 +1,103 @@
+import os
+import time
+
+from telebot.apihelper import ApiTelegramException
+
+import metrics
+
+# -------------------------------------------------------------------
+# CONFIGS
+# -------------------------------------------------------------------
+# o Telegram limita edições (~1 por segundo por chat, menos em grupos);
+# editar a cada STREAM_EDIT_INTERVAL segundos fica abaixo desse limite
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.2"))
+PLACEHOLDER = "✍️ ..."
+CURSOR = " ▌"
+LIMITE_TELEGRAM = 4096
+
+
+def _editar(bot, chat_id, message_id, texto, final=False):
+    """Edita a mensagem; devolve False se o Telegram pediu para esperar."""
+    try:
+        bot.edit_message_text(texto, chat_id, message_id)
+        return True
+    except ApiTelegramException as e:
+        if "message is not modified" in str(e.description):
+            return True
+        if e.error_code == 429:
+            retry_after = (e.result_json or {}).get("parameters", {}).get("retry_after", 1)
+            if final:
+                # a última edição não pode se perder: espera e tenta de novo
+                time.sleep(retry_after)
+                return _editar(bot, chat_id, message_id, texto, final=True)
+            return False
+        raise
+
+
+def responder_em_stream(bot, chat_id, runnable, entrada, config):
+    """Envia um placeholder na hora e vai editando com o texto do LLM.
+
+    Consome runnable.stream(...) e faz no máximo uma edição a cada
+    STREAM_EDIT_INTERVAL segundos; a primeira sai assim que chega o
+    primeiro token. No fim envia o texto completo (quebrando em mais
+    mensagens se passar do limite do Telegram) e registra no log o
+    tempo até o primeiro token e até o primeiro texto visível.
+    Retorna (texto, tokens usados).
+    """
+    inicio = time.perf_counter()
+    # a fila de envio devolve um Future; o placeholder não se junta a outra mensagem
+    # e fura a fila do chat, sem esperar o balde (a ficha é descontada do mesmo jeito)
+    mensagem = bot.send_message(chat_id, PLACEHOLDER, coalescer=False, urgente=True).result()
+    t_placeholder = time.perf_counter() - inicio
+
+    texto = ""
+    t_primeiro_token = None
+    t_primeiro_visivel = None
+    ultima_edicao = 0.0
+    intervalo = STREAM_EDIT_INTERVAL
+    edicoes = 0
+    tokens = 0
+
+    for chunk in runnable.stream(entrada, config=config):
+        uso = getattr(chunk, "usage_metadata", None)
+        if uso:
+            tokens += uso.get("total_tokens", 0)
+
+        parte = chunk.content if hasattr(chunk, "content") else str(chunk)
+        if not parte:
+            continue
+
+        agora = time.perf_counter()
+        if t_primeiro_token is None:
+            t_primeiro_token = agora - inicio
+        texto += parte
+
+        if agora - ultima_edicao >= intervalo:
+            if _editar(bot, chat_id, mensagem.message_id, texto[:LIMITE_TELEGRAM - len(CURSOR)] + CURSOR):
+                edicoes += 1
+                if t_primeiro_visivel is None:
+                    t_primeiro_visivel = time.perf_counter() - inicio
+            else:
+                # levou 429: desacelera as edições deste stream
+                intervalo *= 2
+            ultima_edicao = agora
+
+    texto_final = texto.strip() or "..."
+    _editar(bot, chat_id, mensagem.message_id, texto_final[:LIMITE_TELEGRAM], final=True)
+    if len(texto_final) > LIMITE_TELEGRAM:
+        # o resto vai pela fila, que quebra em partes de 4096
+        bot.send_message(chat_id, texto_final[LIMITE_TELEGRAM:])
+
+    total = time.perf_counter() - inicio
+    if t_primeiro_visivel is None:
+        t_primeiro_visivel = total
+    if t_primeiro_token is not None:
+        metrics.LLM_PRIMEIRO_TOKEN.observar(t_primeiro_token)
+
+    print(
+        f"[stream] chat {chat_id}: placeholder {t_placeholder * 1000:.0f}ms, "
+        f"primeiro token {(t_primeiro_token or total) * 1000:.0f}ms, "
+        f"primeiro texto visível {t_primeiro_visivel * 1000:.0f}ms, "
+        f"total {total * 1000:.0f}ms, {edicoes} edições, {tokens} tokens"
+    )
+    return texto_final, tokens
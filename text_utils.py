@@ -0,0 +1,15 @@
+import re
+import unicodedata
+
+_ESPACOS = re.compile(r"\s+")
+
+
+def remover_acentos(texto):
+    """'Reunião às 15h' -> 'Reuniao as 15h'."""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sem acentos e com espaços colapsados; usado como chave de cache."""
+    return _ESPACOS.sub(" ", remover_acentos(texto).lower()).strip()
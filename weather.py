@@ -1,39 +1,165 @@
 import os
-import requests
+import asyncio
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
 
+from cache import TTLCache, AsyncSingleFlight
+from async_http import get_json, run_sync
+from text_utils import normalizar_texto
+from backend.database import get_connection
+import metrics
+import resilience
+from resilience import ServicoIndisponivel
+
 load_dotenv()
 
 API_KEY = os.getenv("OPENWEATHER_API_KEY")
-BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
+# OPENWEATHER_URL aponta para outro servidor (ex.: os fakes de benchmarks/fakes.py)
+OPENWEATHER_URL = os.getenv("OPENWEATHER_URL", "https://api.openweathermap.org").rstrip("/")
+BASE_URL = f"{OPENWEATHER_URL}/data/2.5/weather"
+GEO_URL = f"{OPENWEATHER_URL}/geo/1.0/direct"
+
+# clima muda devagar: uma chamada por cidade a cada WEATHER_TTL segundos basta
+WEATHER_TTL = int(os.getenv("WEATHER_TTL", "600"))
+
+# cidades guardadas em memória (LRU); as demais continuam no SQLite
+GEO_MEMORIA_MAX = int(os.getenv("GEO_MEMORIA_MAX", "2048"))
+
+# coordenadas arredondadas (~1 km) para cidades vizinhas/duplicadas dividirem o cache
+CASAS_COORDENADAS = 2
+
+_weather_cache = TTLCache(ttl=WEATHER_TTL, max_itens=512)
+metrics.registrar_cache("clima", _weather_cache.estatisticas)
+
+# cache de geocoding: memória (LRU) na frente do SQLite (coordenadas não mudam)
+_geo_memoria = OrderedDict()
+_geo_lock = threading.Lock()
+_geo_voo = AsyncSingleFlight()
+
+
+# -------------------------------------------------------------------
+# GEOCODING (cache persistente)
+# -------------------------------------------------------------------
+def _geo_da_memoria(chave):
+    with _geo_lock:
+        local = _geo_memoria.get(chave)
+        if local is not None:
+            _geo_memoria.move_to_end(chave)
+        return local
+
+
+def _geo_guardar(chave, local):
+    with _geo_lock:
+        _geo_memoria[chave] = local
+        _geo_memoria.move_to_end(chave)
+        while len(_geo_memoria) > GEO_MEMORIA_MAX:
+            _geo_memoria.popitem(last=False)
+
+
+def _geo_do_banco(chave):
+    conn = get_connection()
+    linha = conn.execute(
+        "SELECT lat, lon, nome, pais FROM geocode_cache WHERE chave = ?", (chave,)
+    ).fetchone()
+    return linha
+
+
+def _geo_salvar(chave, local):
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO geocode_cache (chave, lat, lon, nome, pais) VALUES (?, ?, ?, ?, ?)",
+            (chave, *local),
+        )
+
+
+async def _geocode_api(city):
+    with resilience.chamada("openweather", "geocode"):
+        geo_data = await get_json(
+            "openweather", GEO_URL, hedge=True, params={"q": city, "limit": 1, "appid": API_KEY},
+        )
+    if not geo_data:
+        return None
+    return (geo_data[0]["lat"], geo_data[0]["lon"], geo_data[0]["name"], geo_data[0]["country"])
 
-def get_weather(city):
-    try:
-        # Geocoding - buscar latitude e longitude automaticamente
-        geo_url = f"http://api.openweathermap.org/geo/1.0/direct?q={city}&limit=1&appid={API_KEY}"
-        geo_response = requests.get(geo_url)
-        geo_data = geo_response.json()
 
-        if not geo_data:
-            return f"Não consegui encontrar a cidade '{city}'."
+async def geocode_async(city):
+    """Retorna (lat, lon, nome, país) da cidade, ou None se não existir.
 
-        lat = geo_data[0]["lat"]
-        lon = geo_data[0]["lon"]
-        city_name = geo_data[0]["name"]
-        country = geo_data[0]["country"]
+    A chave ignora acentos, maiúsculas e espaços extras, então
+    'São Paulo' e 'sao  paulo' reaproveitam o mesmo resultado.
+    """
+    chave = normalizar_texto(city)
 
-        # Buscar o clima pela latitude/longitude
-        weather_url = f"http://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={API_KEY}&units=metric&lang=pt_br"
-        weather_response = requests.get(weather_url)
-        data = weather_response.json()
+    local = _geo_da_memoria(chave)
+    if local is not None:
+        return local
 
-        # Tratar retorno e formatar resposta
-        descricao = data["weather"][0]["description"].capitalize()
-        temp = data["main"]["temp"]
-        sensacao = data["main"]["feels_like"]
+    async def carregar():
+        local = await asyncio.to_thread(_geo_do_banco, chave)
+        if local is None:
+            local = await _geocode_api(city)
+            if local is None:
+                return None
+            await asyncio.to_thread(_geo_salvar, chave, local)
+        local = tuple(local)
+        _geo_guardar(chave, local)
+        return local
 
-        return f"Clima em {city_name} ({country}): {descricao}, {round(temp)}ºC (sensação {round(sensacao)}ºC)"
+    return await _geo_voo.executar(chave, carregar)
+
+
+def geocode(city):
+    return run_sync(geocode_async(city))
+
+
+# -------------------------------------------------------------------
+# CLIMA (cache com TTL)
+# -------------------------------------------------------------------
+async def _clima_api(lat, lon):
+    with resilience.chamada("openweather", "clima"):
+        data = await get_json("openweather", BASE_URL, hedge=True, params={
+            "lat": lat, "lon": lon, "appid": API_KEY, "units": "metric", "lang": "pt_br",
+        })
+    if "weather" not in data:
+        # não guarda erro da API no cache
+        raise ValueError(f"resposta inesperada da OpenWeather: {data}")
+    return data
+
+
+async def clima_async(city):
+    """Como get_weather_async, mas deixa o erro subir (o resumo diário não guarda falhas)."""
+    # Geocoding - buscar latitude e longitude automaticamente (com cache)
+    local = await geocode_async(city)
+    if local is None:
+        return f"Não consegui encontrar a cidade '{city}'."
+
+    lat, lon, city_name, country = local
+
+    # Buscar o clima pela latitude/longitude; chats diferentes dividem o mesmo resultado
+    chave = (round(lat, CASAS_COORDENADAS), round(lon, CASAS_COORDENADAS))
+    data = await _weather_cache.aget_or_load(chave, lambda: _clima_api(*chave))
+
+    # Tratar retorno e formatar resposta
+    descricao = data["weather"][0]["description"].capitalize()
+    temp = data["main"]["temp"]
+    sensacao = data["main"]["feels_like"]
+
+    return f"Clima em {city_name} ({country}): {descricao}, {round(temp)}ºC (sensação {round(sensacao)}ºC)"
+
+
+async def get_weather_async(city):
+    try:
+        return await clima_async(city)
+
+    except ServicoIndisponivel as e:
+        return str(e)
 
     except Exception as e:
         print(f"Erro em get_weather: {e}")
         return "Erro ao buscar o clima, tente novamente."
+
+
+def get_weather(city):
+    return run_sync(get_weather_async(city))